@@ -0,0 +1,81 @@
+"""
+Benchmark the attendance calendar data path.
+
+Compares what CalendarViewScreen used to do per month (fetch the visit
+dates, build a set and test a YYYY-MM-DD string per day) with the SQL
+bitmap and a shift per day, for one month and for a whole year, for a
+devotee of the synthetic data (a visit every few weeks) and one who
+visits every day, twice on Sundays.
+"""
+import argparse
+import datetime
+
+from common import populate, report, temp_db_path, timed
+
+from database.db_handler import DatabaseHandler
+
+def month_from_dates(db, devotee_id, year, month):
+    """Present flags per day of a month, the previous way."""
+    attendance_set = set(db.get_attendance_calendar(devotee_id, year, month))
+    days = (datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.date(year, month, 1)).days
+    return [f"{year}-{month:02d}-{day:02d}" in attendance_set for day in range(1, days + 1)]
+
+def month_from_bitmap(db, devotee_id, year, month):
+    """Present flags per day of a month from the month bitmap."""
+    bitmap = db.get_attendance_bitmap(devotee_id, year, month)
+    days = (datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.date(year, month, 1)).days
+    return [bool(bitmap >> (day - 1) & 1) for day in range(1, days + 1)]
+
+def year_from_dates(db, devotee_id, year):
+    """Present flags per day of a year, a month at a time as before."""
+    return [flag for month in range(1, 13) for flag in month_from_dates(db, devotee_id, year, month)]
+
+def year_from_bitmap(db, devotee_id, year):
+    """Present flags per day of a year from the year bitmap."""
+    bitmap = db.get_attendance_year_bitmap(devotee_id, year)
+    days = (datetime.date(year + 1, 1, 1) - datetime.date(year, 1, 1)).days
+    return [bool(bitmap >> day & 1) for day in range(days)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    db = DatabaseHandler(temp_db_path())
+    db.setup_database()
+    year = datetime.date.today().year - 1
+    print(f"Loading {args.rows:,} synthetic visits into {db.db_path}")
+    with db.pool.write_connection() as conn:
+        populate(conn, visits=args.rows)
+        daily = []
+        day = datetime.date(year, 1, 1)
+        while day.year == year:
+            daily.append(('daily', day.isoformat(), 'Rice'))
+            if day.weekday() == 6:
+                daily.append(('daily', day.isoformat(), 'Milk'))
+            day += datetime.timedelta(days=1)
+        conn.executemany(
+            "INSERT INTO visits (devotee_id, visit_date, selected_item) VALUES (?, ?, ?)", daily
+        )
+        conn.commit()
+
+    cases = [
+        (f"{devotee_id}, {span}", old_func, new_func, (devotee_id, year) + extra)
+        for devotee_id in ('42', 'daily')
+        for span, old_func, new_func, extra in (
+            ('month', month_from_dates, month_from_bitmap, (3,)),
+            ('year', year_from_dates, year_from_bitmap, ()),
+        )
+    ]
+    for name, old_func, new_func, params in cases:
+        old, old_flags = timed(old_func, db, *params, repeat=args.repeat)
+        new, new_flags = timed(new_func, db, *params, repeat=args.repeat)
+        assert old_flags == new_flags, name
+        report(f"{name}, date strings", old, f"{sum(old_flags)} days present")
+        report(f"{name}, bitmap", new, f"speedup x{old / new:.1f}")
+
+    db.close_connection()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark hot backups while check-ins keep arriving.
+
+A background thread records a visit every few milliseconds while the
+database is backed up. Compares the stepped backup used by BackupManager
+with copying everything in one step, which blocks writers for the whole
+copy, and reports check-in latency during each.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from common import populate, report
+
+from database.backup import BackupManager
+from database.db_handler import DatabaseHandler
+
+def check_ins(db, stop, latencies, interval):
+    """Record visits until stop is set, collecting each call's latency."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        db.record_visit('1', 'Pūjā')
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    db.pool.release_thread_connection()
+
+def one_step_backup(db, path):
+    """Copy the whole database in one backup step under the write lock."""
+    target = sqlite3.connect(path)
+    with db.pool.write_connection() as conn:
+        conn.backup(target)
+    target.close()
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=3000000)
+    parser.add_argument('--interval-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='jaintemple-bench-')
+    db = DatabaseHandler(os.path.join(work_dir, 'bench.db'))
+    db.setup_database()
+    print(f"Loading {args.rows:,} synthetic visits")
+    with db.pool.write_connection() as conn:
+        populate(conn, visits=args.rows, devotees=5000)
+    print(f"Database size {os.path.getsize(db.db_path) / 1024 / 1024:.0f} MB")
+
+    manager = BackupManager(db, backup_dir=os.path.join(work_dir, 'backups'), keep=2, compress=False)
+    for label, run in (
+        ('one step', lambda: one_step_backup(db, os.path.join(work_dir, 'one-step.db'))),
+        ('stepped (BackupManager)', manager.create_backup),
+        ('stepped + gzip', lambda: BackupManager(
+            db, backup_dir=manager.backup_dir, keep=2, compress=True
+        ).create_backup()),
+    ):
+        stop = threading.Event()
+        latencies = []
+        writer = threading.Thread(
+            target=check_ins, args=(db, stop, latencies, args.interval_ms / 1000)
+        )
+        writer.start()
+        time.sleep(0.2)
+
+        start = time.perf_counter()
+        path = run()
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        writer.join()
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+        report(
+            label, elapsed,
+            f"{os.path.getsize(path) / 1024 / 1024:.0f} MB, {len(latencies)} check-ins, "
+            f"check-in p99 {p99 * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms"
+        )
+
+    db.close_connection()
+    shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
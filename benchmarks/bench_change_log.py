@@ -0,0 +1,56 @@
+"""
+Benchmark a nightly incremental backup (export_changes) against a full
+backup, as the visit history grows while daily activity stays the same.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from common import ITEMS, populate, report
+
+from database.backup import BackupManager
+from database.change_log import export_changes
+from database.db_handler import DatabaseHandler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--history', type=int, nargs='+', default=[100000, 1000000, 3000000])
+    parser.add_argument('--daily-visits', type=int, default=500)
+    args = parser.parse_args()
+
+    for history in args.history:
+        work_dir = tempfile.mkdtemp(prefix='jaintemple-bench-')
+        db = DatabaseHandler(os.path.join(work_dir, 'bench.db'))
+        db.setup_database()
+        with db.pool.write_connection() as conn:
+            populate(conn, visits=history, devotees=5000)
+        # The history is covered by an earlier full backup and export
+        export_changes(db, work_dir)
+
+        # One day of check-ins and a few devotee edits
+        db.record_visits(
+            (str(i % 5000 + 1), ITEMS[i % len(ITEMS)]) for i in range(args.daily_visits)
+        )
+        for i in range(1, 11):
+            db.update_devotee(str(i), f"Devotee {i}", '', '', '')
+
+        start = time.perf_counter()
+        path, entries = export_changes(db, work_dir)
+        incremental = time.perf_counter() - start
+        incremental_size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        full_path = BackupManager(db, backup_dir=work_dir, compress=True).create_backup()
+        full = time.perf_counter() - start
+
+        report(f"{history:>9,} visits: export_changes", incremental,
+               f"{entries:,} entries, {incremental_size / 1024:.0f} KB")
+        report(f"{history:>9,} visits: full backup (gzip)", full,
+               f"{os.path.getsize(full_path) / 1024 / 1024:.1f} MB")
+        db.close_connection()
+        shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
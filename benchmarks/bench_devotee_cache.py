@@ -0,0 +1,55 @@
+"""
+Benchmark get_devotee with and without the devotee cache.
+
+Lookups follow a skewed distribution: most check-ins come from a small
+group of regular devotees, the rest from the whole register.
+"""
+import argparse
+import os
+import random
+import time
+
+from common import populate, report, temp_db_path
+
+from database.db_handler import DatabaseHandler
+
+def lookups(count, devotees, regulars, seed=11):
+    """Generate devotee IDs, 90% of them drawn from the regulars."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        pool = regulars if rng.random() < 0.9 else devotees
+        yield str(rng.randrange(1, pool + 1))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--devotees', type=int, default=20000)
+    parser.add_argument('--regulars', type=int, default=300)
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    path = temp_db_path()
+    db = DatabaseHandler(path)
+    db.setup_database()
+    with db.pool.write_connection() as conn:
+        populate(conn, devotees=args.devotees)
+    db.close_connection()
+
+    ids = list(lookups(args.lookups, args.devotees, args.regulars))
+    for capacity in (0, 128, DatabaseHandler.DEVOTEE_CACHE_SIZE, 4096):
+        db = DatabaseHandler(path, devotee_cache_size=capacity)
+        start = time.perf_counter()
+        for devotee_id in ids:
+            db.get_devotee(devotee_id)
+        elapsed = time.perf_counter() - start
+        stats = db.devotee_cache_stats()
+        report(
+            f"cache capacity {capacity}", elapsed,
+            f"{len(ids) / elapsed:,.0f} lookups/s, hit ratio {stats['hit_ratio']:.1%}, "
+            f"{stats['evictions']:,} evictions"
+        )
+        db.close_connection()
+
+    os.remove(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark importing devotees from CSV.
+
+Compares the one-at-a-time path of AddDevoteeScreen.save_devotee (a
+get_devotee check and a committed add_devotee per devotee) with the bulk
+importer at several chunk sizes, into an empty database, then re-imports
+the same file (nothing changes) and a file with every name changed.
+"""
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+
+from common import report, synthetic_devotees
+
+from database.db_handler import DatabaseHandler
+from database.devotee_import import import_devotees
+
+def write_csv(path, count, rename=False, bad_every=100):
+    """Write count devotees to a CSV file; every bad_every-th row has no name."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'phone', 'email', 'address'])
+        for i, (devotee_id, name, phone, email, address) in enumerate(synthetic_devotees(count), 1):
+            if rename:
+                name += ' Jain'
+            if bad_every and i % bad_every == 0:
+                name = ''
+            writer.writerow((devotee_id, name, phone, email, address))
+
+def one_at_a_time(db, path):
+    """What AddDevoteeScreen does per devotee."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if not row['name'] or db.get_devotee(row['id']):
+                continue
+            db.add_devotee(row['id'], row['name'], row['phone'], row['email'], row['address'])
+
+def fresh_db(work_dir, name):
+    db = DatabaseHandler(os.path.join(work_dir, name))
+    db.setup_database()
+    return db
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--single-rows', type=int, default=5000,
+                        help='rows for the one-at-a-time baseline')
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='jaintemple-bench-')
+    path = os.path.join(work_dir, 'devotees.csv')
+    write_csv(path, args.rows)
+    single_path = os.path.join(work_dir, 'single.csv')
+    write_csv(single_path, args.single_rows)
+
+    db = fresh_db(work_dir, 'single.db')
+    start = time.perf_counter()
+    one_at_a_time(db, single_path)
+    elapsed = time.perf_counter() - start
+    report(f"one at a time, {args.single_rows:,} rows", elapsed,
+           f"{args.single_rows / elapsed:,.0f} rows/s")
+    db.close_connection()
+
+    rejects = os.path.join(work_dir, 'rejects.csv')
+    for chunk_size in args.chunk_sizes:
+        db = fresh_db(work_dir, f'bulk-{chunk_size}.db')
+        result = import_devotees(db, path, rejects_path=rejects, chunk_size=chunk_size)
+        report(f"bulk import, chunks of {chunk_size:,}", result.seconds,
+               f"{result.rows / result.seconds:,.0f} rows/s, {result.rejected:,} rejected")
+        db.close_connection()
+
+    db = fresh_db(work_dir, f'bulk-{args.chunk_sizes[0]}.db')
+    result = import_devotees(db, path)
+    report("re-import, nothing changed", result.seconds,
+           f"{result.rows / result.seconds:,.0f} rows/s, {result.unchanged:,} unchanged")
+    renamed = os.path.join(work_dir, 'renamed.csv')
+    write_csv(renamed, args.rows, rename=True)
+    result = import_devotees(db, renamed)
+    report("re-import, every name changed", result.seconds,
+           f"{result.rows / result.seconds:,.0f} rows/s, {result.updated:,} updated")
+    db.close_connection()
+
+    shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark opening the admin devotee list at 10k devotees.
+
+Compares the previous list (get_all_devotees, then a BoxLayout, a Label
+and two Buttons with bound lambdas per devotee) with the DevoteeRow
+RecycleView of DevoteeListPopup, given every devotee or only the first
+page it loads on open.
+
+Measures the time from starting the load until the first frame showing
+the list has been flipped to the screen, the peak Python memory
+allocated meanwhile (tracemalloc; GPU textures are not included) and
+the number of widgets created.
+
+Needs Kivy and a display (or a virtual one such as xvfb-run).
+"""
+import argparse
+import gc
+import os
+import shutil
+import time
+import tracemalloc
+
+from common import ROOT_DIR, populate, temp_db_path
+
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.lang import Builder
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.label import Label
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.scrollview import ScrollView
+
+from database.db_handler import DatabaseHandler
+from screens.admin_dashboard import DevoteeListPopup, devotee_row
+
+def widget_rows(db):
+    """The previous devotee list: a widget tree and two bindings per devotee."""
+    scroll = ScrollView()
+    grid = GridLayout(cols=1, spacing=5, size_hint_y=None)
+    grid.bind(minimum_height=grid.setter('height'))
+    for devotee in db.get_all_devotees():
+        row = BoxLayout(orientation='horizontal', size_hint_y=None, height='50dp')
+        info_text = f"ID: {devotee.id} - {devotee.name}"
+        if devotee.phone:
+            info_text += f" - {devotee.phone}"
+        row.add_widget(Label(text=info_text, size_hint_x=0.7))
+        edit_btn = Button(text='Edit', size_hint_x=0.15)
+        edit_btn.bind(on_release=lambda btn, id=devotee.id: None)
+        row.add_widget(edit_btn)
+        delete_btn = Button(text='Delete', size_hint_x=0.15)
+        delete_btn.bind(on_release=lambda btn, id=devotee.id: None)
+        row.add_widget(delete_btn)
+        grid.add_widget(row)
+    scroll.add_widget(grid)
+    return scroll
+
+def recycle_rows(devotees):
+    """The DevoteeRow RecycleView of DevoteeListPopup."""
+    view = RecycleView(viewclass='DevoteeRow')
+    layout = RecycleBoxLayout(
+        orientation='vertical',
+        default_size=(None, 50),
+        default_size_hint=(1, None),
+        size_hint_y=None,
+        spacing=5
+    )
+    layout.bind(minimum_height=layout.setter('height'))
+    view.add_widget(layout)
+    view.data = [devotee_row(devotee) for devotee in devotees]
+    return view
+
+def all_devotees(db):
+    """Every devotee, page by page as scrolling would load them."""
+    devotees, token = db.iter_devotees(limit=DevoteeListPopup.PAGE_SIZE)
+    while token is not None:
+        page, token = db.iter_devotees(token, DevoteeListPopup.PAGE_SIZE)
+        devotees.extend(page)
+    return devotees
+
+def count_widgets(widget):
+    """Number of widgets in a tree."""
+    return 1 + sum(count_widgets(child) for child in widget.children)
+
+class DevoteeListBenchmarkApp(App):
+
+    def __init__(self, db, **kwargs):
+        super(DevoteeListBenchmarkApp, self).__init__(**kwargs)
+        self.modes = [
+            ('widget per row', lambda: widget_rows(db)),
+            ('RecycleView, all', lambda: recycle_rows(all_devotees(db))),
+            ('RecycleView, page 1', lambda: recycle_rows(
+                db.iter_devotees(limit=DevoteeListPopup.PAGE_SIZE)[0])),
+        ]
+        self.results = []
+
+    def build(self):
+        # Registers the DevoteeRow view class
+        Builder.load_file(os.path.join(ROOT_DIR, 'jainapp.kv'))
+        self.container = BoxLayout()
+        return self.container
+
+    def on_start(self):
+        Clock.schedule_once(lambda dt: self.run_next(), 0.5)
+
+    def run_next(self):
+        if not self.modes:
+            self.stop()
+            return
+        name, render = self.modes.pop(0)
+        self.container.clear_widgets()
+        gc.collect()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        self.container.add_widget(render())
+
+        def on_flip(*args):
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            Window.unbind(on_flip=on_flip)
+            widgets = count_widgets(self.container) - 1
+            self.results.append((name, elapsed, peak, widgets))
+            Clock.schedule_once(lambda dt: self.run_next(), 0.5)
+
+        Window.bind(on_flip=on_flip)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--devotees', type=int, default=10000)
+    args = parser.parse_args()
+
+    db = DatabaseHandler(temp_db_path())
+    db.setup_database()
+    with db.pool.write_connection() as conn:
+        populate(conn, devotees=args.devotees)
+
+    app = DevoteeListBenchmarkApp(db)
+    app.run()
+
+    print(f"\n{args.devotees:,} devotees")
+    for name, elapsed, peak, widgets in app.results:
+        print(f"{name:<20} first paint {elapsed * 1000:>9.1f} ms   "
+              f"peak memory {peak / 1024 / 1024:>7.1f} MB   {widgets:>7,} widgets")
+
+    db.close_connection()
+    shutil.rmtree(os.path.dirname(db.db_path))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark devotee search at 100k devotees.
+
+Times search_devotees for the terms a user types on the way to a
+devotee (one letter, a prefix, a full name, part of a phone number),
+against a LIKE '%term%' scan of the devotees table, which is what
+filtering without the index would cost.
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+import time
+
+from common import report, temp_db_path
+
+from database.db_handler import DatabaseHandler
+from database.devotee_import import import_devotees
+
+FIRST_NAMES = [
+    'Aarav', 'Abhay', 'Amit', 'Anil', 'Ankit', 'Arjun', 'Bharat', 'Chetan',
+    'Deepak', 'Dinesh', 'Gaurav', 'Harsh', 'Jayesh', 'Kamal', 'Kiran', 'Mahavir',
+    'Mahesh', 'Manish', 'Mukesh', 'Nilesh', 'Paras', 'Pooja', 'Priya', 'Rahul',
+    'Rajesh', 'Ramesh', 'Rekha', 'Rohit', 'Sanjay', 'Seema', 'Shreya', 'Sunil',
+    'Suresh', 'Tejal', 'Vijay', 'Vimal', 'Yash',
+]
+
+LAST_NAMES = [
+    'Jain', 'Shah', 'Mehta', 'Doshi', 'Gandhi', 'Kothari', 'Parekh', 'Sanghvi',
+    'Bhandari', 'Chopra', 'Golecha', 'Lodha', 'Munot', 'Nahar', 'Surana',
+]
+
+CITIES = ['Pune', 'Mumbai', 'Ahmedabad', 'Jaipur', 'Indore', 'Surat', 'Chennai']
+
+def devotee_rows(count, seed=7):
+    """Generate (id, name, phone, email, address) tuples with varied names."""
+    rng = random.Random(seed)
+    for i in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        phone = f"+91 {rng.randrange(70000, 99999)} {rng.randrange(100000):05d}"
+        yield (
+            str(i),
+            f"{first} {last}",
+            phone,
+            f"{first.lower()}.{last.lower()}{i}@example.com",
+            f"{rng.randrange(1, 200)} {rng.choice(['Temple', 'Station', 'Market'])} Road, {rng.choice(CITIES)}"
+        )
+
+def time_query(func, term, repeat=20):
+    """Best time of repeated calls, and the last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(term)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--devotees', type=int, default=100000)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    db = DatabaseHandler(temp_db_path())
+    db.setup_database()
+    path = os.path.join(os.path.dirname(db.db_path), 'devotees.csv')
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'phone', 'email', 'address'])
+        writer.writerows(devotee_rows(args.devotees))
+    result = import_devotees(db, path)
+    report(f"import {result.inserted:,} devotees (indexed by triggers)", result.seconds)
+
+    with db.pool.reader() as cursor:
+        # A devotee from the middle of the data, whatever its size
+        sample_id, sample_phone = cursor.execute(
+            "SELECT id, phone FROM devotees ORDER BY id LIMIT 1 OFFSET ?", (args.devotees // 2,)
+        ).fetchone()
+
+    def like_scan(term):
+        pattern = f"%{term}%"
+        with db.pool.reader() as cursor:
+            return cursor.execute(
+                "SELECT * FROM devotees WHERE name LIKE ? OR phone LIKE ? OR email LIKE ? "
+                "OR address LIKE ? LIMIT ?",
+                (pattern, pattern, pattern, pattern, args.limit)
+            ).fetchall()
+
+    def search(term):
+        return db.search_devotees(term, args.limit)
+
+    terms = ['m', 'ma', 'mah', 'mahavir', 'mahavir sh', 'pune', sample_id,
+             sample_phone[-5:], sample_phone[4:9], 'no such devotee']
+    for term in terms:
+        seconds, found = time_query(search, term)
+        report(f"search_devotees({term!r})", seconds, f"{len(found)} found")
+    for term in ('mahavir', sample_phone[-5:], 'no such devotee'):
+        seconds, found = time_query(like_scan, term, repeat=3)
+        report(f"LIKE scan ({term!r})", seconds, f"{len(found)} found")
+
+    db.close_connection()
+    shutil.rmtree(os.path.dirname(db.db_path))
+
+if __name__ == '__main__':
+    main()
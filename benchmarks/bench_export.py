@@ -0,0 +1,53 @@
+"""
+Benchmark exporting the visit log to CSV, plain and gzip compressed.
+
+Reports rows per second, output size and peak Python memory
+(tracemalloc), which should stay flat however many visits are exported.
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+from common import populate, report, temp_db_path
+
+from database.db_handler import DatabaseHandler
+from utils.report_export import export_report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--devotees', type=int, default=5000)
+    args = parser.parse_args()
+
+    path = temp_db_path()
+    db = DatabaseHandler(path)
+    db.setup_database()
+    print(f"Loading {args.rows:,} synthetic visits into {path}")
+    with db.pool.write_connection() as conn:
+        populate(conn, visits=args.rows, devotees=args.devotees)
+
+    for label, out in (('CSV', path + '.csv'), ('CSV + gzip', path + '.csv.gz')):
+        start = time.perf_counter()
+        rows = export_report(db, 'Visits', None, out)
+        elapsed = time.perf_counter() - start
+        assert rows == args.rows, rows
+        report(
+            label, elapsed,
+            f"{rows / elapsed:,.0f} rows/s, {os.path.getsize(out) / 1024 / 1024:.1f} MB file"
+        )
+        os.remove(out)
+
+    # Separate run: tracemalloc slows the export down several times
+    tracemalloc.start()
+    export_report(db, 'Visits', None, path + '.csv')
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    os.remove(path + '.csv')
+    print(f"peak Python memory while exporting: {peak / 1024 / 1024:.1f} MB")
+
+    db.close_connection()
+    os.remove(path)
+
+if __name__ == '__main__':
+    main()
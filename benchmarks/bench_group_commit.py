@@ -0,0 +1,56 @@
+"""
+Benchmark visit writes: one commit per visit, group commit and bulk insert.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import ITEMS, report
+
+from database.connection_pool import CONNECTION_PROFILES
+from database.db_handler import DatabaseHandler
+
+def per_visit(db, visits):
+    for devotee_id, item in visits:
+        db.record_visit(devotee_id, item)
+
+def group_commit(db, visits):
+    db.enable_group_commit(max_rows=50, max_delay_ms=200)
+    for devotee_id, item in visits:
+        db.record_visit(devotee_id, item)
+    db.flush()
+
+def bulk(db, visits):
+    db.record_visits(visits)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--visits', type=int, default=5000)
+    parser.add_argument('--dir', default=None, help='directory for the database files')
+    args = parser.parse_args()
+
+    work_dir = args.dir or tempfile.mkdtemp(prefix='jaintemple-bench-')
+    visits = [(str(i % 1000 + 1), ITEMS[i % len(ITEMS)]) for i in range(args.visits)]
+
+    for profile in CONNECTION_PROFILES:
+        for name, write in (('per-visit commit', per_visit),
+                            ('group commit', group_commit),
+                            ('record_visits', bulk)):
+            path = os.path.join(work_dir, f'{profile}-{name.replace(" ", "_")}.db')
+            db = DatabaseHandler(path, profile=profile)
+            db.setup_database()
+
+            start = time.perf_counter()
+            write(db, visits)
+            elapsed = time.perf_counter() - start
+
+            with db.pool.reader() as cursor:
+                count = cursor.execute("SELECT COUNT(*) FROM visits").fetchone()[0]
+            assert count == len(visits), (name, count)
+            report(f"{profile}: {name}", elapsed,
+                   f"{len(visits) / elapsed:,.0f} visits/s")
+            db.close_connection()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark and sanity-check the weighted item draw.
+
+Measures draws per second for several catalogue sizes, runs a
+chi-square goodness-of-fit test of the drawn distribution against the
+item weights, and checks the per-devotee exclusion window.
+"""
+import argparse
+import math
+import random
+import time
+from collections import Counter, deque
+
+from common import ITEMS, report
+
+from utils.item_draw import WeightedItemDraw
+
+def chi_square_critical(df, z=3.09):
+    """Wilson-Hilferty approximation of the chi-square critical value (z=3.09: p=0.001)."""
+    return df * (1 - 2 / (9 * df) + z * math.sqrt(2 / (9 * df))) ** 3
+
+def bench_draws(size, draws, rng):
+    items = [f"item-{i}" for i in range(size)]
+    weights = [rng.randint(1, 10) for _ in range(size)]
+    table = WeightedItemDraw(items, weights, rng=rng)
+    exclude = deque(items[:3], maxlen=3)
+
+    # random.choices rebuilds the cumulative weights on every call, so it
+    # gets fewer rounds on large catalogues
+    baseline_draws = max(1, min(draws, 2000000 // size))
+    for label, func, rounds in (
+        ('draw()', lambda: table.draw(), draws),
+        ('draw(exclude=3 recent)', lambda: table.draw(exclude), draws),
+        ('random.choices baseline', lambda: rng.choices(items, weights), baseline_draws),
+    ):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func()
+        elapsed = time.perf_counter() - start
+        report(f"{size:>7} items: {label}", elapsed / rounds, f"{rounds / elapsed:,.0f} draws/s")
+
+def distribution_test(draws, rng):
+    weights = [rng.randint(1, 10) for _ in ITEMS]
+    table = WeightedItemDraw(ITEMS, weights, rng=rng)
+    counts = Counter(table.draw() for _ in range(draws))
+    total_weight = sum(weights)
+    statistic = sum(
+        (counts[item] - draws * weight / total_weight) ** 2 / (draws * weight / total_weight)
+        for item, weight in zip(ITEMS, weights)
+    )
+    critical = chi_square_critical(len(ITEMS) - 1)
+    verdict = 'PASS' if statistic < critical else 'FAIL'
+    print(f"chi-square = {statistic:.2f} (critical {critical:.2f} at p=0.001, df={len(ITEMS) - 1}): {verdict}")
+    return statistic < critical
+
+def exclusion_test(visits, window, rng):
+    table = WeightedItemDraw(ITEMS, rng=rng)
+    recent = deque(maxlen=window)
+    for _ in range(visits):
+        item = table.draw(exclude=recent)
+        if item in recent:
+            print(f"exclusion window violated: {item} in {list(recent)}")
+            return False
+        recent.append(item)
+    print(f"exclusion window of {window}: no repeats in {visits:,} consecutive draws: PASS")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--draws', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for size in (len(ITEMS), 1000, 100000):
+        bench_draws(size, args.draws, rng)
+    print()
+    ok = distribution_test(args.draws, rng)
+    ok = exclusion_test(args.draws // 10, 3, rng) and ok
+    raise SystemExit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark merging kiosk databases into a master database.
+
+Builds kiosk databases with synthetic visits and merges them into an
+empty master with merge_database (ATTACH + INSERT ... SELECT), then
+merges the first kiosk again, which must add nothing. For comparison,
+copies the same kiosk's visits row by row through Python with a lookup
+per visit, the way a naive import would.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from common import populate, report
+
+from database.db_handler import DatabaseHandler
+from database.merge import merge_database
+
+def row_by_row_merge(db, source_path):
+    """Copy visits one at a time, checking the origin key for each."""
+    source = sqlite3.connect(source_path)
+    device_id = source.execute("SELECT value FROM settings WHERE key = 'device_id'").fetchone()[0]
+    added = 0
+    with db.pool.writer() as cursor:
+        for visit_id, devotee_id, visit_date, item in source.execute(
+            "SELECT id, devotee_id, visit_date, selected_item FROM visits"
+        ):
+            exists = cursor.execute(
+                "SELECT 1 FROM visits WHERE origin = ? AND origin_id = ?", (device_id, visit_id)
+            ).fetchone()
+            if not exists:
+                cursor.execute(
+                    "INSERT INTO visits (devotee_id, visit_date, selected_item, origin, origin_id) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (devotee_id, visit_date, item, device_id, visit_id)
+                )
+                added += 1
+    source.close()
+    return added
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--kiosks', type=int, default=3)
+    parser.add_argument('--rows', type=int, default=1000000, help='visits per kiosk')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='jaintemple-bench-')
+    kiosk_paths = []
+    for number in range(args.kiosks):
+        path = os.path.join(work_dir, f'kiosk{number}.db')
+        kiosk = DatabaseHandler(path)
+        kiosk.setup_database()
+        with kiosk.pool.write_connection() as conn:
+            populate(conn, visits=args.rows, devotees=5000)
+        kiosk.close_connection()
+        kiosk_paths.append(path)
+    print(f"{args.kiosks} kiosks with {args.rows:,} visits each")
+
+    master = DatabaseHandler(os.path.join(work_dir, 'master.db'))
+    master.setup_database()
+    start = time.perf_counter()
+    for path in kiosk_paths:
+        result = merge_database(master, path)
+        report(f"merge {os.path.basename(path)}", time.perf_counter() - start,
+               f"{result.visits_added:,} visits added")
+        start = time.perf_counter()
+    result = merge_database(master, kiosk_paths[0])
+    report("merge kiosk0.db again", time.perf_counter() - start,
+           f"{result.visits_added:,} added, {result.visits_skipped:,} skipped")
+    master.close_connection()
+
+    naive = DatabaseHandler(os.path.join(work_dir, 'naive.db'))
+    naive.setup_database()
+    start = time.perf_counter()
+    added = row_by_row_merge(naive, kiosk_paths[0])
+    report("row by row copy of kiosk0.db", time.perf_counter() - start, f"{added:,} visits added")
+    naive.close_connection()
+    shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
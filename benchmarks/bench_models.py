@@ -0,0 +1,121 @@
+"""
+Benchmark loading visits and devotees as model objects.
+
+Fetches the same rows as plain tuples, as the previous __dict__ based
+models (with eager date parsing), and as the slotted models built by
+their row factories. Reports construction time and the memory the
+loaded list holds.
+"""
+import argparse
+import datetime
+import gc
+import os
+import shutil
+import time
+import tracemalloc
+
+from common import populate, report, temp_db_path
+
+from database.db_handler import DatabaseHandler
+from models.devotee import Devotee
+from models.visit import Visit
+
+class LegacyVisit:
+    """The Visit model before it was slotted: __dict__ and eager parsing."""
+
+    def __init__(self, id=None, devotee_id="", visit_date=None, selected_item=""):
+        self.id = id
+        self.devotee_id = devotee_id
+        if isinstance(visit_date, str):
+            visit_date = datetime.date.fromisoformat(visit_date)
+        self.visit_date = visit_date
+        self.selected_item = selected_item
+
+    @classmethod
+    def from_db_row(cls, row):
+        return cls(id=row[0], devotee_id=row[1], visit_date=row[2], selected_item=row[3])
+
+class LegacyDevotee:
+    """The Devotee model before it was slotted."""
+
+    def __init__(self, id="", name="", phone="", email="", address=""):
+        self.id = id
+        self.name = name
+        self.phone = phone
+        self.email = email
+        self.address = address
+
+    @classmethod
+    def from_db_row(cls, row):
+        return cls(id=row[0], name=row[1], phone=row[2] or "", email=row[3] or "",
+                   address=row[4] or "")
+
+VISITS_SQL = "SELECT id, devotee_id, visit_date, selected_item FROM visits LIMIT ?"
+DEVOTEES_SQL = "SELECT * FROM devotees LIMIT ?"
+
+def load(db, sql, limit, row_factory=None, convert=None):
+    """Fetch rows with a row factory, or convert tuples afterwards."""
+    with db.pool.reader(row_factory) as cursor:
+        rows = cursor.execute(sql, (limit,)).fetchall()
+    if convert:
+        rows = [convert(row) for row in rows]
+    return rows
+
+def measure(label, func, count):
+    """Report the best time of three loads and the memory a result holds."""
+    elapsed = None
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        rows = func()
+        seconds = time.perf_counter() - start
+        elapsed = seconds if elapsed is None else min(elapsed, seconds)
+        del rows
+    gc.collect()
+
+    # Separate run, tracemalloc slows allocation down
+    tracemalloc.start()
+    rows = func()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    report(label, elapsed, f"{held / 1024 / 1024:.0f} MB held, {held / count:.0f} B per row")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    db = DatabaseHandler(temp_db_path())
+    db.setup_database()
+    with db.pool.write_connection() as conn:
+        populate(conn, visits=args.rows, devotees=args.rows)
+
+    count = args.rows
+    measure("visits as tuples", lambda: load(db, VISITS_SQL, count), count)
+    measure("visits as legacy Visit", lambda: load(
+        db, VISITS_SQL, count, convert=LegacyVisit.from_db_row), count)
+    visits = measure("visits as slotted Visit (row_factory)", lambda: load(
+        db, VISITS_SQL, count, row_factory=Visit.row_factory), count)
+
+    start = time.perf_counter()
+    for visit in visits:
+        visit.visit_date_text
+    report("  read visit_date_text (no parsing)", time.perf_counter() - start)
+    start = time.perf_counter()
+    for visit in visits:
+        visit.visit_date
+    report("  read visit_date (parses once)", time.perf_counter() - start)
+    del visits
+
+    measure("devotees as tuples", lambda: load(db, DEVOTEES_SQL, count), count)
+    measure("devotees as legacy Devotee", lambda: load(
+        db, DEVOTEES_SQL, count, convert=LegacyDevotee.from_db_row), count)
+    measure("devotees as slotted Devotee (row_factory)", lambda: load(
+        db, DEVOTEES_SQL, count, row_factory=Devotee.row_factory), count)
+
+    db.close_connection()
+    shutil.rmtree(os.path.dirname(db.db_path))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark listing all devotees: get_all_devotees versus keyset pages.
+
+Reports wall time and peak Python memory (tracemalloc) for reading the
+whole table, and the cost of one deep page with LIMIT/OFFSET versus a
+keyset continuation token.
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+from common import populate, report, temp_db_path, timed
+
+from database.db_handler import DatabaseHandler, iter_pages
+from models.devotee import Devotee
+
+def measure(func):
+    """Run func, returning (seconds, peak traced bytes, result)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--devotees', type=int, default=200000)
+    parser.add_argument('--page-size', type=int, default=500)
+    args = parser.parse_args()
+
+    path = temp_db_path()
+    db = DatabaseHandler(path)
+    db.setup_database()
+    with db.pool.write_connection() as conn:
+        populate(conn, devotees=args.devotees)
+
+    def count_pages():
+        return sum(1 for _ in iter_pages(db.iter_devotees, page_size=args.page_size))
+
+    for label, func in (('get_all_devotees', lambda: len(db.get_all_devotees())),
+                        (f'iter_devotees, {args.page_size} per page', count_pages)):
+        elapsed, peak, rows = measure(func)
+        assert rows == args.devotees, (label, rows)
+        report(label, elapsed, f"peak memory {peak / 1024 / 1024:.1f} MB")
+
+    # The page starting at the middle of the listing
+    offset = args.devotees // 2
+    with db.pool.reader() as cursor:
+        middle = cursor.execute(
+            "SELECT name, id FROM devotees ORDER BY name, id LIMIT 1 OFFSET ?", (offset - 1,)
+        ).fetchone()
+
+    def offset_page():
+        # Built like iter_devotees builds its pages, so both pay for the
+        # Devotee objects
+        with db.pool.reader(Devotee.row_factory) as cursor:
+            return cursor.execute(
+                "SELECT * FROM devotees ORDER BY name, id LIMIT ? OFFSET ?",
+                (args.page_size, offset)
+            ).fetchall()
+
+    offset_time, offset_rows = timed(offset_page)
+    keyset_time, (keyset_rows, _) = timed(db.iter_devotees, middle, args.page_size)
+    assert [d.to_dict() for d in offset_rows] == [d.to_dict() for d in keyset_rows]
+    report(f'page at offset {offset:,}: LIMIT/OFFSET', offset_time)
+    report(f'page at offset {offset:,}: keyset token', keyset_time,
+           f"speedup x{offset_time / keyset_time:.1f}")
+
+    db.close_connection()
+    os.remove(path)
+
+if __name__ == '__main__':
+    main()
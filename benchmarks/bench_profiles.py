@@ -0,0 +1,53 @@
+"""
+Benchmark the kiosk check-in path under each connection profile.
+
+Each check-in is a get_devotee lookup followed by record_visit, run
+against a fresh database file per profile. Run it on the target device
+storage (e.g. --dir /storage/emulated/0/JainTempleApp) for numbers that
+reflect real fsync costs.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from common import ITEMS, populate, report
+
+from database.connection_pool import CONNECTION_PROFILES
+from database.db_handler import DatabaseHandler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--visits', type=int, default=2000)
+    parser.add_argument('--devotees', type=int, default=1000)
+    parser.add_argument('--dir', default=None, help='directory for the database files')
+    args = parser.parse_args()
+
+    work_dir = args.dir or tempfile.mkdtemp(prefix='jaintemple-bench-')
+    for profile in CONNECTION_PROFILES:
+        path = os.path.join(work_dir, f'profile-{profile}.db')
+        db = DatabaseHandler(path, profile=profile)
+        db.setup_database()
+        with sqlite3.connect(path) as raw:
+            populate(raw, devotees=args.devotees)
+
+        start = time.perf_counter()
+        for i in range(args.visits):
+            devotee_id = str(i % args.devotees + 1)
+            if db.get_devotee(devotee_id):
+                db.record_visit(devotee_id, ITEMS[i % len(ITEMS)])
+        elapsed = time.perf_counter() - start
+
+        report(f"check-in, profile '{profile}'", elapsed / args.visits,
+               f"{args.visits / elapsed:,.0f} visits/s")
+        for name, stats in db.query_stats().items():
+            if stats['calls']:
+                print(f"    {name:<24} {stats['calls']:>8} calls  {stats['avg_ms']:.3f} ms avg")
+        db.close_connection()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+if __name__ == '__main__':
+    main()
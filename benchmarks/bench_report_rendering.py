@@ -0,0 +1,122 @@
+"""
+Benchmark rendering a large Daily report: one widget tree per row versus
+the RecycleView used by ReportsScreen.
+
+Measures the time from handing the rows to the UI until the first frame
+showing them has been flipped to the screen, and the peak Python memory
+allocated meanwhile (tracemalloc; GPU textures are not included).
+
+Needs Kivy and a display (or a virtual one such as xvfb-run).
+"""
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+
+from common import ITEMS, ROOT_DIR
+
+from kivy.app import App
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.lang import Builder
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.label import Label
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.scrollview import ScrollView
+
+from models.visit import Visit
+from screens.reports import REPORT_LAYOUTS, report_rows
+
+def synthetic_daily_visits(count):
+    """Visits like get_daily_visits results."""
+    return [
+        Visit(i, str(i % 5000 + 1), '2024-05-01', ITEMS[i % len(ITEMS)], f"Devotee {i % 5000 + 1}")
+        for i in range(count, 0, -1)
+    ]
+
+def widget_rows(visits):
+    """The previous ReportsScreen rendering: a BoxLayout and 3 Labels per row."""
+    scroll = ScrollView()
+    grid = GridLayout(cols=1, size_hint_y=None, spacing=5)
+    grid.bind(minimum_height=grid.setter('height'))
+    for visit in visits:
+        row = BoxLayout(orientation='horizontal', size_hint_y=None, height='40dp', spacing=5)
+        row.add_widget(Label(text=str(visit.devotee_id), size_hint_x=0.25))
+        row.add_widget(Label(text=str(visit.devotee_name), size_hint_x=0.4))
+        row.add_widget(Label(text=visit.selected_item, size_hint_x=0.35))
+        grid.add_widget(row)
+    scroll.add_widget(grid)
+    return scroll
+
+def recycle_rows(visits):
+    """The RecycleView rendering used by ReportsScreen."""
+    view = RecycleView(viewclass='ReportRow')
+    layout = RecycleBoxLayout(
+        orientation='vertical',
+        default_size=(None, 40),
+        default_size_hint=(1, None),
+        size_hint_y=None,
+        spacing=5
+    )
+    layout.bind(minimum_height=layout.setter('height'))
+    view.add_widget(layout)
+    widths = [width for _, width in REPORT_LAYOUTS['Daily'][0]]
+    view.data = [{'texts': texts, 'widths': widths} for texts in report_rows('Daily', visits)]
+    return view
+
+class ReportBenchmarkApp(App):
+
+    def __init__(self, rows, **kwargs):
+        super(ReportBenchmarkApp, self).__init__(**kwargs)
+        self.visits = synthetic_daily_visits(rows)
+        self.modes = [('widget per row', widget_rows), ('RecycleView', recycle_rows)]
+        self.results = []
+
+    def build(self):
+        # Registers the ReportRow view class
+        Builder.load_file(os.path.join(ROOT_DIR, 'jainapp.kv'))
+        self.container = BoxLayout()
+        return self.container
+
+    def on_start(self):
+        Clock.schedule_once(lambda dt: self.run_next(), 0.5)
+
+    def run_next(self):
+        if not self.modes:
+            self.stop()
+            return
+        name, render = self.modes.pop(0)
+        self.container.clear_widgets()
+        gc.collect()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        self.container.add_widget(render(self.visits))
+
+        def on_flip(*args):
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            Window.unbind(on_flip=on_flip)
+            self.results.append((name, elapsed, peak))
+            Clock.schedule_once(lambda dt: self.run_next(), 0.5)
+
+        Window.bind(on_flip=on_flip)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    app = ReportBenchmarkApp(args.rows)
+    app.run()
+
+    print(f"\n{args.rows:,} row Daily report")
+    for name, elapsed, peak in app.results:
+        print(f"{name:<20} first paint {elapsed * 1000:>9.1f} ms   peak memory {peak / 1024 / 1024:>7.1f} MB")
+
+if __name__ == '__main__':
+    main()
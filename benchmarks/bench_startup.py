@@ -0,0 +1,43 @@
+"""
+Benchmark DatabaseHandler startup: connecting plus setup_database.
+
+A cold start applies every migration to an empty file; a warm start
+should only read PRAGMA user_version.
+"""
+import argparse
+import os
+import time
+
+from common import report, temp_db_path
+
+from database.db_handler import DatabaseHandler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    path = temp_db_path()
+    start = time.perf_counter()
+    db = DatabaseHandler(path)
+    db.setup_database()
+    db.close_connection()
+    report('cold start (all migrations)', time.perf_counter() - start)
+
+    statements = []
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        db = DatabaseHandler(path)
+        with db.pool.write_connection() as conn:
+            conn.set_trace_callback(statements.append)
+        db.setup_database()
+        elapsed = time.perf_counter() - start
+        db.close_connection()
+        best = elapsed if best is None else min(best, elapsed)
+    report('warm start', best, f"{len(statements) // args.repeat} statement(s) per start")
+
+    os.remove(path)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark kiosk sync over HTTP on localhost.
+
+A SyncServer runs on one database in a background thread. Kiosk A
+records batches of visits and syncs after each batch; kiosk B then syncs
+and receives them. Reports the latency of each side's sync and the bytes
+sent and received per 1k visits, compressed and uncompressed.
+"""
+import argparse
+import gzip
+import os
+import shutil
+import tempfile
+
+from common import synthetic_visits, report, timed
+
+from database.db_handler import DatabaseHandler
+from database.sync import SyncClient, SyncServer, encode_batch
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--visits', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='jaintemple-bench-')
+    handlers = {}
+    for name in ('server', 'kiosk_a', 'kiosk_b'):
+        handlers[name] = DatabaseHandler(os.path.join(work_dir, f'{name}.db'))
+        handlers[name].setup_database()
+    server = SyncServer(handlers['server'], port=0)
+    url = server.start_in_thread()
+    client_a = SyncClient(handlers['kiosk_a'], url)
+    client_b = SyncClient(handlers['kiosk_b'], url)
+    client_a.sync()
+    client_b.sync()
+
+    seed = 0
+    for count in args.visits:
+        push_times, pull_times, sent, received = [], [], 0, 0
+        for _ in range(args.rounds):
+            seed += 1
+            handlers['kiosk_a'].record_visits(
+                (devotee_id, item, date)
+                for devotee_id, date, item in synthetic_visits(count, seed=seed)
+            )
+            result = client_a.sync()
+            push_times.append(result['seconds'])
+            sent += result['bytes_sent']
+            result = client_b.sync()
+            pull_times.append(result['seconds'])
+            received += result['bytes_received']
+            assert result['visits_added'] == count
+
+        per_1k = 1000 / (count * args.rounds)
+        report(f"{count:>6,} visits: kiosk A sync (push)", min(push_times),
+               f"{sent * per_1k / 1024:.1f} KB sent per 1k visits")
+        report(f"{count:>6,} visits: kiosk B sync (pull)", min(pull_times),
+               f"{received * per_1k / 1024:.1f} KB received per 1k visits")
+
+    # What the same 1k entries take without compression
+    db = handlers['kiosk_a']
+    after = db.last_change_seq() - 1000
+    seconds, (payload, entries, _) = timed(encode_batch, db, after, 1000)
+    report("encode a 1k entry batch", seconds, f"{len(payload) / 1024:.1f} KB gzip, "
+           f"{len(gzip.decompress(payload)) / 1024:.1f} KB uncompressed")
+
+    client_a.close()
+    client_b.close()
+    server.stop()
+    for db in handlers.values():
+        db.close_connection()
+    shutil.rmtree(work_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark visit analytics: Python loops over fetched tuples, SQL GROUP BY
+queries, and the columnar VisitBatch.
+
+Each path computes visit counts by day, month, item and devotee over the
+whole visits table. Also reports the memory the loaded rows hold.
+"""
+import argparse
+import gc
+import os
+import shutil
+import tracemalloc
+
+from common import populate, report, temp_db_path, timed
+
+from database.db_handler import DatabaseHandler
+from utils import visit_batch
+from utils.visit_batch import VisitBatch
+
+GROUP_BY_SQL = {
+    'day': "SELECT visit_date, COUNT(*) FROM visits GROUP BY visit_date",
+    'month': "SELECT substr(visit_date, 1, 7), COUNT(*) FROM visits GROUP BY 1",
+    'item': "SELECT selected_item, COUNT(*) FROM visits GROUP BY selected_item",
+    'devotee': "SELECT devotee_id, COUNT(*) FROM visits GROUP BY devotee_id",
+}
+
+def fetch_tuples(db):
+    """The current report path: one tuple per visit."""
+    with db.pool.reader() as cursor:
+        return cursor.execute("SELECT visit_date, selected_item, devotee_id FROM visits").fetchall()
+
+def tuple_group_bys(rows):
+    """Count by day, month, item and devotee with a Python loop per row."""
+    by_day, by_month, by_item, by_devotee = {}, {}, {}, {}
+    for visit_date, item, devotee_id in rows:
+        by_day[visit_date] = by_day.get(visit_date, 0) + 1
+        month = visit_date[:7]
+        by_month[month] = by_month.get(month, 0) + 1
+        by_item[item] = by_item.get(item, 0) + 1
+        by_devotee[devotee_id] = by_devotee.get(devotee_id, 0) + 1
+    return by_day, by_month, by_item, by_devotee
+
+def sql_group_bys(db):
+    """Let SQLite count, one GROUP BY query per analysis."""
+    with db.pool.reader() as cursor:
+        return [cursor.execute(sql).fetchall() for sql in GROUP_BY_SQL.values()]
+
+def batch_group_bys(batch):
+    """Count with the columnar batch."""
+    return (batch.count_by_day(), batch.count_by_month(),
+            batch.count_by_item(), batch.count_by_devotee())
+
+def held_memory(func, *args):
+    """Memory held by the result of func, measured with tracemalloc."""
+    gc.collect()
+    tracemalloc.start()
+    result = func(*args)
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return held
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    db = DatabaseHandler(temp_db_path())
+    db.setup_database()
+    with db.pool.write_connection() as conn:
+        populate(conn, visits=args.rows, devotees=5000)
+    print(f"{args.rows:,} visits, NumPy {'used' if visit_batch.numpy is not None else 'not installed'}")
+
+    load_time, rows = timed(fetch_tuples, db, repeat=args.repeat)
+    group_time, _ = timed(tuple_group_bys, rows, repeat=args.repeat)
+    report("tuples: fetchall", load_time)
+    report("tuples: 4 group-bys in Python", group_time, f"total {(load_time + group_time) * 1000:.0f} ms")
+    del rows
+
+    sql_time, _ = timed(sql_group_bys, db, repeat=args.repeat)
+    report("SQL: 4 GROUP BY queries", sql_time)
+
+    load_time, batch = timed(VisitBatch.load, db, repeat=args.repeat)
+    group_time, _ = timed(batch_group_bys, batch, repeat=args.repeat)
+    report("VisitBatch: load", load_time)
+    report("VisitBatch: 4 group-bys", group_time, f"total {(load_time + group_time) * 1000:.0f} ms")
+    year = batch.between('2020-01-01', '2021-01-01')
+    slice_time, _ = timed(lambda: batch_group_bys(batch.between('2020-01-01', '2021-01-01')), repeat=args.repeat)
+    report("VisitBatch: slice one year + 4 group-bys", slice_time, f"{len(year):,} visits")
+    del batch, year
+
+    tuples_held = held_memory(fetch_tuples, db)
+    batch_held = held_memory(VisitBatch.load, db)
+    report("memory: tuples", 0, f"{tuples_held / 1024 / 1024:.1f} MB, {tuples_held / args.rows:.0f} B per visit")
+    report("memory: VisitBatch", 0, f"{batch_held / 1024 / 1024:.1f} MB, {batch_held / args.rows:.1f} B per visit")
+
+    db.close_connection()
+    shutil.rmtree(os.path.dirname(db.db_path))
+
+if __name__ == '__main__':
+    main()
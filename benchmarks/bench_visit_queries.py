@@ -0,0 +1,99 @@
+"""
+Benchmark the monthly/yearly/calendar report queries.
+
+Compares the old `visit_date LIKE 'YYYY-MM-%'` scans on an unindexed
+visits table, indexed half-open range queries over visits, and the
+DatabaseHandler methods, which read the visit_daily_counts rollup.
+"""
+import argparse
+import datetime
+import sqlite3
+
+from common import populate, report, temp_db_path, timed
+
+from database.db_handler import DatabaseHandler, month_date_range, year_date_range
+from database.migrations import _add_visit_date_indexes
+
+LEGACY_MONTHLY = """
+    SELECT v.visit_date, COUNT(*) FROM visits v
+    WHERE v.visit_date LIKE ? GROUP BY v.visit_date ORDER BY v.visit_date
+"""
+LEGACY_YEARLY = """
+    SELECT strftime('%m', v.visit_date) as month, COUNT(*) FROM visits v
+    WHERE v.visit_date LIKE ? GROUP BY month ORDER BY month
+"""
+LEGACY_CALENDAR = """
+    SELECT v.visit_date FROM visits v
+    WHERE v.devotee_id = ? AND v.visit_date LIKE ? ORDER BY v.visit_date
+"""
+RANGE_MONTHLY = """
+    SELECT v.visit_date, COUNT(*) FROM visits v
+    WHERE v.visit_date >= ? AND v.visit_date < ?
+    GROUP BY v.visit_date ORDER BY v.visit_date
+"""
+RANGE_YEARLY = """
+    SELECT strftime('%m', v.visit_date) as month, COUNT(*) FROM visits v
+    WHERE v.visit_date >= ? AND v.visit_date < ?
+    GROUP BY month ORDER BY month
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=5000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db = DatabaseHandler(temp_db_path())
+    db.setup_database()
+    raw = sqlite3.connect(db.db_path)
+    raw.execute("DROP INDEX IF EXISTS idx_visits_visit_date")
+    raw.execute("DROP INDEX IF EXISTS idx_visits_devotee_date")
+
+    print(f"Loading {args.rows:,} synthetic visits into {db.db_path}")
+    populate(raw, visits=args.rows)
+
+    today = datetime.date.today()
+    year, month = today.year, today.month
+    month_pattern = f"{year}-{month:02d}-%"
+
+    def raw_query(sql, params):
+        return raw.execute(sql, params).fetchall()
+
+    print("\nLIKE scans, no secondary index")
+    legacy_results = [
+        ('monthly', timed(raw_query, LEGACY_MONTHLY, (month_pattern,), repeat=args.repeat)),
+        ('yearly', timed(raw_query, LEGACY_YEARLY, (f"{year}-%",), repeat=args.repeat)),
+        ('calendar', timed(raw_query, LEGACY_CALENDAR, ('42', month_pattern), repeat=args.repeat)),
+    ]
+    for name, (seconds, _) in legacy_results:
+        report(name, seconds)
+
+    # Recreate the indexes the benchmark dropped
+    _add_visit_date_indexes(raw.cursor())
+    raw.execute("ANALYZE")
+    raw.commit()
+
+    print("\nIndexed half-open ranges over visits")
+    range_results = [
+        ('monthly', timed(raw_query, RANGE_MONTHLY, month_date_range(year, month), repeat=args.repeat)),
+        ('yearly', timed(raw_query, RANGE_YEARLY, year_date_range(year), repeat=args.repeat)),
+    ]
+    for (name, (old, old_rows)), (_, (new, new_rows)) in zip(legacy_results, range_results):
+        assert old_rows == new_rows, name
+        report(name, new, f"speedup x{old / new:.1f}")
+
+    print("\nDatabaseHandler (visit_daily_counts rollup, indexed calendar)")
+    handler_results = [
+        ('monthly', timed(db.get_monthly_visits, year, month, repeat=args.repeat)),
+        ('yearly', timed(db.get_yearly_visits, year, repeat=args.repeat)),
+        ('calendar', timed(db.get_attendance_calendar, '42', year, month, repeat=args.repeat)),
+    ]
+    for (name, (old, old_rows)), (_, (new, new_rows)) in zip(legacy_results, handler_results):
+        assert len(old_rows) == len(new_rows), name
+        report(name, new, f"speedup x{old / new:.1f}")
+
+    raw.close()
+    db.close_connection()
+
+if __name__ == '__main__':
+    main()
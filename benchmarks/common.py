@@ -0,0 +1,98 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The benchmarks are plain scripts, run from the repository root, e.g.:
+
+    python benchmarks/bench_visit_queries.py --rows 5000000
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Make the app packages importable when a script is run directly
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+ITEMS = [
+    "Swamivatsalya", "Sadavrata", "Jñāna Dāna", "Auṣadha Dāna",
+    "Abhaya Dāna", "Vaiyāvṛttya", "Jinālaya Jīrṇoddhāra", "Pratimā",
+    "Pūjā", "Upavāsa", "Santhārā", "Saṃyama", "Tapasya",
+    "Tyāga", "Brahmacārya", "Kṣamā", "Ahiṃsā", "Satya"
+]
+
+def temp_db_path(name='bench.db'):
+    """Return a database path inside a fresh temporary directory."""
+    return os.path.join(tempfile.mkdtemp(prefix='jaintemple-bench-'), name)
+
+def synthetic_visits(count, devotees=5000, days=3650, seed=42):
+    """
+    Generate (devotee_id, visit_date, selected_item) tuples.
+
+    Args:
+        count: Number of visits to generate
+        devotees: Number of distinct devotee IDs
+        days: Number of days (ending today) the visits are spread over
+        seed: Random seed so runs are comparable
+    """
+    rng = random.Random(seed)
+    first_day = datetime.date.today().toordinal() - days + 1
+    for _ in range(count):
+        yield (
+            str(rng.randrange(1, devotees + 1)),
+            datetime.date.fromordinal(first_day + rng.randrange(days)).isoformat(),
+            rng.choice(ITEMS)
+        )
+
+def synthetic_devotees(count):
+    """Generate (id, name, phone, email, address) tuples."""
+    for i in range(1, count + 1):
+        yield (
+            str(i),
+            f"Devotee {i}",
+            f"98{i:08d}",
+            f"devotee{i}@example.com",
+            f"{i} Temple Road"
+        )
+
+def populate(conn, visits=0, devotees=0, batch=100000):
+    """Bulk load synthetic devotees and visits into an open connection."""
+    if devotees:
+        conn.executemany(
+            "INSERT OR IGNORE INTO devotees (id, name, phone, email, address) VALUES (?, ?, ?, ?, ?)",
+            synthetic_devotees(devotees)
+        )
+        conn.commit()
+    rows = synthetic_visits(visits, devotees=max(devotees, 5000))
+    remaining = visits
+    while remaining > 0:
+        chunk = [next(rows) for _ in range(min(batch, remaining))]
+        conn.executemany(
+            "INSERT INTO visits (devotee_id, visit_date, selected_item) VALUES (?, ?, ?)",
+            chunk
+        )
+        conn.commit()
+        remaining -= len(chunk)
+
+def timed(func, *args, repeat=5, **kwargs):
+    """
+    Run a callable several times.
+
+    Returns:
+        Tuple (best seconds, last result)
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def report(label, seconds, extra=''):
+    """Print one aligned benchmark result line."""
+    print(f"{label:<48} {seconds * 1000:>10.2f} ms  {extra}")
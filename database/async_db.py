@@ -0,0 +1,136 @@
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+# Queue sentinel that tells the worker thread to shut down
+_STOP = object()
+
+class AsyncDatabase:
+    """
+    Runs DatabaseHandler calls on a dedicated worker thread.
+
+    The handler is shared with the rest of the app; on the worker it reads
+    through the worker's own pooled connection, so the Kivy main thread
+    never waits on a query. Calls are queued with submit(), which returns
+    a concurrent.futures.Future; an optional callback receives the result
+    on the Kivy main thread via Clock.schedule_once. Between calls and
+    while idle the worker commits visits buffered by the handler's group
+    commit writer once their delay has elapsed.
+    """
+
+    def __init__(self, db, schedule=None):
+        """
+        Start the worker thread.
+
+        Args:
+            db: DatabaseHandler whose methods are run on the worker
+            schedule: Function used to run callbacks on the UI thread,
+                defaults to kivy.clock.Clock.schedule_once
+        """
+        if schedule is None:
+            from kivy.clock import Clock
+            schedule = Clock.schedule_once
+        self.db = db
+        self._schedule = schedule
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run,
+            name='db-worker',
+            daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, method, *args, callback=None, error_callback=None, **kwargs):
+        """
+        Queue a DatabaseHandler method call on the worker thread.
+
+        Args:
+            method: Name of the DatabaseHandler method, e.g. 'get_devotee',
+                or a function to run on the worker, for work that makes
+                several queries (e.g. ItemSelector.select_random_item)
+            *args, **kwargs: Arguments for the method
+            callback: Called on the UI thread with the result
+            error_callback: Called on the UI thread with the exception if
+                the call raised; errors are printed when not given
+
+        Returns:
+            concurrent.futures.Future for the result
+        """
+        future = Future()
+        self._queue.put((future, method, args, kwargs, callback, error_callback))
+        return future
+
+    def flush(self, timeout=1):
+        """
+        Run queued calls and commit buffered visits, blocking until done.
+
+        Safe to call from app lifecycle callbacks such as on_pause: if the
+        worker is still busy after timeout seconds, the buffered visits
+        are committed from the calling thread instead (the group commit
+        writer has its own lock), and calls still queued run later.
+
+        Args:
+            timeout: Seconds to wait for the worker
+
+        Returns:
+            Boolean indicating the buffered visits were written
+        """
+        try:
+            return self.submit('flush').result(timeout)
+        except FutureTimeoutError:
+            print(f"Database worker busy for {timeout}s, committing buffered visits directly")
+        except Exception as e:
+            print(f"Database worker error in flush: {e}")
+        return self.db.flush()
+
+    def stop(self, timeout=5):
+        """Finish queued calls and stop the worker."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _run(self):
+        """Worker thread main loop."""
+        db = self.db
+        while True:
+            try:
+                job = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                job = None
+
+            if job is _STOP:
+                break
+            if job is not None:
+                self._run_job(job)
+            # Commit buffered visits whose delay has elapsed, after every
+            # job as well as when idle, so a steady stream of calls cannot
+            # hold them back
+            db.flush_if_due()
+
+        db.flush()
+        db.pool.release_thread_connection()
+
+    def _run_job(self, job):
+        """Run one queued call and deliver its result."""
+        future, method, args, kwargs, callback, error_callback = job
+        if not future.set_running_or_notify_cancel():
+            return
+        if callable(method):
+            func, name = method, getattr(method, '__name__', method)
+        else:
+            func, name = getattr(self.db, method), method
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+            self._deliver(error_callback, e, f"Database worker error in {name}: {e}")
+        else:
+            future.set_result(result)
+            self._deliver(callback, result)
+
+    def _deliver(self, callback, value, message=None):
+        """Hand a result or error to the UI thread."""
+        if callback:
+            self._schedule(lambda dt: callback(value), 0)
+        elif message:
+            print(message)
@@ -0,0 +1,189 @@
+import datetime
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+
+# jaintemple-20240501-183000.db, optionally with a label and .gz suffix
+BACKUP_NAME = re.compile(r'^jaintemple-(\d{8}-\d{6})(?:-[a-z-]+)?\.db(\.gz)?$')
+
+class BackupManager:
+    """
+    Hot backups of the app database and restores from them.
+
+    Backups are taken with the SQLite backup API while the app keeps
+    running (see ConnectionPool.backup_to), optionally gzip compressed,
+    and only the newest `keep` backups are kept.
+    """
+
+    def __init__(self, db, backup_dir=None, keep=7, compress=True, pages_per_step=256):
+        """
+        Initialize the manager.
+
+        Args:
+            db: DatabaseHandler of the database to back up
+            backup_dir: Folder for backup files, defaults to a backups
+                folder next to the database
+            keep: Number of backups kept by rotation; 0 keeps all
+            compress: gzip new backups
+            pages_per_step: Database pages copied per backup step
+        """
+        self.db = db
+        self.backup_dir = backup_dir or os.path.join(
+            os.path.dirname(os.path.abspath(db.db_path)), 'backups'
+        )
+        self.keep = keep
+        self.compress = compress
+        self.pages_per_step = pages_per_step
+
+    def create_backup(self, label='', progress=None, rotate=True):
+        """
+        Back up the database.
+
+        Args:
+            label: Optional lowercase tag added to the file name
+            progress: Optional progress(copied_pages, total_pages)
+            rotate: Delete old backups beyond `keep` afterwards
+
+        Returns:
+            Path of the new backup file
+        """
+        os.makedirs(self.backup_dir, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        name = f"jaintemple-{stamp}{'-' + label if label else ''}.db"
+        path = os.path.join(self.backup_dir, name)
+        part_path = path + '.part'
+
+        # Buffered visits belong in the backup
+        self.db.flush()
+
+        def report(remaining, total):
+            if progress:
+                progress(total - remaining, total)
+
+        try:
+            target = sqlite3.connect(part_path)
+            try:
+                self.db.pool.backup_to(target, pages=self.pages_per_step, progress=report)
+            finally:
+                target.close()
+
+            if self.compress:
+                with open(part_path, 'rb') as src, gzip.open(path + '.gz.part', 'wb', compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.remove(part_path)
+                part_path, path = path + '.gz.part', path + '.gz'
+            os.replace(part_path, path)
+        except BaseException:
+            for leftover in (part_path, path + '.gz.part'):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+            raise
+
+        if rotate:
+            self.rotate()
+        return path
+
+    def list_backups(self):
+        """
+        List the backup files, newest first.
+
+        Returns:
+            List of (path, size_in_bytes, created datetime) tuples
+        """
+        if not os.path.isdir(self.backup_dir):
+            return []
+        backups = []
+        for name in os.listdir(self.backup_dir):
+            match = BACKUP_NAME.match(name)
+            if match:
+                path = os.path.join(self.backup_dir, name)
+                created = datetime.datetime.strptime(match.group(1), '%Y%m%d-%H%M%S')
+                backups.append((path, os.path.getsize(path), created))
+        backups.sort(key=lambda backup: (backup[2], backup[0]), reverse=True)
+        return backups
+
+    def rotate(self):
+        """
+        Delete all but the newest `keep` backups.
+
+        Returns:
+            List of deleted paths
+        """
+        if self.keep <= 0:
+            return []
+        deleted = []
+        for path, _, _ in self.list_backups()[self.keep:]:
+            os.remove(path)
+            deleted.append(path)
+        return deleted
+
+    def restore(self, backup_path, progress=None):
+        """
+        Replace the database contents with a backup.
+
+        The backup is checked before anything is overwritten, and the
+        current database is backed up first (labelled pre-restore), so a
+        restore can be undone. The restored database is migrated to the
+        current schema and the handler's caches are reset.
+
+        Args:
+            backup_path: Backup file, plain or .gz
+            progress: Optional progress(copied_pages, total_pages)
+
+        Raises:
+            ValueError: The file is not a usable database backup
+            sqlite3.Error, OSError: The restore failed
+        """
+        if not os.path.isfile(backup_path):
+            raise ValueError(f"Backup file not found: {backup_path}")
+        temp_path = None
+        source_path = backup_path
+        if backup_path.endswith('.gz'):
+            handle, temp_path = tempfile.mkstemp(suffix='.db', dir=self.backup_dir)
+            with os.fdopen(handle, 'wb') as dst, gzip.open(backup_path, 'rb') as src:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            source_path = temp_path
+
+        try:
+            source = sqlite3.connect(source_path)
+            try:
+                self._check_backup(source)
+                # Not rotated yet: rotation could delete the backup being restored
+                self.create_backup(label='pre-restore', rotate=False)
+
+                def report(status, remaining, total):
+                    if progress:
+                        progress(total - remaining, total)
+
+                self.db.flush()
+                with self.db.pool.write_connection() as conn:
+                    source.backup(conn, pages=self.pages_per_step, progress=report)
+            finally:
+                source.close()
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        self.rotate()
+        # An older backup may predate some migrations
+        self.db.setup_database()
+        self.db.devotee_cache.clear()
+        self.db.items_version += 1
+
+    def _check_backup(self, conn):
+        """Raise ValueError unless conn holds an intact app database."""
+        try:
+            result = conn.execute("PRAGMA quick_check").fetchone()
+            tables = {row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            )}
+        except sqlite3.DatabaseError as e:
+            raise ValueError(f"Not a database backup: {e}")
+        if not result or result[0] != 'ok':
+            raise ValueError(f"Backup is damaged: {result[0] if result else 'no result'}")
+        missing = {'devotees', 'visits', 'items'} - tables
+        if missing:
+            raise ValueError(f"Backup is missing tables: {', '.join(sorted(missing))}")
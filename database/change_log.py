@@ -0,0 +1,280 @@
+"""
+Incremental backups from the change_log table.
+
+export_changes() writes the change_log entries added since the last
+export to a gzip compressed JSON Lines file and moves the checkpoint, so
+each export costs time proportional to the activity since the previous
+one. apply_changes() replays such files, in order, onto a database
+restored from a full backup of the same device. Files of other kiosks
+are taken in with database.merge instead, which matches visits by their
+origin rather than by the other kiosk's local ids.
+
+File layout: a header line
+
+    {"format": "jaintemple-changes", "version": 1, "device_id": ...,
+     "from_seq": 120, "to_seq": 250, ...}
+
+followed by one line per change:
+
+    {"seq": 121, "table": "visits", "op": "I", "key": "5031",
+     "data": {"id": 5031, ...}, "origin": ..., "at": "2024-05-01 09:12:44"}
+
+"data" is the row after the change; for deletes it is null, or for visits
+just the visit's origin and origin_id (see database.merge).
+"""
+import datetime
+import gzip
+import json
+import os
+
+from database.migrations import SCHEMA_VERSION
+
+FILE_FORMAT = 'jaintemple-changes'
+FILE_VERSION = 1
+
+# Settings keys: last exported seq, and per source device the last applied seq
+CHECKPOINT_KEY = 'change_log_checkpoint'
+APPLIED_KEY = 'change_log_applied_{device_id}'
+
+# Upserts that fire the UPDATE triggers, so the visit rollups stay right
+# (INSERT OR REPLACE would delete without firing DELETE triggers)
+APPLY_SQL = {
+    ('devotees', 'I'): """
+        INSERT INTO devotees (id, name, phone, email, address, created_at)
+        VALUES (:id, :name, :phone, :email, :address, :created_at)
+        ON CONFLICT (id) DO UPDATE SET
+            name = excluded.name, phone = excluded.phone,
+            email = excluded.email, address = excluded.address
+    """,
+    ('devotees', 'D'): "DELETE FROM devotees WHERE id = :key",
+    ('visits', 'I'): """
+        INSERT INTO visits (id, devotee_id, visit_date, selected_item, origin, origin_id)
+        VALUES (:id, :devotee_id, :visit_date, :selected_item, :origin, :origin_id)
+        ON CONFLICT (id) DO UPDATE SET
+            devotee_id = excluded.devotee_id, visit_date = excluded.visit_date,
+            selected_item = excluded.selected_item, origin = excluded.origin,
+            origin_id = excluded.origin_id
+    """,
+    ('visits', 'D'): "DELETE FROM visits WHERE id = :key",
+}
+APPLY_SQL[('devotees', 'U')] = APPLY_SQL[('devotees', 'I')]
+APPLY_SQL[('visits', 'U')] = APPLY_SQL[('visits', 'I')]
+
+def format_entry(row):
+    """
+    Format a change_log row as one line of a change file.
+
+    Args:
+        row: (seq, table_name, op, row_key, data, origin, changed_at)
+
+    Returns:
+        The JSON line, newline terminated
+    """
+    seq, table, op, key, data, origin, changed_at = row
+    # data is already JSON text; embed it without reparsing
+    return (
+        f'{{"seq": {seq}, "table": {json.dumps(table)}, "op": {json.dumps(op)}, '
+        f'"key": {json.dumps(key)}, "data": {data or "null"}, '
+        f'"origin": {json.dumps(origin)}, "at": {json.dumps(changed_at)}}}\n'
+    )
+
+def export_changes(db, export_dir=None, since=None, page_size=5000):
+    """
+    Write the change_log entries after a checkpoint to a file.
+
+    Args:
+        db: DatabaseHandler to export from
+        export_dir: Output folder, defaults to the backups folder next to
+            the database
+        since: Sequence number to export after; None continues from the
+            stored checkpoint, which is then advanced
+        page_size: Entries read per query
+
+    Returns:
+        Tuple (path, entries); path is None if there was nothing to export
+    """
+    use_checkpoint = since is None
+    if use_checkpoint:
+        since = int(db.get_setting(CHECKPOINT_KEY, 0))
+    to_seq = db.last_change_seq()
+    if to_seq <= since:
+        return None, 0
+
+    export_dir = export_dir or os.path.join(
+        os.path.dirname(os.path.abspath(db.db_path)), 'backups'
+    )
+    os.makedirs(export_dir, exist_ok=True)
+    device_id = db.get_device_id()
+    path = os.path.join(
+        export_dir, f"changes-{device_id}-{since + 1:010d}-{to_seq:010d}.jsonl.gz"
+    )
+    part_path = path + '.part'
+
+    entries = 0
+    try:
+        with gzip.open(part_path, 'wt', encoding='utf-8', compresslevel=6) as out:
+            header = {
+                'format': FILE_FORMAT,
+                'version': FILE_VERSION,
+                'schema_version': SCHEMA_VERSION,
+                'device_id': device_id,
+                'from_seq': since,
+                'to_seq': to_seq,
+                'exported_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            }
+            out.write(json.dumps(header) + '\n')
+            after = since
+            while after is not None:
+                rows, after = db.iter_changes(after, page_size)
+                for row in rows:
+                    # Entries added after to_seq are left for the next export
+                    if row[0] > to_seq:
+                        after = None
+                        break
+                    out.write(format_entry(row))
+                    entries += 1
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+    if use_checkpoint:
+        db.set_setting(CHECKPOINT_KEY, to_seq)
+    return path, entries
+
+class ChangeEntries:
+    """
+    Iterator over the entries of an open change file.
+
+    close() closes the file whether or not iteration has started, so a
+    file refused after reading its header is not left open.
+    """
+
+    def __init__(self, handle):
+        self._handle = handle
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._handle.closed:
+            raise StopIteration
+        for line in self._handle:
+            if line.strip():
+                return json.loads(line)
+        self.close()
+        raise StopIteration
+
+    def close(self):
+        """Close the change file."""
+        self._handle.close()
+
+def read_changes(path):
+    """
+    Read a change file.
+
+    Args:
+        path: File name, or a binary file object of gzip data
+
+    Returns:
+        Tuple (header dict, ChangeEntries iterator of entry dicts); the
+        file is closed when the iterator is exhausted or closed
+
+    Raises:
+        ValueError: path is not a change file this version can read
+    """
+    handle = gzip.open(path, 'rt', encoding='utf-8')
+    try:
+        header = json.loads(handle.readline() or 'null')
+    except (OSError, ValueError) as e:
+        handle.close()
+        raise ValueError(f"Not a change file: {e}")
+    if not isinstance(header, dict) or header.get('format') != FILE_FORMAT:
+        handle.close()
+        raise ValueError("Not a change file")
+    if header.get('version', 0) > FILE_VERSION:
+        handle.close()
+        raise ValueError(f"Change file version {header['version']} is not supported")
+
+    return header, ChangeEntries(handle)
+
+def apply_changes(db, path, force=False):
+    """
+    Replay a change file onto the database in one transaction.
+
+    Only this device's own files are accepted, e.g. when recovering from
+    a full backup: entries are replayed by their local ids, which would
+    overwrite unrelated rows of another device. Entries are applied at
+    most once and in sequence order: entries up to the last applied seq,
+    which starts at the backup's export checkpoint, are skipped, and a
+    file that starts after it (earlier changes are missing) is refused
+    unless force is set.
+
+    Args:
+        db: DatabaseHandler to apply to
+        path: Change file written by export_changes
+        force: Apply even if earlier changes of the device are missing
+
+    Returns:
+        Number of entries applied
+
+    Raises:
+        ValueError: Not a change file, another device's file, or earlier
+            changes are missing
+        sqlite3.Error: The changes could not be written
+    """
+    header, entries = read_changes(path)
+    device_id = header['device_id']
+    if device_id != db.get_device_id():
+        entries.close()
+        raise ValueError(
+            f"Changes of another device ({device_id}); use merge to take them in"
+        )
+    applied_key = APPLIED_KEY.format(device_id=device_id)
+    last_applied = int(db.get_setting(applied_key, db.get_setting(CHECKPOINT_KEY, 0)))
+    if header['from_seq'] > last_applied and not force:
+        entries.close()
+        raise ValueError(
+            f"Changes {last_applied + 1}-{header['from_seq']} of device {device_id} "
+            f"are missing; apply the earlier change files first"
+        )
+
+    count = 0
+    db.flush()
+    with db.pool.writer() as cursor:
+        # Log the replayed changes after the file's seqs, so the numbers
+        # in exported files stay unique
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'change_log'",
+            (header['to_seq'],)
+        )
+        if cursor.rowcount == 0:
+            # AUTOINCREMENT adds the row on the first insert only: a backup
+            # taken before anything was logged has none yet
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES ('change_log', ?)",
+                (header['to_seq'],)
+            )
+        for entry in entries:
+            sql = APPLY_SQL.get((entry['table'], entry['op']))
+            if sql is None or entry['seq'] <= last_applied:
+                continue
+            # Files written before schema 7 have no visit origin
+            params = dict({'origin': None, 'origin_id': None}, **(entry['data'] or {}))
+            params['key'] = entry['key']
+            cursor.execute(sql, params)
+            count += 1
+        cursor.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+            (applied_key, str(max(last_applied, header['to_seq'])))
+        )
+        # The replayed changes are in the file already
+        cursor.execute(
+            "INSERT OR REPLACE INTO settings (key, value) "
+            "SELECT ?, COALESCE(MAX(seq), 0) FROM change_log",
+            (CHECKPOINT_KEY,)
+        )
+
+    db.devotee_cache.clear()
+    return count
@@ -0,0 +1,228 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# PRAGMA settings applied to every new connection. A deployment picks one
+# with DatabaseHandler(profile=...) or the JAINTEMPLE_DB_PROFILE
+# environment variable. Order matters: journal_mode is set first.
+CONNECTION_PROFILES = {
+    # SQLite defaults: rollback journal and a full fsync on every commit
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+    },
+    # WAL journal; commits append to the WAL and only checkpoints fsync.
+    # Survives app crashes, may lose the last commits on power loss.
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -8000,  # in KiB, i.e. 8 MB
+        'temp_store': 'MEMORY',
+        'mmap_size': 64 * 1024 * 1024,
+    },
+    # Larger cache and memory map for desktop machines with more RAM
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'temp_store': 'MEMORY',
+        'mmap_size': 256 * 1024 * 1024,
+    },
+}
+
+DEFAULT_PROFILE = 'balanced'
+
+def resolve_profile(profile=None):
+    """
+    Pick the connection profile name to use.
+
+    Args:
+        profile: Explicit profile name, or None to use the
+            JAINTEMPLE_DB_PROFILE environment variable or DEFAULT_PROFILE
+
+    Returns:
+        A key of CONNECTION_PROFILES
+    """
+    name = profile or os.environ.get('JAINTEMPLE_DB_PROFILE') or DEFAULT_PROFILE
+    if name not in CONNECTION_PROFILES:
+        print(f"Unknown database profile '{name}', using '{DEFAULT_PROFILE}'")
+        name = DEFAULT_PROFILE
+    return name
+
+def apply_connection_profile(conn, profile):
+    """Apply the PRAGMA settings of a connection profile to a connection."""
+    for pragma, value in CONNECTION_PROFILES[profile].items():
+        result = conn.execute(f"PRAGMA {pragma} = {value}").fetchone()
+        if pragma == 'journal_mode' and result and result[0].upper() != value:
+            # e.g. WAL is not supported by the underlying file system
+            print(f"Database journal mode is {result[0]}, requested {value}")
+
+class ConnectionPool:
+    """
+    SQLite connections for a multi-threaded app.
+
+    Every thread gets its own read connection, created on first use, and
+    all writes go through a single connection serialized by a lock. With
+    a WAL profile, reports on one thread run concurrently with check-ins
+    on another. Each reader()/writer() call hands out a fresh cursor.
+
+    The pool needs a database file; ':memory:' would give every
+    connection its own empty database.
+    """
+
+    def __init__(self, db_path, profile=DEFAULT_PROFILE, timeout=10.0, cached_statements=128):
+        """
+        Initialize the pool. Connections are opened lazily.
+
+        Args:
+            db_path: Path of the database file
+            profile: Key of CONNECTION_PROFILES applied to each connection
+            timeout: Seconds to wait for a lock held by another connection
+            cached_statements: Size of each connection's prepared
+                statement cache
+        """
+        self.db_path = db_path
+        self.profile = profile
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._readers = {}
+        self._readers_lock = threading.Lock()
+        self._writer = None
+        self._write_lock = threading.RLock()
+
+    def _connect(self):
+        """Open and configure a new connection."""
+        # Connections may be closed by another thread in close()
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        apply_connection_profile(conn, self.profile)
+        return conn
+
+    def _reader_connection(self):
+        """Return the calling thread's read connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers[threading.get_ident()] = conn
+        return conn
+
+    @contextmanager
+    def reader(self, row_factory=None):
+        """
+        Context manager yielding a cursor on the thread's read connection.
+
+        Only use it for queries; writes belong in writer().
+
+        Args:
+            row_factory: Optional sqlite3 row factory for this cursor's
+                rows, e.g. Devotee.row_factory
+        """
+        cursor = self._reader_connection().cursor()
+        if row_factory is not None:
+            cursor.row_factory = row_factory
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def writer(self):
+        """
+        Context manager yielding a cursor on the shared write connection.
+
+        The block runs while holding the write lock and is committed when
+        it exits normally, or rolled back if it raises.
+        """
+        with self.write_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def write_connection(self):
+        """
+        Context manager yielding the write connection itself, under the
+        write lock, for callers that manage transactions themselves
+        (migrations, ATTACH based imports, restores).
+        """
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            yield self._writer
+
+    def backup_to(self, target, pages=256, pause=0.002, progress=None):
+        """
+        Copy the database into another connection with the SQLite backup API.
+
+        The copy is read through the write connection, a few pages per
+        step. The write lock is held during each step and released between
+        steps, so writers wait for at most one step. Because their changes
+        go through the connection the backup reads from, SQLite updates
+        the copy in place instead of restarting it, as it would for a
+        backup read from any other connection.
+
+        Args:
+            target: sqlite3.Connection to copy into
+            pages: Pages copied per step
+            pause: Seconds the write lock is left free between steps
+            progress: Optional progress(remaining_pages, total_pages)
+        """
+        held = False
+
+        def step_done(status, remaining, total):
+            nonlocal held
+            if progress:
+                progress(remaining, total)
+            self._write_lock.release()
+            held = False
+            time.sleep(pause)
+            self._write_lock.acquire()
+            held = True
+
+        self._write_lock.acquire()
+        held = True
+        try:
+            if self._writer is None:
+                self._writer = self._connect()
+            self._writer.backup(target, pages=pages, progress=step_done, sleep=pause)
+        finally:
+            if held:
+                self._write_lock.release()
+
+    def release_thread_connection(self):
+        """Close the calling thread's read connection, e.g. before a worker thread exits."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._readers_lock:
+                self._readers.pop(threading.get_ident(), None)
+            conn.close()
+
+    def close(self):
+        """Close every connection of the pool."""
+        with self._readers_lock:
+            readers, self._readers = list(self._readers.values()), {}
+        for conn in readers:
+            conn.close()
+        # Threads that still hold a closed connection reconnect on next use
+        self._local = threading.local()
+
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
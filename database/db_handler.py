@@ -1,138 +1,445 @@
 import sqlite3
 import os
+import re
 import datetime
+import threading
+import time
 from pathlib import Path
 
+from database.connection_pool import ConnectionPool, resolve_profile
+from database.devotee_cache import DevoteeCache
+from database.group_commit import GroupCommitWriter
+from database.migrations import (
+    migrate, phone_digits_sql, rebuild_devotee_search, rebuild_visit_daily_counts, search_tables
+)
+from models.devotee import Devotee
+from models.visit import Visit
+
+# Words of a devotee search query
+SEARCH_WORDS = re.compile(r'\w+')
+
+MONTH_NUMBERS = {
+    'January': 1, 'February': 2, 'March': 3, 'April': 4,
+    'May': 5, 'June': 6, 'July': 7, 'August': 8,
+    'September': 9, 'October': 10, 'November': 11, 'December': 12
+}
+
+def default_db_path():
+    """Return the platform specific path of the app database file."""
+    if os.path.exists('/storage/emulated/0/'):
+        # Android path
+        db_dir = '/storage/emulated/0/JainTempleApp'
+    else:
+        # Default path for other platforms
+        db_dir = os.path.join(os.path.expanduser('~'), 'JainTempleApp')
+    os.makedirs(db_dir, exist_ok=True)
+    return os.path.join(db_dir, 'jaintemple.db')
+
+def month_date_range(year, month):
+    """
+    Get the half-open ISO date range covering a month.
+    
+    Args:
+        year: Year as int or numeric string
+        month: Month number (1-12) or English month name
+        
+    Returns:
+        Tuple (start, end) so that start <= visit_date < end
+    """
+    month_num = month if isinstance(month, int) else MONTH_NUMBERS.get(month, 1)
+    start = datetime.date(int(year), month_num, 1)
+    if month_num == 12:
+        end = datetime.date(int(year) + 1, 1, 1)
+    else:
+        end = datetime.date(int(year), month_num + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+def iter_pages(page_method, *args, page_size=500):
+    """
+    Iterate over every row of a keyset paginated listing, one page in
+    memory at a time.
+    
+    Args:
+        page_method: Paginating DatabaseHandler method, e.g. db.iter_devotees
+        *args: Arguments passed before the continuation token
+        page_size: Rows fetched per query
+    
+    Yields:
+        Rows in listing order
+    """
+    token = None
+    while True:
+        rows, token = page_method(*args, token, page_size)
+        yield from rows
+        if token is None:
+            return
+
+def year_date_range(year):
+    """Get the half-open ISO date range (start, end) covering a year."""
+    return (datetime.date(int(year), 1, 1).isoformat(),
+            datetime.date(int(year) + 1, 1, 1).isoformat())
+
+# Every statement the handler runs, by name. Executing the exact same SQL
+# text lets sqlite3 reuse the prepared statement from the connection's
+# statement cache, which is sized to hold all of them (see QueryRegistry).
+QUERIES = {
+    'is_app_activated': "SELECT value FROM settings WHERE key = 'app_activated'",
+    'activate_app': "UPDATE settings SET value = '1' WHERE key = 'app_activated'",
+    'get_setting': "SELECT value FROM settings WHERE key = ?",
+    'set_setting': "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+    'verify_admin': "SELECT id FROM admins WHERE username = ? AND password = ?",
+    'update_admin_password': "UPDATE admins SET password = ? WHERE username = ?",
+    'add_devotee': "INSERT INTO devotees (id, name, phone, email, address) VALUES (?, ?, ?, ?, ?)",
+    'get_devotee': "SELECT * FROM devotees WHERE id = ?",
+    # Full-text search; the match expression is built by search_devotees.
+    # No ORDER BY rank: ranking every match of a one letter prefix costs
+    # tens of ms at 100k devotees, while rowid order stops at the LIMIT
+    'search_devotees': """
+        SELECT d.* FROM devotees_fts f
+        JOIN devotees d ON d.rowid = f.rowid
+        WHERE devotees_fts MATCH ?
+        LIMIT ?
+    """,
+    'search_devotees_phone': """
+        SELECT d.* FROM devotees_phone p
+        JOIN devotees d ON d.rowid = p.rowid
+        WHERE devotees_phone MATCH ?
+        LIMIT ?
+    """,
+    # Scans for SQLite builds that lack FTS5 or its trigram tokenizer
+    'search_devotees_like_name': "SELECT * FROM devotees WHERE name LIKE ? ESCAPE '\\' LIMIT ?",
+    'search_devotees_like': """
+        SELECT * FROM devotees
+        WHERE name LIKE ?1 ESCAPE '\\' OR phone LIKE ?1 ESCAPE '\\'
+            OR email LIKE ?1 ESCAPE '\\' OR address LIKE ?1 ESCAPE '\\'
+        LIMIT ?2
+    """,
+    'search_devotees_like_phone': f"""
+        SELECT * FROM devotees
+        WHERE {phone_digits_sql('phone')} LIKE ?
+        LIMIT ?
+    """,
+    'get_all_devotees': "SELECT * FROM devotees ORDER BY name",
+    # Keyset pages: each page continues after the sort key of the previous
+    # page's last row, so deep pages cost the same as the first one
+    'get_devotees_page_first': "SELECT * FROM devotees ORDER BY name, id LIMIT ?",
+    'get_devotees_page': """
+        SELECT * FROM devotees
+        WHERE (name, id) > (?, ?)
+        ORDER BY name, id
+        LIMIT ?
+    """,
+    'update_devotee': "UPDATE devotees SET name = ?, phone = ?, email = ?, address = ? WHERE id = ?",
+    'delete_devotee': "DELETE FROM devotees WHERE id = ?",
+    'insert_visit': "INSERT INTO visits (devotee_id, visit_date, selected_item) VALUES (?, ?, ?)",
+    'get_all_items': "SELECT name FROM items",
+    'get_weighted_items': "SELECT name, weight FROM items WHERE weight > 0 ORDER BY id",
+    'set_item_weight': "UPDATE items SET weight = ? WHERE name = ?",
+    'get_recent_items': """
+        SELECT selected_item FROM visits
+        WHERE devotee_id = ?
+        ORDER BY visit_date DESC, id DESC
+        LIMIT ?
+    """,
+    'add_item': "INSERT INTO items (name, description) VALUES (?, ?)",
+    'delete_item': "DELETE FROM items WHERE name = ?",
+    'get_daily_visits': """
+        SELECT v.id, v.devotee_id, v.visit_date, v.selected_item, d.name
+        FROM visits v
+        JOIN devotees d ON v.devotee_id = d.id
+        WHERE v.visit_date = ?
+        ORDER BY v.id DESC
+    """,
+    'get_visits_page': """
+        SELECT v.id, v.visit_date, v.devotee_id, d.name, v.selected_item
+        FROM visits v
+        LEFT JOIN devotees d ON v.devotee_id = d.id
+        WHERE v.id > ? AND v.visit_date >= ? AND v.visit_date < ?
+        ORDER BY v.id
+        LIMIT ?
+    """,
+    'count_visits': """
+        SELECT COALESCE(SUM(visit_count), 0)
+        FROM visit_daily_counts
+        WHERE visit_date >= ? AND visit_date < ?
+    """,
+    'count_devotee_visits': "SELECT COUNT(*) FROM visits WHERE devotee_id = ?",
+    # Joined like get_daily_visits_page, so visits of deleted devotees are
+    # left out of the count as they are left out of the report
+    'count_daily_visits': """
+        SELECT COUNT(*)
+        FROM visits v
+        JOIN devotees d ON v.devotee_id = d.id
+        WHERE v.visit_date = ?
+    """,
+    'get_changes_page': """
+        SELECT seq, table_name, op, row_key, data, origin, changed_at
+        FROM change_log
+        WHERE seq > ?
+        ORDER BY seq
+        LIMIT ?
+    """,
+    'get_last_change_seq': "SELECT COALESCE(MAX(seq), 0) FROM change_log",
+    'get_daily_visits_page_first': """
+        SELECT v.id, v.devotee_id, d.name, v.selected_item
+        FROM visits v
+        JOIN devotees d ON v.devotee_id = d.id
+        WHERE v.visit_date = ?
+        ORDER BY v.id DESC
+        LIMIT ?
+    """,
+    'get_daily_visits_page': """
+        SELECT v.id, v.devotee_id, d.name, v.selected_item
+        FROM visits v
+        JOIN devotees d ON v.devotee_id = d.id
+        WHERE v.visit_date = ? AND v.id < ?
+        ORDER BY v.id DESC
+        LIMIT ?
+    """,
+    # Monthly and yearly reports read the per-day rollup maintained by
+    # triggers on visits: at most 31 and 366 rows however many visits exist
+    'get_monthly_visits': """
+        SELECT visit_date, visit_count
+        FROM visit_daily_counts
+        WHERE visit_date >= ? AND visit_date < ?
+        ORDER BY visit_date
+    """,
+    'get_yearly_visits': """
+        SELECT strftime('%m', visit_date) as month, SUM(visit_count) as visit_count
+        FROM visit_daily_counts
+        WHERE visit_date >= ? AND visit_date < ?
+        GROUP BY month
+        ORDER BY month
+    """,
+    'get_item_counts': """
+        SELECT selected_item, SUM(visit_count) as visit_count
+        FROM visit_daily_item_counts
+        WHERE visit_date >= ? AND visit_date < ?
+        GROUP BY selected_item
+        ORDER BY visit_count DESC, selected_item
+    """,
+    'get_devotee_visits': """
+        SELECT v.id, v.devotee_id, v.visit_date, v.selected_item
+        FROM visits v
+        WHERE v.devotee_id = ?
+        ORDER BY v.visit_date DESC
+    """,
+    'get_devotee_visits_page_first': """
+        SELECT v.visit_date, v.selected_item, v.id
+        FROM visits v
+        WHERE v.devotee_id = ?
+        ORDER BY v.visit_date DESC, v.id DESC
+        LIMIT ?
+    """,
+    'get_devotee_visits_page': """
+        SELECT v.visit_date, v.selected_item, v.id
+        FROM visits v
+        WHERE v.devotee_id = ? AND (v.visit_date, v.id) < (?, ?)
+        ORDER BY v.visit_date DESC, v.id DESC
+        LIMIT ?
+    """,
+    'get_attendance_calendar': """
+        SELECT v.visit_date
+        FROM visits v
+        WHERE v.devotee_id = ? AND v.visit_date >= ? AND v.visit_date < ?
+        ORDER BY v.visit_date
+    """,
+    # Bit n-1 set when the devotee visited on day n of the month; DISTINCT
+    # counts several visits on one day once. Covered by idx_visits_devotee_date
+    'get_attendance_bitmap': """
+        SELECT COALESCE(SUM(DISTINCT 1 << (CAST(substr(visit_date, 9, 2) AS INTEGER) - 1)), 0)
+        FROM visits
+        WHERE devotee_id = ? AND visit_date >= ? AND visit_date < ?
+    """,
+    'get_attendance_month_bitmaps': """
+        SELECT CAST(substr(visit_date, 6, 2) AS INTEGER) AS month,
+               SUM(DISTINCT 1 << (CAST(substr(visit_date, 9, 2) AS INTEGER) - 1))
+        FROM visits
+        WHERE devotee_id = ? AND visit_date >= ? AND visit_date < ?
+        GROUP BY month
+    """,
+}
+
+class QueryRegistry:
+    """
+    Runs named statements and keeps per-query call counts and latency.
+    """
+    
+    # Statement cache slots kept free for SQL run outside the registry
+    # (migrations, maintenance) so it cannot evict registered statements
+    SPARE_CACHE_SLOTS = 64
+    
+    def __init__(self, queries):
+        """
+        Initialize the registry.
+        
+        Args:
+            queries: Dictionary mapping query names to SQL
+        """
+        self.queries = dict(queries)
+        self._stats = {name: [0, 0.0] for name in self.queries}
+        self._lock = threading.Lock()
+    
+    @property
+    def cache_size(self):
+        """Statement cache size that keeps every registered query prepared."""
+        return len(self.queries) + self.SPARE_CACHE_SLOTS
+    
+    def execute(self, cursor, name, params=()):
+        """Execute a named statement on a cursor and return the cursor."""
+        start = time.perf_counter()
+        cursor.execute(self.queries[name], params)
+        self._record(name, start)
+        return cursor
+    
+    def executemany(self, cursor, name, seq_of_params):
+        """Execute a named statement for every parameter tuple."""
+        start = time.perf_counter()
+        cursor.executemany(self.queries[name], seq_of_params)
+        self._record(name, start)
+        return cursor
+    
+    def fetchone(self, cursor, name, params=()):
+        """Execute a named query and return its first row, timing both."""
+        start = time.perf_counter()
+        row = cursor.execute(self.queries[name], params).fetchone()
+        self._record(name, start)
+        return row
+    
+    def fetchall(self, cursor, name, params=()):
+        """Execute a named query and return all rows, timing both."""
+        start = time.perf_counter()
+        rows = cursor.execute(self.queries[name], params).fetchall()
+        self._record(name, start)
+        return rows
+    
+    def _record(self, name, start):
+        """Add one call and its elapsed time to the query's statistics."""
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            stats = self._stats[name]
+            stats[0] += 1
+            stats[1] += elapsed
+    
+    def stats(self):
+        """
+        Get per-query statistics.
+        
+        Returns:
+            Dictionary mapping query names to dictionaries with 'calls',
+            'total_ms' and 'avg_ms', ordered by total time, highest first
+        """
+        with self._lock:
+            snapshot = [(name, calls, total) for name, (calls, total) in self._stats.items()]
+        snapshot.sort(key=lambda entry: entry[2], reverse=True)
+        return {
+            name: {
+                'calls': calls,
+                'total_ms': total * 1000,
+                'avg_ms': total * 1000 / calls if calls else 0.0
+            }
+            for name, calls, total in snapshot
+        }
+    
+    def reset_stats(self):
+        """Clear all call counts and timings."""
+        with self._lock:
+            for stats in self._stats.values():
+                stats[0], stats[1] = 0, 0.0
+
 class DatabaseHandler:
     """
     Handles all database operations for the Jain Temple app.
+    
+    The handler is safe to share between threads: reads use a per-thread
+    connection and writes are serialized on one write connection (see
+    ConnectionPool).
     """
-    def __init__(self):
+    # Devotees kept in the get_devotee cache; regular visitors fit easily
+    DEVOTEE_CACHE_SIZE = 512
+    
+    def __init__(self, db_path=None, profile=None, devotee_cache_size=None):
         # Determine the database file path
-        if os.path.exists('/storage/emulated/0/'):
-            # Android path
-            db_dir = '/storage/emulated/0/JainTempleApp'
-            os.makedirs(db_dir, exist_ok=True)
-            self.db_path = os.path.join(db_dir, 'jaintemple.db')
-        else:
-            # Default path for other platforms
-            db_dir = os.path.join(os.path.expanduser('~'), 'JainTempleApp')
-            os.makedirs(db_dir, exist_ok=True)
-            self.db_path = os.path.join(db_dir, 'jaintemple.db')
-        
-        self.conn = None
-        self.cursor = None
+        self.db_path = db_path or default_db_path()
+        self.profile = resolve_profile(profile)
+        
+        self.pool = None
+        self.visit_writer = None
+        self.queries = QueryRegistry(QUERIES)
+        if devotee_cache_size is None:
+            devotee_cache_size = self.DEVOTEE_CACHE_SIZE
+        self.devotee_cache = DevoteeCache(devotee_cache_size)
+        # Devotee search tables present in the database, found on first search
+        self._search_tables = None
+        # Bumped by every write to the items table so cached copies of the
+        # item catalogue know when to reload
+        self.items_version = 0
         self.connect()
     
     def connect(self):
-        """Establish a database connection."""
-        try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.cursor = self.conn.cursor()
-        except sqlite3.Error as e:
-            print(f"Database connection error: {e}")
+        """Set up the connection pool; connections open on first use."""
+        self.pool = ConnectionPool(
+            self.db_path,
+            self.profile,
+            cached_statements=self.queries.cache_size
+        )
     
     def setup_database(self):
-        """Set up the database schema if it doesn't exist."""
-        try:
-            # Create admins table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS admins (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            
-            # Create devotees table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS devotees (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                phone TEXT,
-                email TEXT,
-                address TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            ''')
-            
-            # Create visits table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS visits (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                devotee_id TEXT NOT NULL,
-                visit_date DATE NOT NULL,
-                selected_item TEXT NOT NULL,
-                FOREIGN KEY (devotee_id) REFERENCES devotees (id)
-            )
-            ''')
-            
-            # Create settings table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-            ''')
-            
-            # Create items table for the 18 items
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                description TEXT
-            )
-            ''')
-            
-            # Insert default admin if none exists
-            self.cursor.execute("SELECT COUNT(*) FROM admins")
-            count = self.cursor.fetchone()[0]
-            if count == 0:
-                self.cursor.execute(
-                    "INSERT INTO admins (username, password) VALUES (?, ?)",
-                    ("admin", "admin123")  # Default credentials
-                )
-            
-            # Insert app activation status if it doesn't exist
-            self.cursor.execute("SELECT COUNT(*) FROM settings WHERE key = 'app_activated'")
-            count = self.cursor.fetchone()[0]
-            if count == 0:
-                self.cursor.execute(
-                    "INSERT INTO settings (key, value) VALUES (?, ?)",
-                    ("app_activated", "0")  # 0 means not activated
-                )
-            
-            # Insert default items if none exist
-            self.cursor.execute("SELECT COUNT(*) FROM items")
-            count = self.cursor.fetchone()[0]
-            if count == 0:
-                items = [
-                    "Swamivatsalya", "Sadavrata", "Jñāna Dāna", "Auṣadha Dāna", 
-                    "Abhaya Dāna", "Vaiyāvṛttya", "Jinālaya Jīrṇoddhāra", "Pratimā",
-                    "Pūjā", "Upavāsa", "Santhārā", "Saṃyama", "Tapasya", 
-                    "Tyāga", "Brahmacārya", "Kṣamā", "Ahiṃsā", "Satya"
-                ]
-                for item in items:
-                    self.cursor.execute(
-                        "INSERT INTO items (name, description) VALUES (?, ?)",
-                        (item, f"Description for {item}")
-                    )
-            
-            self.conn.commit()
+        """Bring the database schema up to date by applying pending migrations."""
+        try:
+            with self.pool.write_connection() as conn:
+                applied = migrate(conn)
+            self._search_tables = None
+            if applied:
+                self.items_version += 1
+                print(f"Applied database migrations: {applied}")
         except sqlite3.Error as e:
             print(f"Database setup error: {e}")
     
     def close_connection(self):
-        """Close the database connection."""
-        if self.conn:
-            self.conn.close()
+        """Write any buffered visits and close all database connections."""
+        if self.pool:
+            self.flush()
+            self.pool.close()
+    
+    def enable_group_commit(self, max_rows=50, max_delay_ms=200):
+        """
+        Buffer record_visit calls and commit them in groups.
+        
+        Args:
+            max_rows: Number of buffered visits that triggers a commit
+            max_delay_ms: Maximum time a visit stays buffered; requires
+                flush_if_due() to be called periodically, as the
+                AsyncDatabase worker does
+        """
+        self.flush()
+        self.visit_writer = GroupCommitWriter(self, max_rows, max_delay_ms)
+    
+    def flush(self):
+        """Commit any visits buffered by the group commit writer."""
+        if self.visit_writer:
+            return self.visit_writer.flush()
+        return True
+    
+    def flush_if_due(self):
+        """Commit buffered visits once the group commit delay has elapsed."""
+        if self.visit_writer:
+            return self.visit_writer.flush_if_due()
+        return True
+    
+    def query_stats(self):
+        """Get call counts and cumulative latency per named query."""
+        return self.queries.stats()
+    
+    def devotee_cache_stats(self):
+        """Get hit ratio, eviction count and size of the devotee cache."""
+        return self.devotee_cache.stats()
     
     def is_app_activated(self):
         """Check if the app is activated."""
         try:
-            self.cursor.execute("SELECT value FROM settings WHERE key = 'app_activated'")
-            result = self.cursor.fetchone()
+            with self.pool.reader() as cursor:
+                result = self.queries.fetchone(cursor, 'is_app_activated')
             return result[0] == "1" if result else False
         except sqlite3.Error as e:
             print(f"Error checking app activation: {e}")
@@ -141,68 +448,198 @@ class DatabaseHandler:
     def activate_app(self):
         """Activate the app."""
         try:
-            self.cursor.execute("UPDATE settings SET value = '1' WHERE key = 'app_activated'")
-            self.conn.commit()
+            with self.pool.writer() as cursor:
+                self.queries.execute(cursor, 'activate_app')
             return True
         except sqlite3.Error as e:
             print(f"Error activating app: {e}")
             return False
     
+    def get_setting(self, key, default=None):
+        """Get a value from the settings table, or default if it is not set."""
+        try:
+            with self.pool.reader() as cursor:
+                result = self.queries.fetchone(cursor, 'get_setting', (key,))
+            return result[0] if result else default
+        except sqlite3.Error as e:
+            print(f"Error getting setting {key}: {e}")
+            return default
+    
+    def set_setting(self, key, value):
+        """Store a value in the settings table."""
+        try:
+            with self.pool.writer() as cursor:
+                self.queries.execute(cursor, 'set_setting', (key, str(value)))
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving setting {key}: {e}")
+            return False
+    
+    def get_device_id(self):
+        """Get the random ID that identifies this kiosk's changes."""
+        return self.get_setting('device_id')
+    
     def verify_admin(self, username, password):
         """Verify admin credentials."""
         try:
-            self.cursor.execute(
-                "SELECT id FROM admins WHERE username = ? AND password = ?",
-                (username, password)
-            )
-            result = self.cursor.fetchone()
+            with self.pool.reader() as cursor:
+                result = self.queries.fetchone(cursor, 'verify_admin', (username, password))
             return result is not None
         except sqlite3.Error as e:
             print(f"Admin verification error: {e}")
             return False
     
+    def update_admin_password(self, username, new_password):
+        """Set a new password for an admin."""
+        try:
+            with self.pool.writer() as cursor:
+                self.queries.execute(cursor, 'update_admin_password', (new_password, username))
+                updated = cursor.rowcount > 0
+            return updated
+        except sqlite3.Error as e:
+            print(f"Error changing password: {e}")
+            return False
+    
     def add_devotee(self, devotee_id, name, phone="", email="", address=""):
         """Add a new devotee to the database."""
         try:
-            self.cursor.execute(
-                "INSERT INTO devotees (id, name, phone, email, address) VALUES (?, ?, ?, ?, ?)",
-                (devotee_id, name, phone, email, address)
-            )
-            self.conn.commit()
+            with self.pool.writer() as cursor:
+                self.queries.execute(
+                    cursor, 'add_devotee', (devotee_id, name, phone, email, address)
+                )
+            self.devotee_cache.invalidate(devotee_id)
             return True
         except sqlite3.Error as e:
             print(f"Error adding devotee: {e}")
             return False
     
     def get_devotee(self, devotee_id):
-        """Get devotee details by ID."""
+        """Get a Devotee by ID, served from the devotee cache when possible."""
+        found, devotee = self.devotee_cache.get(devotee_id)
+        if found:
+            return devotee
+        
+        generation = self.devotee_cache.generation
         try:
-            self.cursor.execute(
-                "SELECT * FROM devotees WHERE id = ?",
-                (devotee_id,)
-            )
-            return self.cursor.fetchone()
+            with self.pool.reader(Devotee.row_factory) as cursor:
+                devotee = self.queries.fetchone(cursor, 'get_devotee', (devotee_id,))
+            self.devotee_cache.put(devotee_id, devotee, generation)
+            return devotee
         except sqlite3.Error as e:
             print(f"Error getting devotee: {e}")
             return None
     
     def get_all_devotees(self):
-        """Get all devotees."""
+        """Get all devotees as Devotee objects, ordered by name."""
         try:
-            self.cursor.execute("SELECT * FROM devotees ORDER BY name")
-            return self.cursor.fetchall()
+            with self.pool.reader(Devotee.row_factory) as cursor:
+                return self.queries.fetchall(cursor, 'get_all_devotees')
         except sqlite3.Error as e:
             print(f"Error getting all devotees: {e}")
             return []
     
+    def iter_devotees(self, after=None, limit=100):
+        """
+        Get one page of devotees ordered by name.
+        
+        Args:
+            after: Continuation token returned with the previous page, or
+                None for the first page
+            limit: Maximum number of devotees in the page
+        
+        Returns:
+            Tuple (devotees, token) with Devotee objects; token is None
+            after the last page
+        """
+        try:
+            with self.pool.reader(Devotee.row_factory) as cursor:
+                if after is None:
+                    rows = self.queries.fetchall(cursor, 'get_devotees_page_first', (limit,))
+                else:
+                    rows = self.queries.fetchall(cursor, 'get_devotees_page', (*after, limit))
+        except sqlite3.Error as e:
+            print(f"Error getting devotees page: {e}")
+            return [], None
+        
+        if len(rows) < limit:
+            return rows, None
+        # Token: sort key (name, id) of the last devotee
+        return rows, (rows[-1].name, rows[-1].id)
+    
+    def search_devotees(self, query, limit=20):
+        """
+        Find devotees as a search term is typed.
+        
+        A devotee whose ID equals the query comes first, then devotees
+        whose name has every word of the query, the last one as a prefix,
+        then those matched in phone, email or address. A query with 3 or more
+        digits also finds phone numbers containing them anywhere, with
+        spaces and dashes ignored.
+        
+        Where the SQLite library lacks FTS5 (or its trigram tokenizer, for
+        phones) the same searches run as LIKE scans, which match the words
+        anywhere, in order, and are slower on large tables.
+        
+        Args:
+            query: Text typed by the user
+            limit: Maximum number of devotees returned
+        
+        Returns:
+            List of Devotee objects
+        """
+        words = SEARCH_WORDS.findall(query)
+        if not words:
+            return []
+        digits = re.sub(r'\D', '', query)
+        # Quoted terms (\w+ words contain no quotes); only the last word
+        # is still being typed, so only it matches as a prefix: a common
+        # prefix such as "jain"* expands to every jain123 email token
+        terms = ' '.join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+        pattern = '%' + '%'.join(word.replace('_', '\\_') for word in words) + '%'
+        
+        found = {}
+        try:
+            if self._search_tables is None:
+                with self.pool.reader() as cursor:
+                    self._search_tables = search_tables(cursor)
+            if 'devotees_fts' in self._search_tables:
+                searches = [
+                    ('search_devotees', f'{{name}} : ({terms})'),
+                    ('search_devotees', terms),
+                ]
+            else:
+                searches = [
+                    ('search_devotees_like_name', pattern),
+                    ('search_devotees_like', pattern),
+                ]
+            if len(digits) >= 3:
+                if 'devotees_phone' in self._search_tables:
+                    searches.append(('search_devotees_phone', f'"{digits}"'))
+                else:
+                    searches.append(('search_devotees_like_phone', f'%{digits}%'))
+            
+            with self.pool.reader(Devotee.row_factory) as cursor:
+                exact = self.queries.fetchone(cursor, 'get_devotee', (query.strip(),))
+                if exact:
+                    found[exact.id] = exact
+                for name, match in searches:
+                    if len(found) >= limit:
+                        break
+                    for devotee in self.queries.fetchall(cursor, name, (match, limit)):
+                        found.setdefault(devotee.id, devotee)
+        except sqlite3.Error as e:
+            print(f"Error searching devotees: {e}")
+            return []
+        return list(found.values())[:limit]
+    
     def update_devotee(self, devotee_id, name, phone, email, address):
         """Update devotee information."""
         try:
-            self.cursor.execute(
-                "UPDATE devotees SET name = ?, phone = ?, email = ?, address = ? WHERE id = ?",
-                (name, phone, email, address, devotee_id)
-            )
-            self.conn.commit()
+            with self.pool.writer() as cursor:
+                self.queries.execute(
+                    cursor, 'update_devotee', (name, phone, email, address, devotee_id)
+                )
+            self.devotee_cache.invalidate(devotee_id)
             return True
         except sqlite3.Error as e:
             print(f"Error updating devotee: {e}")
@@ -211,8 +648,9 @@ class DatabaseHandler:
     def delete_devotee(self, devotee_id):
         """Delete a devotee."""
         try:
-            self.cursor.execute("DELETE FROM devotees WHERE id = ?", (devotee_id,))
-            self.conn.commit()
+            with self.pool.writer() as cursor:
+                self.queries.execute(cursor, 'delete_devotee', (devotee_id,))
+            self.devotee_cache.invalidate(devotee_id)
             return True
         except sqlite3.Error as e:
             print(f"Error deleting devotee: {e}")
@@ -220,147 +658,475 @@ class DatabaseHandler:
     
     def record_visit(self, devotee_id, selected_item):
         """Record a devotee's visit with the selected item."""
+        today = datetime.date.today().isoformat()
+        if self.visit_writer:
+            return self.visit_writer.add(devotee_id, selected_item, today)
+        
         try:
-            today = datetime.date.today().isoformat()
-            self.cursor.execute(
-                "INSERT INTO visits (devotee_id, visit_date, selected_item) VALUES (?, ?, ?)",
-                (devotee_id, today, selected_item)
-            )
-            self.conn.commit()
+            with self.pool.writer() as cursor:
+                self.queries.execute(cursor, 'insert_visit', (devotee_id, today, selected_item))
             return True
         except sqlite3.Error as e:
             print(f"Error recording visit: {e}")
             return False
     
+    def record_visits(self, visits):
+        """
+        Record many visits in a single transaction.
+        
+        Args:
+            visits: Iterable of (devotee_id, selected_item) or
+                (devotee_id, selected_item, visit_date) tuples; visit_date
+                defaults to today
+                
+        Returns:
+            Boolean indicating success
+        """
+        today = datetime.date.today().isoformat()
+        rows = (
+            (visit[0], visit[2] if len(visit) > 2 and visit[2] else today, visit[1])
+            for visit in visits
+        )
+        try:
+            with self.pool.writer() as cursor:
+                self.queries.executemany(cursor, 'insert_visit', rows)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error recording visits: {e}")
+            return False
+    
     def get_all_items(self):
         """Get all items for random selection."""
         try:
-            self.cursor.execute("SELECT name FROM items")
-            items = self.cursor.fetchall()
+            with self.pool.reader() as cursor:
+                items = self.queries.fetchall(cursor, 'get_all_items')
             return [item[0] for item in items]
         except sqlite3.Error as e:
             print(f"Error getting items: {e}")
             return []
     
+    def get_weighted_items(self):
+        """Get (name, weight) pairs of all items that can be selected."""
+        try:
+            with self.pool.reader() as cursor:
+                return self.queries.fetchall(cursor, 'get_weighted_items')
+        except sqlite3.Error as e:
+            print(f"Error getting weighted items: {e}")
+            return []
+    
+    def set_item_weight(self, name, weight):
+        """Set the relative selection weight of an item; 0 disables it."""
+        try:
+            with self.pool.writer() as cursor:
+                self.queries.execute(cursor, 'set_item_weight', (weight, name))
+            self.items_version += 1
+            return True
+        except sqlite3.Error as e:
+            print(f"Error setting item weight: {e}")
+            return False
+    
+    def get_recent_items(self, devotee_id, limit):
+        """Get the items selected on a devotee's most recent visits, newest first."""
+        self.flush()
+        try:
+            with self.pool.reader() as cursor:
+                rows = self.queries.fetchall(cursor, 'get_recent_items', (devotee_id, limit))
+            return [row[0] for row in rows]
+        except sqlite3.Error as e:
+            print(f"Error getting recent items: {e}")
+            return []
+    
+    def add_item(self, name, description=""):
+        """Add an item to the selection catalogue."""
+        try:
+            with self.pool.writer() as cursor:
+                self.queries.execute(cursor, 'add_item', (name, description))
+            self.items_version += 1
+            return True
+        except sqlite3.Error as e:
+            print(f"Error adding item: {e}")
+            return False
+    
+    def delete_item(self, name):
+        """Remove an item from the selection catalogue."""
+        try:
+            with self.pool.writer() as cursor:
+                self.queries.execute(cursor, 'delete_item', (name,))
+            self.items_version += 1
+            return True
+        except sqlite3.Error as e:
+            print(f"Error deleting item: {e}")
+            return False
+    
     def get_daily_visits(self, date):
-        """Get all visits for a specific date."""
-        try:
-            self.cursor.execute(
-                """
-                SELECT v.id, v.devotee_id, d.name, v.selected_item 
-                FROM visits v
-                JOIN devotees d ON v.devotee_id = d.id
-                WHERE v.visit_date = ?
-                ORDER BY v.id DESC
-                """,
-                (date,)
-            )
-            return self.cursor.fetchall()
+        """Get all visits for a specific date as Visit objects with devotee_name set."""
+        self.flush()
+        try:
+            with self.pool.reader(Visit.row_factory) as cursor:
+                return self.queries.fetchall(cursor, 'get_daily_visits', (date,))
         except sqlite3.Error as e:
             print(f"Error getting daily visits: {e}")
             return []
     
+    def iter_daily_visits(self, date, before=None, limit=100):
+        """
+        Get one page of the visits on a date, newest first.
+        
+        Args:
+            date: ISO date of the visits
+            before: Continuation token returned with the previous page, or
+                None for the first page
+            limit: Maximum number of visits in the page
+        
+        Returns:
+            Tuple (rows, token) with (id, devotee_id, name, selected_item)
+            rows; token is None after the last page
+        """
+        self.flush()
+        try:
+            with self.pool.reader() as cursor:
+                if before is None:
+                    rows = self.queries.fetchall(
+                        cursor, 'get_daily_visits_page_first', (date, limit)
+                    )
+                else:
+                    rows = self.queries.fetchall(
+                        cursor, 'get_daily_visits_page', (date, before, limit)
+                    )
+        except sqlite3.Error as e:
+            print(f"Error getting daily visits page: {e}")
+            return [], None
+        
+        if len(rows) < limit:
+            return rows, None
+        return rows, rows[-1][0]
+    
+    def iter_visits(self, start=None, end=None, after=None, limit=100):
+        """
+        Get one page of the visit log in insertion order.
+        
+        Args:
+            start: First ISO date to include, or None for no lower bound
+            end: ISO date to stop before, or None for no upper bound
+            after: Continuation token returned with the previous page, or
+                None for the first page
+            limit: Maximum number of visits in the page
+        
+        Returns:
+            Tuple (rows, token) with (id, visit_date, devotee_id, name,
+            selected_item) rows; name is None for unknown devotees. token
+            is None after the last page.
+        """
+        self.flush()
+        params = (after or 0, start or '0000-01-01', end or '9999-12-31', limit)
+        try:
+            with self.pool.reader() as cursor:
+                rows = self.queries.fetchall(cursor, 'get_visits_page', params)
+        except sqlite3.Error as e:
+            print(f"Error getting visits page: {e}")
+            return [], None
+        
+        if len(rows) < limit:
+            return rows, None
+        return rows, rows[-1][0]
+    
+    def count_visits(self, start=None, end=None):
+        """
+        Count the visits in a half-open date range using the daily rollup.
+        
+        Args:
+            start: First ISO date to include, or None for no lower bound
+            end: ISO date to stop before, or None for no upper bound
+        
+        Returns:
+            Number of visits, 0 on error
+        """
+        self.flush()
+        try:
+            with self.pool.reader() as cursor:
+                result = self.queries.fetchone(
+                    cursor, 'count_visits', (start or '0000-01-01', end or '9999-12-31')
+                )
+            return result[0]
+        except sqlite3.Error as e:
+            print(f"Error counting visits: {e}")
+            return 0
+    
+    def count_devotee_visits(self, devotee_id):
+        """Count all visits of a devotee, 0 on error."""
+        self.flush()
+        try:
+            with self.pool.reader() as cursor:
+                return self.queries.fetchone(cursor, 'count_devotee_visits', (devotee_id,))[0]
+        except sqlite3.Error as e:
+            print(f"Error counting devotee visits: {e}")
+            return 0
+    
+    def count_daily_visits(self, date):
+        """Count the visits on a date listed by iter_daily_visits, 0 on error."""
+        self.flush()
+        try:
+            with self.pool.reader() as cursor:
+                return self.queries.fetchone(cursor, 'count_daily_visits', (date,))[0]
+        except sqlite3.Error as e:
+            print(f"Error counting daily visits: {e}")
+            return 0
+    
+    def iter_changes(self, after=0, limit=1000):
+        """
+        Get one page of change_log entries in sequence order.
+        
+        Args:
+            after: Sequence number to continue after (a checkpoint, or the
+                token returned with the previous page)
+            limit: Maximum number of entries in the page
+        
+        Returns:
+            Tuple (rows, token) with (seq, table_name, op, row_key, data,
+            origin, changed_at) rows; token is None after the last page
+        """
+        self.flush()
+        try:
+            with self.pool.reader() as cursor:
+                rows = self.queries.fetchall(cursor, 'get_changes_page', (after or 0, limit))
+        except sqlite3.Error as e:
+            print(f"Error getting change log page: {e}")
+            return [], None
+        
+        if len(rows) < limit:
+            return rows, None
+        return rows, rows[-1][0]
+    
+    def last_change_seq(self):
+        """Get the newest change_log sequence number, 0 if the log is empty."""
+        self.flush()
+        try:
+            with self.pool.reader() as cursor:
+                return self.queries.fetchone(cursor, 'get_last_change_seq')[0]
+        except sqlite3.Error as e:
+            print(f"Error getting last change: {e}")
+            return 0
+    
     def get_monthly_visits(self, year, month):
         """Get all visits for a specific month."""
+        self.flush()
         try:
-            # Convert month to 1-12 format if needed
-            month_num = month if isinstance(month, int) else {
-                'January': 1, 'February': 2, 'March': 3, 'April': 4,
-                'May': 5, 'June': 6, 'July': 7, 'August': 8,
-                'September': 9, 'October': 10, 'November': 11, 'December': 12
-            }.get(month, 1)
+            start, end = month_date_range(year, month)
             
-            # Create date range for the month
-            if month_num < 10:
-                month_str = f"0{month_num}"
-            else:
-                month_str = str(month_num)
-            
-            date_pattern = f"{year}-{month_str}-%"
-            
-            self.cursor.execute(
-                """
-                SELECT v.visit_date, COUNT(*) as visit_count
-                FROM visits v
-                WHERE v.visit_date LIKE ?
-                GROUP BY v.visit_date
-                ORDER BY v.visit_date
-                """,
-                (date_pattern,)
-            )
-            return self.cursor.fetchall()
-        except sqlite3.Error as e:
+            with self.pool.reader() as cursor:
+                return self.queries.fetchall(cursor, 'get_monthly_visits', (start, end))
+        except (sqlite3.Error, ValueError) as e:
             print(f"Error getting monthly visits: {e}")
             return []
     
     def get_yearly_visits(self, year):
         """Get visit statistics for a specific year."""
+        self.flush()
         try:
-            date_pattern = f"{year}-%"
+            start, end = year_date_range(year)
             
-            self.cursor.execute(
-                """
-                SELECT strftime('%m', v.visit_date) as month, COUNT(*) as visit_count
-                FROM visits v
-                WHERE v.visit_date LIKE ?
-                GROUP BY month
-                ORDER BY month
-                """,
-                (date_pattern,)
-            )
-            return self.cursor.fetchall()
-        except sqlite3.Error as e:
+            with self.pool.reader() as cursor:
+                return self.queries.fetchall(cursor, 'get_yearly_visits', (start, end))
+        except (sqlite3.Error, ValueError) as e:
             print(f"Error getting yearly visits: {e}")
             return []
     
+    def get_item_counts(self, year, month=None):
+        """
+        Get how often each item was given in a month or year.
+        
+        Args:
+            year: Year as int or string
+            month: Month as int or English month name, or None for the
+                whole year
+        
+        Returns:
+            List of (selected_item, visit_count) tuples, most given first
+        """
+        self.flush()
+        try:
+            if month is None:
+                start, end = year_date_range(year)
+            else:
+                start, end = month_date_range(year, month)
+            
+            with self.pool.reader() as cursor:
+                return self.queries.fetchall(cursor, 'get_item_counts', (start, end))
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error getting item counts: {e}")
+            return []
+    
+    def rebuild_visit_rollups(self):
+        """
+        Recompute the daily visit count tables from the visits table.
+        
+        Returns:
+            Boolean indicating success
+        """
+        self.flush()
+        try:
+            with self.pool.write_connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    rebuild_visit_daily_counts(cursor)
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+            return True
+        except sqlite3.Error as e:
+            print(f"Error rebuilding visit rollups: {e}")
+            return False
+    
+    def rebuild_devotee_search(self):
+        """
+        Recompute the devotee search indexes from the devotees table.
+        
+        Returns:
+            Boolean indicating success
+        """
+        try:
+            with self.pool.write_connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    rebuild_devotee_search(cursor)
+                    conn.commit()
+                    self._search_tables = None
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.close()
+            return True
+        except sqlite3.Error as e:
+            print(f"Error rebuilding devotee search: {e}")
+            return False
+    
     def get_devotee_visits(self, devotee_id):
-        """Get all visits for a specific devotee."""
-        try:
-            self.cursor.execute(
-                """
-                SELECT v.visit_date, v.selected_item
-                FROM visits v
-                WHERE v.devotee_id = ?
-                ORDER BY v.visit_date DESC
-                """,
-                (devotee_id,)
-            )
-            return self.cursor.fetchall()
+        """Get all visits for a specific devotee as Visit objects, most recent first."""
+        self.flush()
+        try:
+            with self.pool.reader(Visit.row_factory) as cursor:
+                return self.queries.fetchall(cursor, 'get_devotee_visits', (devotee_id,))
         except sqlite3.Error as e:
             print(f"Error getting devotee visits: {e}")
             return []
     
+    def iter_devotee_visits(self, devotee_id, before=None, limit=100):
+        """
+        Get one page of a devotee's visits, most recent first.
+        
+        Args:
+            devotee_id: ID of the devotee
+            before: Continuation token returned with the previous page, an
+                ISO date to start with the visits before that date, or None
+                for the first page
+            limit: Maximum number of visits in the page
+        
+        Returns:
+            Tuple (rows, token) with (visit_date, selected_item) rows;
+            token is None after the last page
+        """
+        self.flush()
+        if isinstance(before, str):
+            # Visit ids start at 1: (date, 0) sorts before every visit on date
+            before = (before, 0)
+        try:
+            with self.pool.reader() as cursor:
+                if before is None:
+                    rows = self.queries.fetchall(
+                        cursor, 'get_devotee_visits_page_first', (devotee_id, limit)
+                    )
+                else:
+                    rows = self.queries.fetchall(
+                        cursor, 'get_devotee_visits_page', (devotee_id, *before, limit)
+                    )
+        except sqlite3.Error as e:
+            print(f"Error getting devotee visits page: {e}")
+            return [], None
+        
+        token = (rows[-1][0], rows[-1][2]) if len(rows) == limit else None
+        return [row[:2] for row in rows], token
+    
     def get_attendance_calendar(self, devotee_id, year, month):
         """Get attendance data for calendar view."""
+        self.flush()
         try:
-            # Convert month to 1-12 format if needed
-            month_num = month if isinstance(month, int) else {
-                'January': 1, 'February': 2, 'March': 3, 'April': 4,
-                'May': 5, 'June': 6, 'July': 7, 'August': 8,
-                'September': 9, 'October': 10, 'November': 11, 'December': 12
-            }.get(month, 1)
+            start, end = month_date_range(year, month)
             
-            # Create date range for the month
-            if month_num < 10:
-                month_str = f"0{month_num}"
-            else:
-                month_str = str(month_num)
-            
-            date_pattern = f"{year}-{month_str}-%"
-            
-            self.cursor.execute(
-                """
-                SELECT v.visit_date
-                FROM visits v
-                WHERE v.devotee_id = ? AND v.visit_date LIKE ?
-                ORDER BY v.visit_date
-                """,
-                (devotee_id, date_pattern)
-            )
+            with self.pool.reader() as cursor:
+                results = self.queries.fetchall(
+                    cursor, 'get_attendance_calendar', (devotee_id, start, end)
+                )
             
             # Convert to list of attendance dates
-            results = self.cursor.fetchall()
             return [row[0] for row in results]
-        except sqlite3.Error as e:
+        except (sqlite3.Error, ValueError) as e:
             print(f"Error getting attendance calendar: {e}")
             return []
+    
+    def get_attendance_bitmap(self, devotee_id, year, month):
+        """
+        Get a devotee's attendance for a month as a bitmap.
+        
+        Args:
+            devotee_id: ID of the devotee
+            year: Year as int or numeric string
+            month: Month number (1-12) or English month name
+            
+        Returns:
+            int with bit n-1 set if the devotee visited on day n, so day n
+            was attended when bitmap >> (n - 1) & 1; 0 on error
+        """
+        self.flush()
+        try:
+            start, end = month_date_range(year, month)
+            
+            with self.pool.reader() as cursor:
+                row = self.queries.fetchone(
+                    cursor, 'get_attendance_bitmap', (devotee_id, start, end)
+                )
+            
+            return row[0]
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error getting attendance bitmap: {e}")
+            return 0
+    
+    def get_attendance_year_bitmap(self, devotee_id, year):
+        """
+        Get a devotee's attendance for a whole year as a bitmap.
+        
+        SQLite integers are 64 bits, so SQL builds one bitmap per month and
+        they are shifted into place here.
+        
+        Args:
+            devotee_id: ID of the devotee
+            year: Year as int or numeric string
+            
+        Returns:
+            int with bit n-1 set if the devotee visited on day n of the year
+            (January 1st is day 1, up to 366 bits); 0 on error
+        """
+        self.flush()
+        try:
+            start, end = year_date_range(year)
+            
+            with self.pool.reader() as cursor:
+                rows = self.queries.fetchall(
+                    cursor, 'get_attendance_month_bitmaps', (devotee_id, start, end)
+                )
+            
+            # Days of the year before the 1st of each month
+            first_day = datetime.date(int(year), 1, 1).toordinal()
+            bitmap = 0
+            for month, month_bitmap in rows:
+                offset = datetime.date(int(year), month, 1).toordinal() - first_day
+                bitmap |= month_bitmap << offset
+            return bitmap
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error getting attendance year bitmap: {e}")
+            return 0
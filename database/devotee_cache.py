@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+
+class DevoteeCache:
+    """
+    Bounded least-recently-used cache of Devotee objects keyed by devotee ID.
+
+    Lookups of unknown IDs are cached too (as None), so a mistyped or not
+    yet registered ID does not query the database on every keypad submit;
+    adding that devotee invalidates the entry like any other write.
+
+    A row read from the database is only stored if no invalidation
+    happened since the read started (see generation), so a lookup racing
+    with an update on another thread cannot cache the old row.
+    """
+
+    def __init__(self, capacity=512):
+        """
+        Initialize the cache.
+
+        Args:
+            capacity: Maximum number of devotees kept; 0 disables caching
+        """
+        self.capacity = capacity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def generation(self):
+        """Counter bumped by every invalidation; pass it back to put()."""
+        return self._generation
+
+    def get(self, devotee_id):
+        """
+        Look up a devotee.
+
+        Args:
+            devotee_id: ID of the devotee
+
+        Returns:
+            Tuple (found, row); row is None for a cached unknown ID
+        """
+        key = str(devotee_id)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, devotee_id, row, generation):
+        """
+        Store a row read from the database.
+
+        Args:
+            devotee_id: ID of the devotee
+            row: Devotee, or None if the ID does not exist
+            generation: Value of generation taken before the row was read
+        """
+        if self.capacity <= 0:
+            return
+        key = str(devotee_id)
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = row
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, devotee_id):
+        """Drop a devotee after it was added, updated or deleted."""
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(str(devotee_id), None)
+
+    def clear(self):
+        """Drop every cached devotee, e.g. after a bulk import or restore."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Get size, hit/miss/eviction counts and the hit ratio."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def reset_stats(self):
+        """Zero the hit, miss and eviction counters."""
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
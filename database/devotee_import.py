@@ -0,0 +1,200 @@
+"""
+Bulk import of devotees from a CSV file.
+
+The file needs a header row with at least id and name columns (devotee_id
+is accepted for id); phone, email and address are optional and other
+columns are ignored. Rows are streamed and validated one by one, and
+each chunk of rows is loaded with executemany and upserted in its own
+transaction, so a 20k member list imports in seconds and memory stays
+flat however long the file is.
+
+Rows that fail validation are not imported; each one is counted and, if
+a rejects file is given, written to it with its line number and reason
+so it can be corrected and imported again.
+"""
+import csv
+import time
+
+FIELDS = ('id', 'name', 'phone', 'email', 'address')
+
+COLUMN_ALIASES = {'devotee_id': 'id'}
+
+CHUNK_SIZE = 1000
+
+# Each chunk is staged in a temporary table and written with a single
+# INSERT ... SELECT: the full-text search triggers then update the index
+# once per chunk instead of once per row. (WHERE true is required for an
+# upsert from a SELECT.)
+STAGE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS devotee_import (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        phone TEXT,
+        email TEXT,
+        address TEXT
+    )
+"""
+
+COUNT_EXISTING_SQL = """
+    SELECT COUNT(*) FROM temp.devotee_import i
+    JOIN devotees d ON d.id = i.id
+"""
+
+# A blank optional field keeps the stored value. The WHERE clause skips
+# rows that would not change, so importing the same file twice neither
+# rewrites the devotees nor fills the change log.
+UPSERT_SQL = """
+    INSERT INTO devotees (id, name, phone, email, address)
+    SELECT id, name, phone, email, address FROM temp.devotee_import WHERE true
+    ON CONFLICT (id) DO UPDATE SET
+        name = excluded.name,
+        phone = COALESCE(NULLIF(excluded.phone, ''), devotees.phone),
+        email = COALESCE(NULLIF(excluded.email, ''), devotees.email),
+        address = COALESCE(NULLIF(excluded.address, ''), devotees.address)
+    WHERE devotees.name IS NOT excluded.name
+        OR devotees.phone IS NOT COALESCE(NULLIF(excluded.phone, ''), devotees.phone)
+        OR devotees.email IS NOT COALESCE(NULLIF(excluded.email, ''), devotees.email)
+        OR devotees.address IS NOT COALESCE(NULLIF(excluded.address, ''), devotees.address)
+"""
+
+INSERT_NEW_SQL = """
+    INSERT INTO devotees (id, name, phone, email, address)
+    SELECT id, name, phone, email, address FROM temp.devotee_import WHERE true
+    ON CONFLICT (id) DO NOTHING
+"""
+
+class ImportResult:
+    """Counts of one import."""
+
+    def __init__(self, source):
+        self.source = source
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.rejected = 0
+        self.seconds = 0.0
+
+    def summary(self):
+        """One line description of the import."""
+        return (
+            f"{self.source}: {self.rows:,} rows, {self.inserted:,} added, "
+            f"{self.updated:,} updated, {self.unchanged:,} unchanged, "
+            f"{self.rejected:,} rejected"
+        )
+
+def validate_row(row, seen_ids):
+    """
+    Check one CSV row and build its devotee values.
+
+    Args:
+        row: Dict of column name to value
+        seen_ids: Set of the IDs accepted so far in this file; updated
+
+    Returns:
+        Tuple (values, reason): the (id, name, phone, email, address)
+        values and None, or None and the reason the row is rejected
+    """
+    if None in row:
+        return None, "too many columns"
+    values = tuple((row.get(field) or '').strip() for field in FIELDS)
+    devotee_id, name, phone, email, address = values
+    if not devotee_id:
+        return None, "ID is required"
+    if not name:
+        return None, "name is required"
+    if email and '@' not in email:
+        return None, f"invalid email {email!r}"
+    if devotee_id in seen_ids:
+        return None, f"duplicate ID {devotee_id} in the file"
+    seen_ids.add(devotee_id)
+    return values, None
+
+def import_devotees(db, path, rejects_path=None, update_existing=True,
+                    chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Import devotees from a CSV file.
+
+    Args:
+        db: DatabaseHandler to import into
+        path: CSV file with a header row
+        rejects_path: Optional CSV file receiving the rejected rows
+        update_existing: Overwrite the details of devotees that already
+            exist; if False they are left untouched and counted unchanged
+        chunk_size: Rows read per write transaction
+        progress: Optional callable(rows_read) called after each chunk
+
+    Returns:
+        ImportResult
+
+    Raises:
+        ValueError: If the file has no id and name columns
+    """
+    start = time.perf_counter()
+    result = ImportResult(path)
+    sql = UPSERT_SQL if update_existing else INSERT_NEW_SQL
+    seen_ids = set()
+    rejects_file = rejects_writer = None
+
+    # utf-8-sig also reads the byte order mark spreadsheet programs write
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = [
+            COLUMN_ALIASES.get(name.strip().lower(), name.strip().lower())
+            for name in reader.fieldnames or []
+        ]
+        missing = [field for field in ('id', 'name') if field not in columns]
+        if missing:
+            raise ValueError(f"{path} has no {' or '.join(missing)} column")
+        reader.fieldnames = columns
+
+        try:
+            accepted = []
+            for row in reader:
+                result.rows += 1
+                values, reason = validate_row(row, seen_ids)
+                if values is not None:
+                    accepted.append(values)
+                else:
+                    result.rejected += 1
+                    if rejects_path is not None:
+                        if rejects_writer is None:
+                            rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8')
+                            rejects_writer = csv.writer(rejects_file)
+                            rejects_writer.writerow(['line', 'reason'] + list(FIELDS))
+                        rejects_writer.writerow(
+                            [reader.line_num, reason] + [row.get(field) or '' for field in FIELDS]
+                        )
+                if result.rows % chunk_size == 0:
+                    _write_chunk(db, sql, accepted, result)
+                    accepted = []
+                    if progress:
+                        progress(result.rows)
+            _write_chunk(db, sql, accepted, result)
+            if progress:
+                progress(result.rows)
+        finally:
+            if rejects_file:
+                rejects_file.close()
+            # Any cached devotee may have changed
+            db.devotee_cache.clear()
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+def _write_chunk(db, sql, rows, result):
+    """Upsert one chunk of validated rows in a single transaction."""
+    if not rows:
+        return
+    with db.pool.writer() as cursor:
+        cursor.execute(STAGE_SQL)
+        cursor.execute("DELETE FROM temp.devotee_import")
+        cursor.executemany("INSERT INTO temp.devotee_import VALUES (?, ?, ?, ?, ?)", rows)
+        existing = cursor.execute(COUNT_EXISTING_SQL).fetchone()[0]
+        cursor.execute(sql)
+        inserted = len(rows) - existing
+        # rowcount counts the inserted and the actually updated rows
+        updated = cursor.rowcount - inserted
+    result.inserted += inserted
+    result.updated += updated
+    result.unchanged += existing - updated
@@ -0,0 +1,96 @@
+import datetime
+import threading
+import time
+
+class GroupCommitWriter:
+    """
+    Buffers visit inserts and writes them to the database in one transaction.
+
+    The buffer is flushed as soon as max_rows visits are pending, or once the
+    oldest pending visit has waited max_delay_ms. The time based flush is
+    driven by flush_if_due(), which the app's database worker
+    (database.async_db.AsyncDatabase) calls after every job and while idle,
+    so the buffer also drains when no further visits arrive.
+    """
+
+    def __init__(self, db, max_rows=50, max_delay_ms=200):
+        """
+        Initialize the writer.
+
+        Args:
+            db: DatabaseHandler used to write the buffered visits
+            max_rows: Number of pending visits that triggers a flush
+            max_delay_ms: Maximum time a visit may stay in the buffer
+        """
+        self.db = db
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000.0
+        self._pending = []
+        self._oldest = None
+        # Guards _pending and _oldest
+        self._lock = threading.Lock()
+        # Held from taking the buffer until it is written, so groups are
+        # committed in the order they were taken
+        self._flush_lock = threading.Lock()
+
+    @property
+    def pending_count(self):
+        """Number of visits waiting to be written."""
+        return len(self._pending)
+
+    def add(self, devotee_id, selected_item, visit_date=None):
+        """
+        Queue a visit for the next flush.
+
+        Args:
+            devotee_id: ID of the visiting devotee
+            selected_item: The item selected for the devotee
+            visit_date: ISO date of the visit, defaults to today
+
+        Returns:
+            Boolean indicating the visit was accepted (and written, if this
+            call triggered a flush)
+        """
+        visit_date = visit_date or datetime.date.today().isoformat()
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((devotee_id, selected_item, visit_date))
+            full = len(self._pending) >= self.max_rows
+
+        if full:
+            return self.flush()
+        return True
+
+    def flush_if_due(self):
+        """Flush the buffer if the oldest pending visit has waited long enough."""
+        with self._lock:
+            due = bool(self._pending) and time.monotonic() - self._oldest >= self.max_delay
+        if due:
+            return self.flush()
+        return True
+
+    def flush(self):
+        """
+        Write all pending visits in a single transaction.
+
+        Returns:
+            Boolean indicating success. On failure the visits are kept in
+            the buffer and retried on the next flush.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending = self._pending, []
+                oldest, self._oldest = self._oldest, None
+
+            if not rows:
+                return True
+
+            if self.db.record_visits(rows):
+                return True
+
+            # Put the rows back in front of anything queued meanwhile
+            with self._lock:
+                self._pending = rows + self._pending
+                self._oldest = oldest
+            return False
@@ -0,0 +1,239 @@
+"""
+Database maintenance commands.
+
+Run from the repository root, e.g.:
+
+    python -m database.maintenance rebuild-rollups
+    python -m database.maintenance rebuild-rollups --db /path/to/jaintemple.db
+    python -m database.maintenance rebuild-search
+    python -m database.maintenance backup --keep 14
+    python -m database.maintenance list-backups
+    python -m database.maintenance restore backups/jaintemple-20240501-183000.db.gz
+    python -m database.maintenance export-changes
+    python -m database.maintenance apply-changes backups/changes-*.jsonl.gz
+    python -m database.maintenance merge kiosk2.db kiosk3.db --conflicts conflicts.csv
+    python -m database.maintenance serve-sync --host 0.0.0.0 --port 8765
+    python -m database.maintenance sync http://192.168.1.10:8765 --save
+    python -m database.maintenance import-devotees members.csv --rejects rejects.csv
+
+A cheap nightly backup is export-changes, with a full backup now and then;
+to recover, restore the last full backup and apply the change files
+exported after it, oldest first.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from database.backup import BackupManager
+from database.change_log import apply_changes, export_changes
+from database.db_handler import DatabaseHandler
+from database.devotee_import import CHUNK_SIZE, import_devotees
+from database.merge import merge_sources, write_conflict_report
+from database.sync import SyncClient, SyncError, SyncServer
+
+def rebuild_rollups(db, args):
+    """Recompute the daily visit count tables from the visits table."""
+    start = time.perf_counter()
+    if not db.rebuild_visit_rollups():
+        return 1
+    print(f"Rebuilt visit rollups in {time.perf_counter() - start:.2f}s")
+    return 0
+
+def rebuild_search(db, args):
+    """Recompute the devotee search indexes, e.g. after a VACUUM."""
+    start = time.perf_counter()
+    if not db.rebuild_devotee_search():
+        return 1
+    print(f"Rebuilt devotee search in {time.perf_counter() - start:.2f}s")
+    return 0
+
+def backup_manager(db, args):
+    """Create the BackupManager configured by the command line."""
+    return BackupManager(
+        db,
+        backup_dir=args.backup_dir,
+        keep=getattr(args, 'keep', 7),
+        compress=not getattr(args, 'no_compress', False)
+    )
+
+def backup(db, args):
+    """Back up the database and delete old backups."""
+    start = time.perf_counter()
+    path = backup_manager(db, args).create_backup()
+    print(f"Backed up to {path} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+def list_backups(db, args):
+    """List the backups, newest first."""
+    for path, size, created in backup_manager(db, args).list_backups():
+        print(f"{created:%Y-%m-%d %H:%M:%S}  {size / 1024 / 1024:>8.1f} MB  {path}")
+    return 0
+
+def restore(db, args):
+    """Replace the database with a backup (the current data is backed up first)."""
+    try:
+        backup_manager(db, args).restore(args.backup)
+    except ValueError as e:
+        print(f"Cannot restore: {e}")
+        return 1
+    print(f"Restored {args.backup}")
+    return 0
+
+def export_change_log(db, args):
+    """Write the changes since the last export to an incremental backup file."""
+    start = time.perf_counter()
+    path, entries = export_changes(db, args.backup_dir, since=args.since)
+    if path is None:
+        print("No changes since the last export")
+    else:
+        print(f"Exported {entries:,} changes to {path} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+def apply_change_logs(db, args):
+    """Replay this kiosk's incremental backup files, oldest first."""
+    for path in args.files:
+        try:
+            count = apply_changes(db, path, force=args.force)
+        except ValueError as e:
+            print(f"Cannot apply {path}: {e}")
+            return 1
+        print(f"Applied {count:,} changes from {path}")
+    return 0
+
+def merge(db, args):
+    """Merge other kiosks' databases or change files into this database."""
+    start = time.perf_counter()
+    try:
+        results = merge_sources(db, args.sources, prefer=args.prefer)
+    except ValueError as e:
+        print(f"Cannot merge: {e}")
+        return 1
+    for result in results:
+        print(result.summary())
+    print(f"Merged {len(results)} sources in {time.perf_counter() - start:.2f}s")
+    if args.conflicts:
+        count = write_conflict_report(results, args.conflicts)
+        print(f"Wrote {count:,} devotee conflicts to {args.conflicts}")
+    return 0
+
+def serve_sync(db, args):
+    """Run the sync server that kiosks sync with, until interrupted."""
+    server = SyncServer(db, host=args.host, port=args.port, token=args.token)
+    print(f"Serving sync on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def sync(db, args):
+    """Push this database's changes to a sync server and pull the others'."""
+    if args.save:
+        # The app syncs in the background when these are set
+        db.set_setting('sync_url', args.url)
+        db.set_setting('sync_token', args.token or '')
+    client = SyncClient(db, args.url, token=args.token)
+    try:
+        result = client.sync()
+    except SyncError as e:
+        print(f"Cannot sync: {e}")
+        return 1
+    finally:
+        client.close()
+    print(
+        f"Pushed {result['pushed']:,} changes, added {result['visits_added']:,} visits, "
+        f"{result['conflicts']:,} conflicts, {result['bytes_sent']:,} bytes sent, "
+        f"{result['bytes_received']:,} received in {result['seconds']:.2f}s"
+    )
+    return 0
+
+def import_devotee_csv(db, args):
+    """Add or update devotees from a CSV file with id and name columns."""
+    try:
+        result = import_devotees(
+            db, args.file,
+            rejects_path=args.rejects,
+            update_existing=not args.skip_existing,
+            chunk_size=args.chunk_size
+        )
+    except (OSError, ValueError) as e:
+        print(f"Cannot import: {e}")
+        return 1
+    print(result.summary())
+    print(f"Imported in {result.seconds:.2f}s ({result.rows / max(result.seconds, 1e-9):,.0f} rows/s)")
+    if result.rejected and args.rejects:
+        print(f"Wrote rejected rows to {args.rejects}")
+    return 0
+
+COMMANDS = {
+    'rebuild-rollups': rebuild_rollups,
+    'rebuild-search': rebuild_search,
+    'backup': backup,
+    'list-backups': list_backups,
+    'restore': restore,
+    'export-changes': export_change_log,
+    'apply-changes': apply_change_logs,
+    'merge': merge,
+    'serve-sync': serve_sync,
+    'sync': sync,
+    'import-devotees': import_devotee_csv,
+}
+
+def build_parser():
+    """Build the command line parser."""
+    # Options shared by every command, accepted after the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=None, help='database file, defaults to the app database')
+    common.add_argument('--backup-dir', default=None, help='backup folder, defaults to backups next to the database')
+
+    parser = argparse.ArgumentParser(description="Jain Temple database maintenance")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('rebuild-rollups', parents=[common], help=rebuild_rollups.__doc__)
+    subparsers.add_parser('rebuild-search', parents=[common], help=rebuild_search.__doc__)
+    backup_parser = subparsers.add_parser('backup', parents=[common], help=backup.__doc__)
+    backup_parser.add_argument('--keep', type=int, default=7, help='backups to keep, 0 keeps all')
+    backup_parser.add_argument('--no-compress', action='store_true', help='do not gzip the backup')
+    subparsers.add_parser('list-backups', parents=[common], help=list_backups.__doc__)
+    restore_parser = subparsers.add_parser('restore', parents=[common], help=restore.__doc__)
+    restore_parser.add_argument('backup', help='backup file to restore')
+    export_parser = subparsers.add_parser('export-changes', parents=[common], help=export_change_log.__doc__)
+    export_parser.add_argument('--since', type=int, default=None,
+                               help='export after this seq instead of the last checkpoint')
+    apply_parser = subparsers.add_parser('apply-changes', parents=[common], help=apply_change_logs.__doc__)
+    apply_parser.add_argument('files', nargs='+', help='change files, oldest first')
+    apply_parser.add_argument('--force', action='store_true', help='apply files out of sequence')
+    merge_parser = subparsers.add_parser('merge', parents=[common], help=merge.__doc__)
+    merge_parser.add_argument('sources', nargs='+',
+                              help='kiosk database files or change files (.jsonl.gz)')
+    merge_parser.add_argument('--prefer', choices=['master', 'source'], default='master',
+                              help='which devotee details win a conflict')
+    merge_parser.add_argument('--conflicts', default=None, help='write devotee conflicts to this CSV file')
+    serve_parser = subparsers.add_parser('serve-sync', parents=[common], help=serve_sync.__doc__)
+    serve_parser.add_argument('--host', default='127.0.0.1', help='address to listen on, 0.0.0.0 for all')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--token', default=None, help='shared secret the kiosks must send')
+    sync_parser = subparsers.add_parser('sync', parents=[common], help=sync.__doc__)
+    sync_parser.add_argument('url', help='sync server URL, e.g. http://192.168.1.10:8765')
+    sync_parser.add_argument('--token', default=None, help='shared secret of the server')
+    sync_parser.add_argument('--save', action='store_true',
+                             help='remember the server so the app syncs in the background')
+    import_parser = subparsers.add_parser('import-devotees', parents=[common], help=import_devotee_csv.__doc__)
+    import_parser.add_argument('file', help='CSV file with a header row')
+    import_parser.add_argument('--rejects', default=None, help='write rejected rows to this CSV file')
+    import_parser.add_argument('--skip-existing', action='store_true',
+                               help='leave devotees that already exist unchanged')
+    import_parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows written per transaction')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = DatabaseHandler(args.db)
+    db.setup_database()
+    try:
+        return COMMANDS[args.command](db, args)
+    finally:
+        db.close_connection()
+
+if __name__ == '__main__':
+    sys.exit(main())
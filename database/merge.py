@@ -0,0 +1,384 @@
+"""
+Merge the data of other kiosks into this database.
+
+Each kiosk keeps its own jaintemple.db. A master database takes in
+either a kiosk's whole database file (merge_database) or its change log
+exports (merge_change_file, see database.change_log); merge_sources
+picks the right one by file name.
+
+Visits are copied with set based INSERT ... SELECT statements over an
+ATTACHed source, and keyed by (origin, origin_id): the device_id of the
+kiosk that recorded the visit and its id there. Merging the same source
+again, or a database that already contains merged visits, adds nothing
+twice. Visits of the master itself that come back in a kiosk's database
+are skipped.
+
+Devotees are matched by id. New devotees are added; for devotees on both
+sides, empty fields are filled from the source, and fields with
+different values are conflicts: the master value is kept (or the source
+value with prefer='source') and every conflict is reported.
+"""
+import csv
+import os
+
+from database.change_log import APPLIED_KEY, read_changes
+
+DEVOTEE_FIELDS = ('name', 'phone', 'email', 'address')
+
+# Oldest schema a source database may have: 6 added the device_id
+MIN_SOURCE_VERSION = 6
+
+class MergeResult:
+    """Counts and devotee conflicts of merging one source."""
+
+    def __init__(self, source, device_id):
+        self.source = source
+        self.device_id = device_id
+        self.devotees_added = 0
+        self.devotees_updated = 0
+        self.devotees_deleted = 0
+        self.visits_added = 0
+        self.visits_updated = 0
+        self.visits_deleted = 0
+        self.visits_skipped = 0
+        # (devotee_id, field, master_value, source_value, kept_value) tuples
+        self.conflicts = []
+
+    def summary(self):
+        """One line description of the merge."""
+        return (
+            f"{self.source}: {self.visits_added:,} visits added, "
+            f"{self.visits_skipped:,} already present, "
+            f"{self.devotees_added:,} devotees added, {self.devotees_updated:,} updated, "
+            f"{len(self.conflicts):,} conflicts"
+        )
+
+def resolve_devotee(master, source, prefer='master'):
+    """
+    Decide the merged values of a devotee present on both sides.
+
+    Args:
+        master: Dict of the master's DEVOTEE_FIELDS values
+        source: Dict of the source's DEVOTEE_FIELDS values
+        prefer: 'master' or 'source', which value wins a conflict
+
+    Returns:
+        Tuple (changes, conflicts): a dict of the fields to set on the
+        master, and a list of (field, master_value, source_value,
+        kept_value) tuples
+    """
+    changes = {}
+    conflicts = []
+    for field in DEVOTEE_FIELDS:
+        ours, theirs = master.get(field) or '', source.get(field) or ''
+        if ours == theirs or not theirs:
+            continue
+        if not ours:
+            changes[field] = theirs
+            continue
+        kept = theirs if prefer == 'source' else ours
+        if kept != ours:
+            changes[field] = kept
+        conflicts.append((field, ours, theirs, kept))
+    return changes, conflicts
+
+def merge_database(db, source_path, prefer='master'):
+    """
+    Merge another kiosk's database file into db in one transaction.
+
+    Args:
+        db: DatabaseHandler of the master database
+        source_path: jaintemple.db of the other kiosk; it is only read
+        prefer: 'master' or 'source', which devotee value wins a conflict
+
+    Returns:
+        MergeResult
+
+    Raises:
+        ValueError: The source is missing, too old, or this same device
+        sqlite3.Error: The merge failed and was rolled back
+    """
+    if not os.path.isfile(source_path):
+        raise ValueError(f"Database file not found: {source_path}")
+    master_device = db.get_device_id()
+    db.flush()
+
+    with db.pool.write_connection() as conn:
+        conn.execute("ATTACH DATABASE ? AS src", (source_path,))
+        try:
+            device_id = _check_source(conn, master_device)
+            result = MergeResult(source_path, device_id)
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                _merge_devotees(cursor, result, prefer)
+                _merge_visits(cursor, result, master_device)
+
+                # Later change files of the source continue from here
+                last_seq = cursor.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM src.change_log"
+                ).fetchone()[0]
+                applied_key = APPLIED_KEY.format(device_id=device_id)
+                cursor.execute(
+                    "INSERT INTO settings (key, value) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET "
+                    "value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))",
+                    (applied_key, str(last_seq))
+                )
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        finally:
+            conn.execute("DETACH DATABASE src")
+
+    db.devotee_cache.clear()
+    return result
+
+def _check_source(conn, master_device):
+    """Validate the attached source database and return its device_id."""
+    tables = {row[0] for row in conn.execute(
+        "SELECT name FROM src.sqlite_master WHERE type = 'table'"
+    )}
+    missing = {'devotees', 'visits', 'settings'} - tables
+    if missing:
+        raise ValueError(f"Not an app database, missing tables: {', '.join(sorted(missing))}")
+    version = conn.execute("PRAGMA src.user_version").fetchone()[0]
+    if version < MIN_SOURCE_VERSION:
+        raise ValueError(
+            f"Source database schema {version} is too old; open it once with "
+            f"the current app to upgrade it"
+        )
+    row = conn.execute("SELECT value FROM src.settings WHERE key = 'device_id'").fetchone()
+    if not row:
+        raise ValueError("Source database has no device_id")
+    if row[0] == master_device:
+        raise ValueError("Source database is this device's own database")
+    return row[0]
+
+def _merge_devotees(cursor, result, prefer):
+    """Resolve devotees present on both sides, then copy the new ones."""
+    columns = ', '.join(f"m.{field}, s.{field}" for field in DEVOTEE_FIELDS)
+    differs = ' OR '.join(f"m.{field} IS NOT s.{field}" for field in DEVOTEE_FIELDS)
+    cursor.execute(f'''
+    SELECT s.id, {columns}
+    FROM src.devotees s JOIN main.devotees m ON m.id = s.id
+    WHERE {differs}
+    ''')
+    updates = []
+    for row in cursor.fetchall():
+        master = dict(zip(DEVOTEE_FIELDS, row[1::2]))
+        source = dict(zip(DEVOTEE_FIELDS, row[2::2]))
+        changes, conflicts = resolve_devotee(master, source, prefer)
+        if changes:
+            updates.append((dict(master, **changes), row[0]))
+        result.conflicts.extend((row[0],) + conflict for conflict in conflicts)
+
+    cursor.executemany(
+        "UPDATE main.devotees SET name = ?, phone = ?, email = ?, address = ? WHERE id = ?",
+        [tuple(values[field] for field in DEVOTEE_FIELDS) + (devotee_id,)
+         for values, devotee_id in updates]
+    )
+    result.devotees_updated = len(updates)
+
+    cursor.execute('''
+    INSERT INTO main.devotees (id, name, phone, email, address, created_at)
+    SELECT id, name, phone, email, address, created_at FROM src.devotees s
+    WHERE NOT EXISTS (SELECT 1 FROM main.devotees m WHERE m.id = s.id)
+    ''')
+    result.devotees_added = cursor.rowcount
+
+def _merge_visits(cursor, result, master_device):
+    """Copy the source's visits that the master does not have yet."""
+    columns = {row[1] for row in cursor.execute("PRAGMA src.table_info(visits)")}
+    if 'origin' in columns:
+        origin, origin_id = "COALESCE(s.origin, :device)", "COALESCE(s.origin_id, s.id)"
+    else:
+        origin, origin_id = ":device", "s.id"
+    total = cursor.execute("SELECT COUNT(*) FROM src.visits").fetchone()[0]
+    # The WHERE clause is required before ON CONFLICT in INSERT ... SELECT
+    cursor.execute(f'''
+    INSERT INTO main.visits (devotee_id, visit_date, selected_item, origin, origin_id)
+    SELECT s.devotee_id, s.visit_date, s.selected_item, {origin}, {origin_id}
+    FROM src.visits s
+    WHERE {origin} <> :master
+    ON CONFLICT DO NOTHING
+    ''', {'device': result.device_id, 'master': master_device})
+    result.visits_added = cursor.rowcount
+    result.visits_skipped = total - result.visits_added
+
+def merge_change_file(db, path, prefer='master'):
+    """
+    Merge another kiosk's change log export into db in one transaction.
+
+    Args:
+        db: DatabaseHandler of the master database
+        path: Change file written by export_changes on another kiosk
+        prefer: 'master' or 'source', which devotee value wins a conflict
+
+    Returns:
+        MergeResult
+
+    Raises:
+        ValueError: Not a change file, this device's own file, or earlier
+            changes of the device are missing
+        sqlite3.Error: The merge failed and was rolled back
+    """
+    header, entries = read_changes(path)
+    return merge_changes(db, header, entries, prefer, source=path)
+
+def merge_changes(db, header, entries, prefer='master', source=None):
+    """
+    Merge change log entries of another device in one transaction.
+
+    Like apply_changes, entries of a device are merged at most once and
+    in order, and a batch that leaves a gap after the last merged entry
+    of its device is refused. Visits are matched by (origin, origin_id)
+    rather than by id, so the master's own visit ids are never touched.
+
+    Args:
+        db: DatabaseHandler of the master database
+        header: Change file header (device_id, from_seq, to_seq)
+        entries: Iterator of entry dicts, see database.change_log
+        prefer: 'master' or 'source', which devotee value wins a conflict
+        source: Name of the entries' source for the result
+
+    Returns:
+        MergeResult
+
+    Raises:
+        ValueError: Entries of this device itself, or earlier changes of
+            the device are missing
+        sqlite3.Error: The merge failed and was rolled back
+    """
+    device_id = header['device_id']
+    master_device = db.get_device_id()
+    if device_id == master_device:
+        entries.close()
+        raise ValueError("This device's own changes; use apply-changes to replay them")
+    applied_key = APPLIED_KEY.format(device_id=device_id)
+    last_applied = int(db.get_setting(applied_key, 0))
+    if header['from_seq'] > last_applied:
+        entries.close()
+        raise ValueError(
+            f"Changes {last_applied + 1}-{header['from_seq']} of device {device_id} "
+            f"are missing; merge the earlier change files or the device's database first"
+        )
+
+    result = MergeResult(source or device_id, device_id)
+    db.flush()
+    with db.pool.writer() as cursor:
+        for entry in entries:
+            if entry['seq'] <= last_applied:
+                continue
+            if entry['table'] == 'visits':
+                _merge_visit_change(cursor, entry, result, master_device)
+            elif entry['table'] == 'devotees':
+                _merge_devotee_change(cursor, entry, result, prefer)
+        cursor.execute(
+            "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+            (applied_key, str(max(last_applied, header['to_seq'])))
+        )
+
+    db.devotee_cache.clear()
+    return result
+
+def _merge_visit_change(cursor, entry, result, master_device):
+    """Apply one visit change, locating the visit by its origin key."""
+    data = entry['data'] or {}
+    origin = data.get('origin') or result.device_id
+    origin_id = data.get('origin_id') or int(entry['key'])
+    if origin == master_device:
+        # One of the master's own visits: origin_id is its local id
+        match, params = "origin IS NULL AND id = ?", (origin_id,)
+    else:
+        match, params = "origin = ? AND origin_id = ?", (origin, origin_id)
+
+    if entry['op'] == 'D':
+        cursor.execute(f"DELETE FROM visits WHERE {match}", params)
+        result.visits_deleted += cursor.rowcount
+        return
+    if entry['op'] == 'U':
+        cursor.execute(
+            f"UPDATE visits SET devotee_id = ?, visit_date = ?, selected_item = ? WHERE {match}",
+            (data['devotee_id'], data['visit_date'], data['selected_item']) + params
+        )
+        if cursor.rowcount:
+            result.visits_updated += 1
+            return
+    if origin == master_device:
+        result.visits_skipped += 1
+        return
+    cursor.execute(
+        "INSERT INTO visits (devotee_id, visit_date, selected_item, origin, origin_id) "
+        "VALUES (?, ?, ?, ?, ?) ON CONFLICT DO NOTHING",
+        (data['devotee_id'], data['visit_date'], data['selected_item'], origin, origin_id)
+    )
+    if cursor.rowcount:
+        result.visits_added += 1
+    else:
+        result.visits_skipped += 1
+
+def _merge_devotee_change(cursor, entry, result, prefer):
+    """Apply one devotee change, reporting conflicts with the master's record."""
+    if entry['op'] == 'D':
+        cursor.execute("DELETE FROM devotees WHERE id = ?", (entry['key'],))
+        result.devotees_deleted += cursor.rowcount
+        return
+    data = entry['data']
+    row = cursor.execute(
+        f"SELECT {', '.join(DEVOTEE_FIELDS)} FROM devotees WHERE id = ?", (data['id'],)
+    ).fetchone()
+    if row is None:
+        cursor.execute(
+            "INSERT INTO devotees (id, name, phone, email, address, created_at) "
+            "VALUES (:id, :name, :phone, :email, :address, :created_at)",
+            data
+        )
+        result.devotees_added += 1
+        return
+    master = dict(zip(DEVOTEE_FIELDS, row))
+    changes, conflicts = resolve_devotee(master, data, prefer)
+    if changes:
+        values = dict(master, **changes)
+        cursor.execute(
+            "UPDATE devotees SET name = ?, phone = ?, email = ?, address = ? WHERE id = ?",
+            tuple(values[field] for field in DEVOTEE_FIELDS) + (data['id'],)
+        )
+        result.devotees_updated += 1
+    result.conflicts.extend((data['id'],) + conflict for conflict in conflicts)
+
+def merge_sources(db, paths, prefer='master'):
+    """
+    Merge several database files and change files, in the given order.
+
+    Returns:
+        List of MergeResult, one per path
+    """
+    results = []
+    for path in paths:
+        if path.endswith('.jsonl.gz'):
+            results.append(merge_change_file(db, path, prefer))
+        else:
+            results.append(merge_database(db, path, prefer))
+    return results
+
+def write_conflict_report(results, path):
+    """
+    Write the devotee conflicts of merges to a CSV file.
+
+    Returns:
+        Number of conflicts written
+    """
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Source', 'Device', 'Devotee ID', 'Field',
+                         'Master Value', 'Source Value', 'Kept Value'])
+        for result in results:
+            for conflict in result.conflicts:
+                writer.writerow((result.source, result.device_id) + conflict)
+                count += 1
+    return count
@@ -0,0 +1,504 @@
+import sqlite3
+
+# Items seeded into a fresh database
+DEFAULT_ITEMS = [
+    "Swamivatsalya", "Sadavrata", "Jñāna Dāna", "Auṣadha Dāna",
+    "Abhaya Dāna", "Vaiyāvṛttya", "Jinālaya Jīrṇoddhāra", "Pratimā",
+    "Pūjā", "Upavāsa", "Santhārā", "Saṃyama", "Tapasya",
+    "Tyāga", "Brahmacārya", "Kṣamā", "Ahiṃsā", "Satya"
+]
+
+def _create_base_schema(cursor):
+    """Create the original tables and seed the default rows."""
+    # IF NOT EXISTS keeps this safe for databases created before
+    # versioning, which already have these tables at user_version 0.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS admins (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS devotees (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        phone TEXT,
+        email TEXT,
+        address TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS visits (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        devotee_id TEXT NOT NULL,
+        visit_date DATE NOT NULL,
+        selected_item TEXT NOT NULL,
+        FOREIGN KEY (devotee_id) REFERENCES devotees (id)
+    )
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    ''')
+    
+    # Items table for the 18 items
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT
+    )
+    ''')
+    
+    # Default admin if none exists
+    cursor.execute(
+        "INSERT INTO admins (username, password) "
+        "SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM admins)",
+        ("admin", "admin123")  # Default credentials
+    )
+    
+    # App activation status, 0 means not activated
+    cursor.execute(
+        "INSERT OR IGNORE INTO settings (key, value) VALUES ('app_activated', '0')"
+    )
+    
+    # Default items if none exist
+    cursor.execute("SELECT COUNT(*) FROM items")
+    if cursor.fetchone()[0] == 0:
+        cursor.executemany(
+            "INSERT INTO items (name, description) VALUES (?, ?)",
+            [(item, f"Description for {item}") for item in DEFAULT_ITEMS]
+        )
+
+def _add_visit_date_indexes(cursor):
+    """Index visits for the date range report queries."""
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_visits_visit_date ON visits (visit_date)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_visits_devotee_date ON visits (devotee_id, visit_date)"
+    )
+
+def _add_item_weights(cursor):
+    """Give every item a relative selection weight, 1 by default."""
+    cursor.execute("ALTER TABLE items ADD COLUMN weight REAL NOT NULL DEFAULT 1")
+
+def rebuild_visit_daily_counts(cursor):
+    """
+    Recompute the visit rollup tables from the visits table.
+    
+    The triggers keep the rollups current; this is for existing data and
+    for repairing rollups after visits were changed with triggers off.
+    """
+    cursor.execute("DELETE FROM visit_daily_counts")
+    cursor.execute("DELETE FROM visit_daily_item_counts")
+    cursor.execute('''
+    INSERT INTO visit_daily_counts (visit_date, visit_count)
+    SELECT visit_date, COUNT(*) FROM visits GROUP BY visit_date
+    ''')
+    cursor.execute('''
+    INSERT INTO visit_daily_item_counts (visit_date, selected_item, visit_count)
+    SELECT visit_date, selected_item, COUNT(*) FROM visits
+    GROUP BY visit_date, selected_item
+    ''')
+
+def _add_visit_daily_counts(cursor):
+    """Add per-day and per-day/per-item visit counts kept current by triggers."""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS visit_daily_counts (
+        visit_date DATE PRIMARY KEY,
+        visit_count INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS visit_daily_item_counts (
+        visit_date DATE NOT NULL,
+        selected_item TEXT NOT NULL,
+        visit_count INTEGER NOT NULL,
+        PRIMARY KEY (visit_date, selected_item)
+    ) WITHOUT ROWID
+    ''')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_visits_rollup_insert
+    AFTER INSERT ON visits
+    BEGIN
+        INSERT INTO visit_daily_counts (visit_date, visit_count)
+        VALUES (NEW.visit_date, 1)
+        ON CONFLICT (visit_date) DO UPDATE SET visit_count = visit_count + 1;
+        INSERT INTO visit_daily_item_counts (visit_date, selected_item, visit_count)
+        VALUES (NEW.visit_date, NEW.selected_item, 1)
+        ON CONFLICT (visit_date, selected_item) DO UPDATE SET visit_count = visit_count + 1;
+    END
+    ''')
+    
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_visits_rollup_delete
+    AFTER DELETE ON visits
+    BEGIN
+        UPDATE visit_daily_counts SET visit_count = visit_count - 1
+        WHERE visit_date = OLD.visit_date;
+        DELETE FROM visit_daily_counts
+        WHERE visit_date = OLD.visit_date AND visit_count <= 0;
+        UPDATE visit_daily_item_counts SET visit_count = visit_count - 1
+        WHERE visit_date = OLD.visit_date AND selected_item = OLD.selected_item;
+        DELETE FROM visit_daily_item_counts
+        WHERE visit_date = OLD.visit_date AND selected_item = OLD.selected_item
+            AND visit_count <= 0;
+    END
+    ''')
+    
+    # An update moves the visit from its old day/item to the new one
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_visits_rollup_update
+    AFTER UPDATE OF visit_date, selected_item ON visits
+    BEGIN
+        UPDATE visit_daily_counts SET visit_count = visit_count - 1
+        WHERE visit_date = OLD.visit_date;
+        DELETE FROM visit_daily_counts
+        WHERE visit_date = OLD.visit_date AND visit_count <= 0;
+        UPDATE visit_daily_item_counts SET visit_count = visit_count - 1
+        WHERE visit_date = OLD.visit_date AND selected_item = OLD.selected_item;
+        DELETE FROM visit_daily_item_counts
+        WHERE visit_date = OLD.visit_date AND selected_item = OLD.selected_item
+            AND visit_count <= 0;
+        INSERT INTO visit_daily_counts (visit_date, visit_count)
+        VALUES (NEW.visit_date, 1)
+        ON CONFLICT (visit_date) DO UPDATE SET visit_count = visit_count + 1;
+        INSERT INTO visit_daily_item_counts (visit_date, selected_item, visit_count)
+        VALUES (NEW.visit_date, NEW.selected_item, 1)
+        ON CONFLICT (visit_date, selected_item) DO UPDATE SET visit_count = visit_count + 1;
+    END
+    ''')
+    
+    rebuild_visit_daily_counts(cursor)
+
+def _add_devotee_name_index(cursor):
+    """Index devotees by (name, id) for the name ordered listing and its pages."""
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_devotees_name_id ON devotees (name, id)"
+    )
+
+def _change_log_trigger(table, op, key, row):
+    """SQL of one change_log trigger; row is the NEW/OLD row as JSON or NULL."""
+    event = {'I': 'INSERT', 'U': 'UPDATE', 'D': 'DELETE'}[op]
+    return f'''
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_log_{event.lower()}
+    AFTER {event} ON {table}
+    BEGIN
+        INSERT INTO change_log (table_name, op, row_key, data, origin)
+        VALUES (
+            '{table}', '{op}', {key}, {row},
+            (SELECT value FROM settings WHERE key = 'device_id')
+        );
+    END
+    '''
+
+def _add_change_log(cursor):
+    """
+    Add the append-only change_log of devotee and visit changes.
+    
+    Every insert, update and delete gets a row with an increasing seq
+    (AUTOINCREMENT never reuses numbers), so exporting the entries after
+    a checkpoint captures everything that changed since.
+    """
+    # Identifies this kiosk in change log exports
+    cursor.execute(
+        "INSERT OR IGNORE INTO settings (key, value) "
+        "VALUES ('device_id', lower(hex(randomblob(8))))"
+    )
+    
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        op TEXT NOT NULL,
+        row_key TEXT NOT NULL,
+        data TEXT,
+        origin TEXT,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    devotee_row = (
+        "json_object('id', NEW.id, 'name', NEW.name, 'phone', NEW.phone, "
+        "'email', NEW.email, 'address', NEW.address, 'created_at', NEW.created_at)"
+    )
+    visit_row = (
+        "json_object('id', NEW.id, 'devotee_id', NEW.devotee_id, "
+        "'visit_date', NEW.visit_date, 'selected_item', NEW.selected_item)"
+    )
+    for sql in (
+        _change_log_trigger('devotees', 'I', 'NEW.id', devotee_row),
+        _change_log_trigger('devotees', 'U', 'NEW.id', devotee_row),
+        _change_log_trigger('devotees', 'D', 'OLD.id', 'NULL'),
+        _change_log_trigger('visits', 'I', 'NEW.id', visit_row),
+        _change_log_trigger('visits', 'U', 'NEW.id', visit_row),
+        _change_log_trigger('visits', 'D', 'OLD.id', 'NULL'),
+    ):
+        cursor.execute(sql)
+
+def _add_visit_origin(cursor):
+    """
+    Record where merged visits come from.
+    
+    Visits merged from another kiosk keep that kiosk's device_id and
+    visit id in (origin, origin_id), the key that stops a visit from
+    being merged twice. Visits recorded on this device leave both NULL.
+    """
+    cursor.execute("ALTER TABLE visits ADD COLUMN origin TEXT")
+    cursor.execute("ALTER TABLE visits ADD COLUMN origin_id INTEGER")
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_visits_origin ON visits (origin, origin_id) "
+        "WHERE origin IS NOT NULL"
+    )
+    
+    # Log the origin too, also for deletes, so change files from a kiosk
+    # can be merged by the same key
+    visit_row = (
+        "json_object('id', NEW.id, 'devotee_id', NEW.devotee_id, "
+        "'visit_date', NEW.visit_date, 'selected_item', NEW.selected_item, "
+        "'origin', NEW.origin, 'origin_id', NEW.origin_id)"
+    )
+    deleted_visit = "json_object('origin', OLD.origin, 'origin_id', OLD.origin_id)"
+    for event in ('insert', 'update', 'delete'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_visits_log_{event}")
+    for sql in (
+        _change_log_trigger('visits', 'I', 'NEW.id', visit_row),
+        _change_log_trigger('visits', 'U', 'NEW.id', visit_row),
+        _change_log_trigger('visits', 'D', 'OLD.id', deleted_visit),
+    ):
+        cursor.execute(sql)
+
+def phone_digits_sql(column):
+    """SQL expression for a phone number with the usual separators removed."""
+    expression = column
+    for separator in (' ', '-', '+', '(', ')', '.', '/'):
+        expression = f"replace({expression}, '{separator}', '')"
+    return expression
+
+# Devotee search tables, each needing an SQLite feature: FTS5 (3.9,
+# usually compiled in), and FTS5's trigram tokenizer (3.34)
+SEARCH_TABLES = {
+    'devotees_fts': "fts5(probe)",
+    'devotees_phone': "fts5(probe, tokenize='trigram')",
+}
+
+def search_support(cursor):
+    """
+    Find which devotee search tables this SQLite library can create.
+    
+    Probes by creating and dropping a temporary table of each kind, which
+    also catches FTS5 loaded as an extension.
+    
+    Returns:
+        Set of SEARCH_TABLES names
+    """
+    supported = set()
+    for name, module in SEARCH_TABLES.items():
+        try:
+            cursor.execute(f"CREATE VIRTUAL TABLE temp.search_probe USING {module}")
+        except sqlite3.OperationalError:
+            continue
+        cursor.execute("DROP TABLE temp.search_probe")
+        supported.add(name)
+    return supported
+
+def search_tables(cursor):
+    """Return the set of devotee search tables that exist in the database."""
+    placeholders = ', '.join('?' * len(SEARCH_TABLES))
+    rows = cursor.execute(
+        f"SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+        tuple(SEARCH_TABLES)
+    ).fetchall()
+    return {row[0] for row in rows}
+
+def rebuild_devotee_search(cursor):
+    """
+    Recompute the devotee search indexes from the devotees table.
+    
+    The triggers keep them current; this is for existing data and for
+    repairs. Both indexes are keyed by the devotees rowid, which VACUUM
+    may renumber (id is a TEXT key), so rebuild after a VACUUM. Tables
+    the SQLite library could not create before (e.g. before an upgrade
+    to 3.34) are added if it can now.
+    """
+    _create_devotee_search(cursor)
+    tables = search_tables(cursor)
+    if 'devotees_fts' in tables:
+        cursor.execute("INSERT INTO devotees_fts (devotees_fts) VALUES ('rebuild')")
+    if 'devotees_phone' in tables:
+        cursor.execute("INSERT INTO devotees_phone (devotees_phone) VALUES ('delete-all')")
+        cursor.execute(f"""
+        INSERT INTO devotees_phone (rowid, phone)
+        SELECT rowid, {phone_digits_sql('phone')} FROM devotees
+        """)
+
+def _create_devotee_search(cursor):
+    """Create the search tables SQLite supports, and their triggers."""
+    supported = search_support(cursor)
+    if 'devotees_fts' in supported:
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS devotees_fts USING fts5(
+            name, phone, email, address,
+            content='devotees', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+        )
+        ''')
+    if 'devotees_phone' in supported:
+        cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS devotees_phone USING fts5(
+            phone, content='', tokenize='trigram'
+        )
+        ''')
+    
+    # External content and contentless tables delete an entry given the
+    # values it was indexed with
+    fts_insert = fts_delete = phone_insert = phone_delete = ''
+    if 'devotees_fts' in supported:
+        fts_insert = '''
+            INSERT INTO devotees_fts (rowid, name, phone, email, address)
+            VALUES (NEW.rowid, NEW.name, NEW.phone, NEW.email, NEW.address);
+        '''
+        fts_delete = '''
+            INSERT INTO devotees_fts (devotees_fts, rowid, name, phone, email, address)
+            VALUES ('delete', OLD.rowid, OLD.name, OLD.phone, OLD.email, OLD.address);
+        '''
+    if 'devotees_phone' in supported:
+        phone_insert = f'''
+            INSERT INTO devotees_phone (rowid, phone) VALUES (NEW.rowid, {phone_digits_sql('NEW.phone')});
+        '''
+        phone_delete = f'''
+            INSERT INTO devotees_phone (devotees_phone, rowid, phone)
+            VALUES ('delete', OLD.rowid, {phone_digits_sql('OLD.phone')});
+        '''
+    
+    # Recreated so they cover exactly the tables that exist
+    for trigger in ('search_insert', 'search_update', 'phone_update', 'search_delete'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS trg_devotees_{trigger}")
+    if not supported:
+        return
+    cursor.execute(f'''
+    CREATE TRIGGER trg_devotees_search_insert
+    AFTER INSERT ON devotees
+    BEGIN
+        {fts_insert}
+        {phone_insert}
+    END
+    ''')
+    if fts_insert:
+        # Upserts assign every column, so only reindex what actually changed
+        cursor.execute(f'''
+        CREATE TRIGGER trg_devotees_search_update
+        AFTER UPDATE OF name, phone, email, address ON devotees
+        WHEN OLD.name IS NOT NEW.name OR OLD.phone IS NOT NEW.phone
+            OR OLD.email IS NOT NEW.email OR OLD.address IS NOT NEW.address
+        BEGIN
+            {fts_delete}
+            {fts_insert}
+        END
+        ''')
+    if phone_insert:
+        cursor.execute(f'''
+        CREATE TRIGGER trg_devotees_phone_update
+        AFTER UPDATE OF phone ON devotees
+        WHEN OLD.phone IS NOT NEW.phone
+        BEGIN
+            {phone_delete}
+            {phone_insert}
+        END
+        ''')
+    cursor.execute(f'''
+    CREATE TRIGGER trg_devotees_search_delete
+    AFTER DELETE ON devotees
+    BEGIN
+        {fts_delete}
+        {phone_delete}
+    END
+    ''')
+
+def _add_devotee_search(cursor):
+    """
+    Add full-text search over devotee names, phones, emails and addresses.
+    
+    devotees_fts is an external content FTS5 index of the devotees table
+    with prefix indexes, so "ramesh sh" finds Ramesh Shah as it is typed.
+    devotees_phone holds the phone numbers as bare digits in a contentless
+    trigram index, which finds any 3+ digit run inside a number. Triggers
+    keep both current.
+    
+    SQLite builds without FTS5, or older than 3.34 (no trigram tokenizer),
+    get only the tables they support, and search_devotees falls back to
+    LIKE scans for the rest; the migration still completes, so the app
+    starts. rebuild_devotee_search adds them after an SQLite upgrade.
+    """
+    rebuild_devotee_search(cursor)
+
+# Numbered migrations, applied in order. Never edit or reorder a released
+# migration; append a new one instead.
+MIGRATIONS = [
+    (1, _create_base_schema),
+    (2, _add_visit_date_indexes),
+    (3, _add_item_weights),
+    (4, _add_visit_daily_counts),
+    (5, _add_devotee_name_index),
+    (6, _add_change_log),
+    (7, _add_visit_origin),
+    (8, _add_devotee_search),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    """Return the schema version recorded in PRAGMA user_version."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """
+    Bring a database up to SCHEMA_VERSION.
+    
+    Each migration runs in its own transaction together with the
+    user_version bump, so a failed migration leaves the database at the
+    previous version. An up to date database costs a single pragma read.
+    
+    Args:
+        conn: sqlite3.Connection to migrate
+    
+    Returns:
+        List of migration numbers that were applied
+    """
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return []
+    
+    applied = []
+    for number, migration in MIGRATIONS:
+        if number <= version:
+            continue
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # Re-check under the write lock in case another connection
+            # migrated the database in the meantime
+            if get_schema_version(conn) >= number:
+                conn.rollback()
+                continue
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+            applied.append(number)
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    return applied
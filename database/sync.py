@@ -0,0 +1,506 @@
+"""
+Sync between kiosks through a small HTTP service.
+
+One machine (any kiosk or a back office PC) runs SyncServer on its
+database; the kiosks run SyncClient against it. Every sync pushes the
+kiosk's change_log entries the server has not seen and pulls the
+server's entries the kiosk has not seen, so all kiosks converge on the
+server's data during the day.
+
+Batches travel as gzip compressed change files (see database.change_log)
+and are merged with database.merge.merge_changes, which remembers the
+last merged seq of every device. The client therefore keeps no sync
+state of its own beyond what merging stores: it asks the server how far
+it got (GET /sync/status) and pushes from there.
+
+Endpoints:
+
+    GET  /sync/status?device=ID         {"device_id", "applied", "last_seq"}
+    POST /sync/push                     change batch -> {"applied", ...}
+    GET  /sync/pull?device=ID&since=N   change batch after seq N
+
+Example, both from the repository root:
+
+    python -m database.maintenance serve-sync --db master.db --port 8765
+    python -m database.maintenance sync http://192.168.1.10:8765
+"""
+import asyncio
+import datetime
+import gzip
+import hmac
+import http.client
+import io
+import json
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from database.change_log import APPLIED_KEY, FILE_FORMAT, FILE_VERSION, format_entry, read_changes
+from database.merge import merge_changes
+from database.migrations import SCHEMA_VERSION
+
+# Entries per batch; 1000 visit entries compress to roughly 20 KB
+BATCH_SIZE = 1000
+
+# Largest request body the server accepts
+MAX_BODY = 32 * 1024 * 1024
+
+TOKEN_HEADER = 'X-Sync-Token'
+
+def encode_batch(db, after, limit=BATCH_SIZE, skip_origin=None):
+    """
+    Read change_log entries after a seq into a gzip compressed batch.
+
+    Args:
+        db: DatabaseHandler to read from
+        after: Sequence number to start after
+        limit: Entries read at most
+        skip_origin: Function of a visit's origin (the device_id it was
+            merged from, None for visits recorded here) that is true for
+            visits the receiving side already has; their entries are
+            left out
+
+    Returns:
+        Tuple (payload bytes, entries in the payload, to_seq); to_seq is
+        the last seq read, equal to after if there was nothing to read
+    """
+    rows, _ = db.iter_changes(after, limit)
+    to_seq = rows[-1][0] if rows else after
+    lines = []
+    for row in rows:
+        if skip_origin and row[1] == 'visits' and row[4]:
+            if skip_origin(json.loads(row[4]).get('origin')):
+                continue
+        lines.append(format_entry(row))
+    header = {
+        'format': FILE_FORMAT,
+        'version': FILE_VERSION,
+        'schema_version': SCHEMA_VERSION,
+        'device_id': db.get_device_id(),
+        'from_seq': after,
+        'to_seq': to_seq,
+        'last_seq': db.last_change_seq(),
+        'exported_at': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+    text = json.dumps(header) + '\n' + ''.join(lines)
+    return gzip.compress(text.encode('utf-8'), compresslevel=6), len(lines), to_seq
+
+def decode_batch(payload):
+    """Return (header, entries iterator) of a batch from encode_batch."""
+    return read_changes(io.BytesIO(payload))
+
+def merged_devices(db):
+    """Device IDs whose changes or database were merged into db directly."""
+    prefix = APPLIED_KEY.format(device_id='')
+    with db.pool.reader() as cursor:
+        rows = cursor.execute(
+            "SELECT substr(key, ?) FROM settings WHERE substr(key, 1, ?) = ?",
+            (len(prefix) + 1, len(prefix), prefix)
+        ).fetchall()
+    return {row[0] for row in rows}
+
+def start_background_sync(db):
+    """
+    Start syncing with the server saved by `maintenance sync URL --save`.
+
+    Returns:
+        The running BackgroundSync, or None if no server is configured
+    """
+    sync_url = db.get_setting('sync_url')
+    if not sync_url:
+        return None
+    background = BackgroundSync(db, sync_url, db.get_setting('sync_token') or None)
+    background.start()
+    return background
+
+class SyncError(Exception):
+    """The sync server could not be reached or refused a request."""
+
+class SyncServer:
+    """
+    asyncio HTTP server that kiosks push changes to and pull changes from.
+
+    Requests are handled on the event loop; the database work of each
+    runs on the loop's default thread pool executor, so slow merges do
+    not hold up other kiosks' requests. Connections are kept alive
+    between requests.
+    """
+
+    def __init__(self, db, host='127.0.0.1', port=8765, token=None, batch_size=BATCH_SIZE):
+        """
+        Initialize the server; nothing listens until start().
+
+        Args:
+            db: DatabaseHandler of the database kiosks sync with
+            host: Address to listen on, '0.0.0.0' for the whole network
+            port: Port to listen on; 0 picks a free port
+            token: Shared secret clients must send, None for no check
+            batch_size: Entries per pulled batch
+        """
+        self.db = db
+        self.host = host
+        self.port = port
+        self.token = token
+        self.batch_size = batch_size
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._writers = set()
+
+    async def start(self):
+        """Start listening; sets port to the actual port."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Start (if needed) and serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self):
+        """
+        Run the server on its own event loop in a daemon thread.
+
+        Returns:
+            The server URL, e.g. http://127.0.0.1:8765
+        """
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self.start())
+            started.set()
+            try:
+                self._loop.run_forever()
+            finally:
+                self._server.close()
+                # Close the kept-alive client connections; their handlers
+                # then see the end of the stream and return
+                for writer in list(self._writers):
+                    writer.close()
+                tasks = asyncio.all_tasks(self._loop)
+                self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+                self._loop.run_until_complete(self._server.wait_closed())
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name='sync-server', daemon=True)
+        self._thread.start()
+        started.wait()
+        return f"http://{self.host}:{self.port}"
+
+    def stop(self, timeout=5):
+        """Stop a server started with start_in_thread()."""
+        if self._thread and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+
+    async def _handle(self, reader, writer):
+        """Serve the requests of one connection."""
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length') or 0)
+                if length > MAX_BODY:
+                    status, content_type, body = 413, 'application/json', b'{"error": "too large"}'
+                    keep_alive = False
+                else:
+                    payload = await reader.readexactly(length) if length else b''
+                    status, content_type, body = await self._dispatch(method, target, headers, payload)
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+
+                writer.write(
+                    f"HTTP/1.1 {status} {http.client.responses.get(status, '')}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+                    + body
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, method, target, headers, payload):
+        """Route a request; returns (status, content type, body bytes)."""
+        # Compared as bytes: compare_digest refuses non-ASCII str, and
+        # header values were decoded as latin-1, which round trips
+        if self.token and not hmac.compare_digest(
+            headers.get(TOKEN_HEADER.lower(), '').encode('latin-1'), self.token.encode('utf-8')
+        ):
+            return self._json(401, {'error': 'invalid sync token'})
+
+        url = urlsplit(target)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        loop = asyncio.get_running_loop()
+        try:
+            if method == 'GET' and url.path == '/sync/status':
+                result = await loop.run_in_executor(None, self._status, params.get('device', ''))
+                return self._json(200, result)
+            if method == 'POST' and url.path == '/sync/push':
+                result = await loop.run_in_executor(None, self._push, payload)
+                return self._json(200, result)
+            if method == 'GET' and url.path == '/sync/pull':
+                body = await loop.run_in_executor(
+                    None, self._pull, params.get('device', ''), int(params.get('since', 0))
+                )
+                return 200, 'application/gzip', body
+        except ValueError as e:
+            # A gap or a malformed batch; the client re-reads the status
+            return self._json(409, {'error': str(e)})
+        except Exception as e:
+            print(f"Sync request error: {e}")
+            return self._json(500, {'error': str(e)})
+        return self._json(404, {'error': 'not found'})
+
+    def _json(self, status, data):
+        """Build a JSON response."""
+        return status, 'application/json', json.dumps(data).encode('utf-8')
+
+    def _status(self, device_id):
+        """How far the server got with a device's changes."""
+        return {
+            'device_id': self.db.get_device_id(),
+            'applied': int(self.db.get_setting(APPLIED_KEY.format(device_id=device_id), 0)),
+            'last_seq': self.db.last_change_seq(),
+        }
+
+    def _push(self, payload):
+        """Merge a batch pushed by a kiosk."""
+        header, entries = decode_batch(payload)
+        result = merge_changes(self.db, header, entries, source=header['device_id'])
+        return {
+            'applied': header['to_seq'],
+            'visits_added': result.visits_added,
+            'conflicts': len(result.conflicts),
+        }
+
+    def _pull(self, device_id, since):
+        """The batch of server changes after since, without the device's own visits."""
+        payload, _, _ = encode_batch(
+            self.db, since, self.batch_size, skip_origin=lambda origin: origin == device_id
+        )
+        return payload
+
+class SyncClient:
+    """
+    Pushes this kiosk's changes to a SyncServer and pulls the others'.
+
+    Calls block; run them off the Kivy main thread (see BackgroundSync).
+    """
+
+    def __init__(self, db, url, token=None, batch_size=BATCH_SIZE, timeout=30):
+        """
+        Initialize the client; the connection opens on the first request.
+
+        Args:
+            db: DatabaseHandler of this kiosk
+            url: Server URL, e.g. http://192.168.1.10:8765
+            token: Shared secret of the server, if it has one
+            batch_size: Entries per pushed batch
+            timeout: Socket timeout in seconds
+        """
+        self.db = db
+        self.url = urlsplit(url)
+        self.token = token
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._conn = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def close(self):
+        """Close the connection to the server."""
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+    def _request(self, method, path, body=None):
+        """Send a request and return (status, body bytes), reconnecting once."""
+        headers = {'Content-Type': 'application/gzip'} if body is not None else {}
+        if self.token:
+            headers[TOKEN_HEADER] = self.token
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(
+                    self.url.hostname, self.url.port or 80, timeout=self.timeout
+                )
+            try:
+                self._conn.request(method, path, body=body, headers=headers)
+                response = self._conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                # The server may have dropped an idle kept-alive connection
+                self.close()
+                if attempt == 2:
+                    raise SyncError(f"Sync server unreachable: {e}")
+                continue
+            self.bytes_sent += len(body or b'')
+            self.bytes_received += len(data)
+            if response.will_close:
+                self.close()
+            return response.status, data
+
+    def _json_request(self, method, path, body=None):
+        """Send a request expecting a JSON reply; raises SyncError on failure."""
+        status, data = self._request(method, path, body)
+        if status != 200:
+            raise SyncError(f"Sync server error {status}: {data.decode('utf-8', 'replace')}")
+        return json.loads(data)
+
+    def status(self):
+        """The server's status for this device."""
+        return self._json_request('GET', f"/sync/status?device={self.db.get_device_id()}")
+
+    def push(self):
+        """
+        Send the changes the server has not merged yet.
+
+        Visits merged here from the server are left out, whether they
+        were recorded on the server or on another kiosk, since the server
+        has them all. Visits merged directly from another kiosk's
+        database or change file are sent; the server merges each visit
+        only once, keyed by its origin.
+
+        Returns:
+            Number of entries sent
+        """
+        status = self.status()
+        after, server_device = status['applied'], status['device_id']
+        direct = merged_devices(self.db) - {server_device}
+
+        def known_to_server(origin):
+            return origin is not None and origin not in direct
+
+        sent = 0
+        while after < self.db.last_change_seq():
+            payload, entries, to_seq = encode_batch(
+                self.db, after, self.batch_size, skip_origin=known_to_server
+            )
+            code, data = self._request('POST', '/sync/push', payload)
+            if code == 409:
+                # The server lost track (e.g. it was restored); start over
+                # from what it has, unless that is where this batch started
+                applied = self.status()['applied']
+                if applied == after:
+                    raise SyncError(f"Sync server refused changes: {data.decode('utf-8', 'replace')}")
+                after = applied
+                continue
+            if code != 200:
+                raise SyncError(f"Sync server error {code}: {data.decode('utf-8', 'replace')}")
+            after = to_seq
+            sent += entries
+        return sent
+
+    def pull(self):
+        """
+        Merge the server's changes this kiosk has not merged yet.
+
+        Returns:
+            List of MergeResult, one per batch
+        """
+        results = []
+        server_device = None
+        while True:
+            if server_device is None:
+                server_device = self.status()['device_id']
+            since = int(self.db.get_setting(APPLIED_KEY.format(device_id=server_device), 0))
+            code, data = self._request(
+                'GET', f"/sync/pull?device={self.db.get_device_id()}&since={since}"
+            )
+            if code != 200:
+                raise SyncError(f"Sync server error {code}: {data.decode('utf-8', 'replace')}")
+            header, entries = decode_batch(data)
+            # The server's devotee details win, so all kiosks converge
+            results.append(merge_changes(
+                self.db, header, entries, prefer='source', source=self.url.geturl()
+            ))
+            if header['to_seq'] >= header['last_seq'] or header['to_seq'] == since:
+                return results
+
+    def sync(self):
+        """
+        Push, then pull.
+
+        Returns:
+            Dict with pushed and pulled entry counts, visits added here,
+            bytes sent and received, and seconds taken
+        """
+        start = time.perf_counter()
+        sent_before, received_before = self.bytes_sent, self.bytes_received
+        pushed = self.push()
+        results = self.pull()
+        return {
+            'pushed': pushed,
+            'visits_added': sum(result.visits_added for result in results),
+            'conflicts': sum(len(result.conflicts) for result in results),
+            'bytes_sent': self.bytes_sent - sent_before,
+            'bytes_received': self.bytes_received - received_before,
+            'seconds': time.perf_counter() - start,
+        }
+
+class BackgroundSync:
+    """Runs SyncClient.sync() every few minutes on a daemon thread."""
+
+    def __init__(self, db, url, token=None, interval=300):
+        """
+        Initialize; call start() to begin syncing.
+
+        Args:
+            db: DatabaseHandler of this kiosk
+            url: Server URL
+            token: Shared secret of the server
+            interval: Seconds between syncs
+        """
+        self.client = SyncClient(db, url, token)
+        self.interval = interval
+        self.last_result = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the sync thread; the first sync runs right away."""
+        self._thread = threading.Thread(target=self._run, name='sync', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """Stop the sync thread after the current sync."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.client.close()
+
+    def _run(self):
+        """Sync until stopped, logging failures and retrying next time."""
+        db = self.client.db
+        while not self._stop.is_set():
+            try:
+                self.last_result = self.client.sync()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                print(f"Sync error: {e}")
+            self._stop.wait(self.interval)
+        db.pool.release_thread_connection()
@@ -1,9 +1,14 @@
 class Devotee:
     """
     Model class representing a devotee.
+    
+    Slotted: a devotee has no per-instance __dict__, which keeps the large
+    lists loaded by the admin screens small. DatabaseHandler builds
+    devotees directly from query rows with row_factory.
     """
+    __slots__ = ('id', 'name', 'phone', 'email', 'address', 'created_at')
     
-    def __init__(self, id="", name="", phone="", email="", address=""):
+    def __init__(self, id="", name="", phone="", email="", address="", created_at=None):
         """
         Initialize a devotee.
         
@@ -13,12 +18,14 @@ class Devotee:
             phone: Devotee's phone number
             email: Devotee's email address
             address: Devotee's physical address
+            created_at: When the devotee was registered, as stored
         """
         self.id = id
         self.name = name
-        self.phone = phone
-        self.email = email
-        self.address = address
+        self.phone = phone or ""
+        self.email = email or ""
+        self.address = address or ""
+        self.created_at = created_at
     
     @classmethod
     def from_db_row(cls, row):
@@ -34,13 +41,17 @@ class Devotee:
         if not row:
             return None
         
-        return cls(
-            id=row[0],
-            name=row[1],
-            phone=row[2] if row[2] else "",
-            email=row[3] if row[3] else "",
-            address=row[4] if row[4] else ""
-        )
+        return cls(*row)
+    
+    @staticmethod
+    def row_factory(cursor, row):
+        """sqlite3 row factory building devotees from devotees table rows."""
+        # Called once per row: unpack straight into __init__, the cheapest
+        # way to fill the slots
+        return Devotee(*row)
+    
+    def __repr__(self):
+        return f"Devotee(id={self.id!r}, name={self.name!r})"
     
     def to_dict(self):
         """
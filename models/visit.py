@@ -1,33 +1,58 @@
 import datetime
+from sys import intern
 
 class Visit:
     """
     Model class representing a devotee's visit.
+    
+    Slotted, like Devotee. The visit date is kept as loaded, usually the
+    ISO string from the database, and only parsed into a datetime.date
+    when visit_date is first read; visit_date_text gives the ISO string
+    without parsing, which is all most screens need.
     """
+    __slots__ = ('id', 'devotee_id', '_visit_date', 'selected_item', 'devotee_name')
     
-    def __init__(self, id=None, devotee_id="", visit_date=None, selected_item=""):
+    def __init__(self, id=None, devotee_id="", visit_date=None, selected_item="", devotee_name=None):
         """
         Initialize a visit.
         
         Args:
             id: Database ID (can be None for new visits)
             devotee_id: ID of the devotee who visited
-            visit_date: Date of the visit (datetime.date)
+            visit_date: Date of the visit (datetime.date or ISO string),
+                defaults to today
             selected_item: The randomly selected item
+            devotee_name: Name of the devotee, when loaded with the visit
         """
         self.id = id
         self.devotee_id = devotee_id
         
         # Set visit date to today if not provided
         if visit_date is None:
-            self.visit_date = datetime.date.today()
-        elif isinstance(visit_date, str):
-            # Parse ISO date string (YYYY-MM-DD)
-            self.visit_date = datetime.date.fromisoformat(visit_date)
-        else:
-            self.visit_date = visit_date
-            
+            visit_date = datetime.date.today()
+        self._visit_date = visit_date
+        
         self.selected_item = selected_item
+        self.devotee_name = devotee_name
+    
+    @property
+    def visit_date(self):
+        """Date of the visit as a datetime.date, parsed on first use."""
+        value = self._visit_date
+        if isinstance(value, str):
+            # Parse ISO date string (YYYY-MM-DD)
+            value = self._visit_date = datetime.date.fromisoformat(value)
+        return value
+    
+    @visit_date.setter
+    def visit_date(self, value):
+        self._visit_date = value
+    
+    @property
+    def visit_date_text(self):
+        """Date of the visit as an ISO string, without parsing it."""
+        value = self._visit_date
+        return value if isinstance(value, str) else value.isoformat()
     
     @classmethod
     def from_db_row(cls, row):
@@ -35,7 +60,8 @@ class Visit:
         Create a Visit instance from a database row.
         
         Args:
-            row: Database row tuple (id, devotee_id, visit_date, selected_item)
+            row: Database row tuple (id, devotee_id, visit_date,
+                selected_item), optionally followed by the devotee's name
             
         Returns:
             Visit instance
@@ -43,18 +69,31 @@ class Visit:
         if not row:
             return None
         
-        # Parse date from ISO format if it's a string
-        visit_date = row[2]
-        if isinstance(visit_date, str):
-            visit_date = datetime.date.fromisoformat(visit_date)
+        # The date stays unparsed until visit_date is read
+        return cls(*row)
+    
+    @staticmethod
+    def row_factory(cursor, row):
+        """
+        sqlite3 row factory building visits from rows shaped like
+        from_db_row's (not SELECT *, which has more columns).
         
-        return cls(
-            id=row[0],
-            devotee_id=row[1],
-            visit_date=visit_date,
-            selected_item=row[3]
+        Devotee IDs, dates and item names repeat across thousands of
+        visits; interning them lets the visits share one string each
+        instead of holding a copy per row, about half the memory.
+        """
+        if len(row) == 4:
+            id, devotee_id, visit_date, selected_item = row
+            return Visit(id, intern(devotee_id), intern(visit_date), intern(selected_item))
+        id, devotee_id, visit_date, selected_item, devotee_name = row
+        return Visit(
+            id, intern(devotee_id), intern(visit_date), intern(selected_item),
+            devotee_name and intern(devotee_name)
         )
     
+    def __repr__(self):
+        return f"Visit(id={self.id!r}, devotee_id={self.devotee_id!r}, visit_date={self.visit_date_text!r})"
+    
     def to_dict(self):
         """
         Convert visit to dictionary.
@@ -65,6 +104,6 @@ class Visit:
         return {
             'id': self.id,
             'devotee_id': self.devotee_id,
-            'visit_date': self.visit_date.isoformat(),
+            'visit_date': self.visit_date_text,
             'selected_item': self.selected_item
         }
@@ -22,6 +22,8 @@ from screens.calendar_view import CalendarViewScreen
 from utils.bluetooth_manager import BluetoothManager
 from utils.authentication import Authentication
 from database.db_handler import DatabaseHandler
+from database.async_db import AsyncDatabase
+from database.sync import start_background_sync
 
 # Set window size for desktop testing
 if platform not in ('android', 'ios'):
@@ -465,6 +467,17 @@ class ModernJainTempleApp(App):
         self.db = DatabaseHandler()
         self.db.setup_database()
         
+        # Commit check-ins in groups rather than one transaction per visit
+        self.db.enable_group_commit()
+        
+        # Worker thread for queries issued by the screens; it also
+        # commits buffered check-ins when idle
+        self.db_async = AsyncDatabase(self.db)
+        
+        # Sync with the other kiosks when a sync server is configured
+        # (python -m database.maintenance sync URL --save)
+        self.sync = start_background_sync(self.db)
+        
         # Initialize authentication system
         self.auth = Authentication(self.db)
         
@@ -492,9 +505,18 @@ class ModernJainTempleApp(App):
         
         print("Using mock Bluetooth implementation for desktop testing")
     
+    def on_pause(self):
+        """Called when the app is paused; Android may kill it afterwards."""
+        # Make sure buffered check-ins reach the database
+        self.db_async.flush()
+        return True
+    
     def on_stop(self):
         """Called when the application stops."""
-        # Close database connection
+        # Write buffered visits and close database connections
+        if self.sync:
+            self.sync.stop()
+        self.db_async.stop()
         self.db.close_connection()
         
         # Disconnect bluetooth if connected
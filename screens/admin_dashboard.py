@@ -5,6 +5,119 @@ from kivy.uix.label import Label
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 
+from utils.devotee_picker import DevoteePicker
+from utils.devotee_search import DevoteeListLoader
+
+class DevoteeListPopup(Popup):
+    """
+    Devotee list with search, on a RecycleView of DevoteeRow views.
+    
+    Only the rows on screen have widgets, and their Edit and Delete
+    buttons find the devotee through the row's devotee_id, so nothing is
+    bound per devotee. Pages are loaded as the list is scrolled; edits
+    and deletes update their row in place.
+    """
+    
+    # Devotees fetched per page
+    PAGE_SIZE = 100
+    
+    def __init__(self, **kwargs):
+        from kivy.uix.recycleboxlayout import RecycleBoxLayout
+        from kivy.uix.recycleview import RecycleView
+        from kivy.uix.textinput import TextInput
+        
+        kwargs.setdefault('title', 'Devotee Management')
+        kwargs.setdefault('size_hint', (0.9, 0.9))
+        kwargs.setdefault('auto_dismiss', False)
+        super(DevoteeListPopup, self).__init__(**kwargs)
+        
+        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        
+        # Search by ID, name, phone, email or address as it is typed
+        search_input = TextInput(
+            hint_text='Search by ID, name, phone, email or address',
+            multiline=False,
+            size_hint_y=None,
+            height='40dp'
+        )
+        content.add_widget(search_input)
+        
+        self.status = Label(text='Loading...', size_hint_y=None, height='30dp')
+        content.add_widget(self.status)
+        
+        self.list_view = RecycleView(viewclass='DevoteeRow')
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, 50),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=5
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.list_view.add_widget(layout)
+        self.list_view.bind(scroll_y=self._scrolled)
+        content.add_widget(self.list_view)
+        
+        close_btn = Button(
+            text='Close',
+            size_hint_y=None,
+            height='50dp'
+        )
+        close_btn.bind(on_release=lambda btn: self.dismiss())
+        content.add_widget(close_btn)
+        self.content = content
+        
+        self.loader = DevoteeListLoader(
+            App.get_running_app().db_async, self._show, page_size=self.PAGE_SIZE
+        )
+        search_input.bind(text=lambda field, text: self.loader.set_query(text))
+        self.loader.reload()
+    
+    def update_devotee(self, devotee):
+        """Show a devotee's new details in its row."""
+        index = self.loader.index(devotee.id) if devotee else None
+        if index is not None:
+            self.loader.devotees[index] = devotee
+            self.list_view.data[index] = devotee_row(devotee)
+    
+    def remove_devotee(self, devotee_id):
+        """Drop a deleted devotee's row."""
+        index = self.loader.index(devotee_id)
+        if index is not None:
+            del self.loader.devotees[index]
+            del self.list_view.data[index]
+            self._show_status()
+    
+    def _scrolled(self, view, scroll_y):
+        """Fetch the next page when the list is scrolled near its end."""
+        if scroll_y <= 0.1:
+            self.loader.load_more()
+    
+    def _show(self):
+        """Show the devotees loaded so far."""
+        self.list_view.data = [devotee_row(devotee) for devotee in self.loader.devotees]
+        self._show_status()
+    
+    def _show_status(self):
+        """Describe the list above it."""
+        loader = self.loader
+        if loader.devotees:
+            more = '+' if loader.has_more else ''
+            self.status.text = f'{len(loader.devotees):,}{more} devotees'
+        elif loader.loading:
+            self.status.text = 'Loading...'
+        elif loader.query:
+            self.status.text = f'No devotees match "{loader.query}"'
+        else:
+            self.status.text = 'No devotees found'
+
+def devotee_row(devotee):
+    """RecycleView data of a DevoteeRow."""
+    info_text = f"ID: {devotee.id} - {devotee.name}"
+    if devotee.phone:
+        info_text += f" - {devotee.phone}"
+    return {'devotee_id': devotee.id, 'info': info_text}
+
 class AdminDashboardScreen(Screen):
     """
     Admin dashboard screen with various administrative functions.
@@ -26,109 +139,37 @@ class AdminDashboardScreen(Screen):
         app.root.current = 'add_devotee'
     
     def view_devotees(self):
-        """Display a list of all devotees."""
-        app = App.get_running_app()
-        devotees = app.db.get_all_devotees()
-        
-        # Create popup to show devotee list
-        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
-        
-        # Add title
-        content.add_widget(Label(
-            text='Devotee List',
-            font_size='20sp',
-            size_hint_y=None,
-            height='40dp'
-        ))
-        
-        # Create scrollable list
-        from kivy.uix.scrollview import ScrollView
-        from kivy.uix.gridlayout import GridLayout
-        
-        scroll = ScrollView(size_hint=(1, 0.8))
-        grid = GridLayout(cols=1, spacing=5, size_hint_y=None)
-        grid.bind(minimum_height=grid.setter('height'))
-        
-        # Add devotees to the list
-        if devotees:
-            for devotee in devotees:
-                # Create a row for each devotee
-                row = BoxLayout(
-                    orientation='horizontal',
-                    size_hint_y=None,
-                    height='50dp'
-                )
-                
-                # Add devotee info
-                info_text = f"ID: {devotee[0]} - {devotee[1]}"
-                if devotee[2]:  # If phone exists
-                    info_text += f" - {devotee[2]}"
-                
-                row.add_widget(Label(text=info_text, size_hint_x=0.7))
-                
-                # Add edit button
-                edit_btn = Button(
-                    text='Edit',
-                    size_hint_x=0.15
-                )
-                devotee_id = devotee[0]
-                edit_btn.bind(on_release=lambda btn, id=devotee_id: self.edit_devotee(id))
-                row.add_widget(edit_btn)
-                
-                # Add delete button
-                delete_btn = Button(
-                    text='Delete',
-                    size_hint_x=0.15,
-                    background_color=[0.8, 0.2, 0.2, 1]
-                )
-                delete_btn.bind(on_release=lambda btn, id=devotee_id: self.confirm_delete_devotee(id))
-                row.add_widget(delete_btn)
-                
-                grid.add_widget(row)
-        else:
-            grid.add_widget(Label(
-                text='No devotees found',
-                size_hint_y=None,
-                height='50dp'
-            ))
-        
-        scroll.add_widget(grid)
-        content.add_widget(scroll)
-        
-        # Add close button
-        close_btn = Button(
-            text='Close',
-            size_hint_y=None,
-            height='50dp'
-        )
-        
-        content.add_widget(close_btn)
-        
-        # Create and show popup
-        popup = Popup(
-            title='Devotee Management',
-            content=content,
-            size_hint=(0.9, 0.9),
-            auto_dismiss=False
-        )
-        
-        close_btn.bind(on_release=popup.dismiss)
-        popup.open()
+        """Show the devotee list, loading it a page at a time."""
+        if getattr(self, '_devotee_list', None) is None:
+            self._devotee_list = DevoteeListPopup()
+            self._devotee_list.bind(on_dismiss=self._devotee_list_closed)
+            self._devotee_list.open()
+    
+    def _devotee_list_closed(self, popup):
+        """Forget the devotee list once it is closed."""
+        popup.loader.stop()
+        self._devotee_list = None
     
     def edit_devotee(self, devotee_id):
         """Open a popup to edit devotee details."""
+        # Load the current details on the database thread
+        App.get_running_app().db_async.submit(
+            'get_devotee', devotee_id, callback=self._show_edit_devotee
+        )
+    
+    def _show_edit_devotee(self, devotee):
+        """Show the edit popup for a loaded devotee."""
         app = App.get_running_app()
-        devotee = app.db.get_devotee(devotee_id)
-        
         if not devotee:
             return
+        devotee_id = devotee.id
         
         # Create popup content
         content = BoxLayout(orientation='vertical', spacing=10, padding=10)
         
         # Add title
         content.add_widget(Label(
-            text=f'Edit Devotee: {devotee[1]}',
+            text=f'Edit Devotee: {devotee.name}',
             font_size='18sp',
             size_hint_y=None,
             height='40dp'
@@ -138,12 +179,12 @@ class AdminDashboardScreen(Screen):
         from kivy.uix.textinput import TextInput
         
         # ID (read-only)
-        content.add_widget(Label(text=f'Devotee ID: {devotee[0]}', halign='left', size_hint_y=None, height='30dp'))
+        content.add_widget(Label(text=f'Devotee ID: {devotee.id}', halign='left', size_hint_y=None, height='30dp'))
         
         # Name
         content.add_widget(Label(text='Name:', halign='left', size_hint_y=None, height='30dp'))
         name_input = TextInput(
-            text=devotee[1],
+            text=devotee.name,
             multiline=False,
             size_hint_y=None,
             height='40dp'
@@ -153,7 +194,7 @@ class AdminDashboardScreen(Screen):
         # Phone
         content.add_widget(Label(text='Phone:', halign='left', size_hint_y=None, height='30dp'))
         phone_input = TextInput(
-            text=devotee[2] if devotee[2] else '',
+            text=devotee.phone,
             multiline=False,
             size_hint_y=None,
             height='40dp'
@@ -163,7 +204,7 @@ class AdminDashboardScreen(Screen):
         # Email
         content.add_widget(Label(text='Email:', halign='left', size_hint_y=None, height='30dp'))
         email_input = TextInput(
-            text=devotee[3] if devotee[3] else '',
+            text=devotee.email,
             multiline=False,
             size_hint_y=None,
             height='40dp'
@@ -173,7 +214,7 @@ class AdminDashboardScreen(Screen):
         # Address
         content.add_widget(Label(text='Address:', halign='left', size_hint_y=None, height='30dp'))
         address_input = TextInput(
-            text=devotee[4] if devotee[4] else '',
+            text=devotee.address,
             multiline=True,
             size_hint_y=None,
             height='80dp'
@@ -217,19 +258,27 @@ class AdminDashboardScreen(Screen):
                 error_label.text = 'Name is required'
                 return
             
-            # Update devotee
-            success = app.db.update_devotee(
+            # Update devotee on the database thread
+            save_btn.disabled = True
+            app.db_async.submit(
+                'update_devotee',
                 devotee_id,
                 name_input.text.strip(),
                 phone_input.text.strip(),
                 email_input.text.strip(),
-                address_input.text.strip()
+                address_input.text.strip(),
+                callback=devotee_saved
             )
-            
+        
+        def devotee_saved(success):
+            """Close the popup, or show why the update failed."""
+            save_btn.disabled = False
             if success:
                 popup.dismiss()
-                # Refresh the devotee list
-                self.view_devotees()
+                # Pickers must not offer the old details as a recent pick
+                DevoteePicker.forget(devotee_id)
+                # Update the row in the open devotee list
+                app.db_async.submit('get_devotee', devotee_id, callback=self._devotee_changed)
             else:
                 error_label.text = 'Failed to update devotee'
         
@@ -238,20 +287,31 @@ class AdminDashboardScreen(Screen):
         # Show popup
         popup.open()
     
+    def _devotee_changed(self, devotee):
+        """Show a devotee's saved details in the devotee list, if open."""
+        if devotee and getattr(self, '_devotee_list', None) is not None:
+            self._devotee_list.update_devotee(devotee)
+    
     def confirm_delete_devotee(self, devotee_id):
         """Show confirmation dialog before deleting a devotee."""
+        # Load the devotee's details on the database thread
+        App.get_running_app().db_async.submit(
+            'get_devotee', devotee_id, callback=self._show_delete_devotee
+        )
+    
+    def _show_delete_devotee(self, devotee):
+        """Ask to confirm deleting a loaded devotee."""
         app = App.get_running_app()
-        devotee = app.db.get_devotee(devotee_id)
-        
         if not devotee:
             return
+        devotee_id = devotee.id
         
         # Create confirmation dialog
         content = BoxLayout(orientation='vertical', spacing=10, padding=10)
         
         # Add warning message
         content.add_widget(Label(
-            text=f'Are you sure you want to delete devotee:\n{devotee[1]} (ID: {devotee[0]})?',
+            text=f'Are you sure you want to delete devotee:\n{devotee.name} (ID: {devotee.id})?',
             halign='center'
         ))
         
@@ -288,49 +348,276 @@ class AdminDashboardScreen(Screen):
         cancel_btn.bind(on_release=popup.dismiss)
         
         def perform_delete(btn):
-            """Delete the devotee."""
-            success = app.db.delete_devotee(devotee_id)
+            """Delete the devotee on the database thread."""
             popup.dismiss()
-            
-            # Refresh the devotee list
+            app.db_async.submit('delete_devotee', devotee_id, callback=devotee_deleted)
+        
+        def devotee_deleted(success):
+            """Drop the row from the open devotee list."""
             if success:
-                self.view_devotees()
+                DevoteePicker.forget(devotee_id)
+                if getattr(self, '_devotee_list', None) is not None:
+                    self._devotee_list.remove_devotee(devotee_id)
         
         delete_btn.bind(on_release=perform_delete)
         
         # Show popup
         popup.open()
     
+    def import_devotees(self):
+        """Pick a CSV file of devotees and import it in the background."""
+        import os
+        from kivy.uix.filechooser import FileChooserListView
+        from database.devotee_import import import_devotees
+        
+        app = App.get_running_app()
+        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        
+        status = Label(
+            text='Choose a CSV file with id and name columns\n(phone, email and address are optional)',
+            halign='center',
+            size_hint_y=None,
+            height='60dp'
+        )
+        status.bind(width=lambda label, width: setattr(label, 'text_size', (width, None)))
+        content.add_widget(status)
+        
+        chooser = FileChooserListView(
+            path=os.path.expanduser('~'),
+            filters=['*.csv', '*.CSV'],
+            size_hint=(1, 0.7)
+        )
+        content.add_widget(chooser)
+        
+        buttons = BoxLayout(size_hint_y=None, height='50dp', spacing=10)
+        close_btn = Button(text='Close')
+        import_btn = Button(text='Import', background_color=[0.2, 0.7, 0.3, 1])
+        buttons.add_widget(close_btn)
+        buttons.add_widget(import_btn)
+        content.add_widget(buttons)
+        
+        popup = Popup(
+            title='Import Devotees',
+            content=content,
+            size_hint=(0.9, 0.9),
+            auto_dismiss=False
+        )
+        
+        def start_import(btn):
+            if not chooser.selection:
+                status.text = 'Select a CSV file first'
+                return
+            path = chooser.selection[0]
+            rejects_path = os.path.splitext(path)[0] + '-rejects.csv'
+            import_btn.disabled = True
+            close_btn.disabled = True
+            status.text = 'Importing...'
+            
+            def on_progress(rows):
+                status.text = f'Importing... {rows:,} rows read'
+            
+            def on_done(result):
+                import_btn.disabled = False
+                close_btn.disabled = False
+                status.text = (
+                    f'{result.inserted:,} added, {result.updated:,} updated, '
+                    f'{result.unchanged:,} unchanged, {result.rejected:,} rejected'
+                )
+                if result.rejected:
+                    status.text += f'\nRejected rows saved to {rejects_path}'
+            
+            def on_error(error):
+                import_btn.disabled = False
+                close_btn.disabled = False
+                status.text = f'Import failed: {error}'
+            
+            self._run_in_background(
+                import_devotees,
+                on_done,
+                on_error,
+                app.db,
+                path,
+                rejects_path=rejects_path,
+                progress=self._on_ui_thread(on_progress)
+            )
+        
+        import_btn.bind(on_release=start_import)
+        close_btn.bind(on_release=popup.dismiss)
+        popup.open()
+    
     def backup_data(self):
-        """Create a backup of the database."""
-        # This would typically export the database to an external file
-        # For simplicity, we'll just show a success message
+        """Show the backups with options to back up now or restore one."""
+        from kivy.uix.scrollview import ScrollView
+        from kivy.uix.gridlayout import GridLayout
         
-        content = BoxLayout(orientation='vertical', padding=10)
+        manager = self._backup_manager()
+        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        
+        status = Label(
+            text=f'Backups are kept in {manager.backup_dir}',
+            halign='center',
+            size_hint_y=None,
+            height='60dp'
+        )
+        status.bind(width=lambda label, width: setattr(label, 'text_size', (width, None)))
+        content.add_widget(status)
+        
+        # List of existing backups, newest first
+        scroll = ScrollView(size_hint=(1, 0.7))
+        grid = GridLayout(cols=1, spacing=5, size_hint_y=None)
+        grid.bind(minimum_height=grid.setter('height'))
+        scroll.add_widget(grid)
+        content.add_widget(scroll)
+        
+        buttons = BoxLayout(size_hint_y=None, height='50dp', spacing=10)
+        close_btn = Button(text='Close')
+        backup_btn = Button(text='Back Up Now', background_color=[0.2, 0.7, 0.3, 1])
+        buttons.add_widget(close_btn)
+        buttons.add_widget(backup_btn)
+        content.add_widget(buttons)
+        
+        popup = Popup(
+            title='Backup Data',
+            content=content,
+            size_hint=(0.9, 0.9),
+            auto_dismiss=False
+        )
+        
+        def show_backups():
+            grid.clear_widgets()
+            backups = manager.list_backups()
+            if not backups:
+                grid.add_widget(Label(text='No backups yet', size_hint_y=None, height='50dp'))
+            for path, size, created in backups:
+                row = BoxLayout(orientation='horizontal', size_hint_y=None, height='50dp')
+                row.add_widget(Label(
+                    text=f"{created:%Y-%m-%d %H:%M}  ({size / 1024 / 1024:.1f} MB)",
+                    size_hint_x=0.7
+                ))
+                restore_btn = Button(
+                    text='Restore',
+                    size_hint_x=0.3,
+                    background_color=[0.8, 0.2, 0.2, 1]
+                )
+                restore_btn.bind(on_release=lambda btn, path=path: self.confirm_restore(path, popup))
+                row.add_widget(restore_btn)
+                grid.add_widget(row)
+        
+        def start_backup(btn):
+            backup_btn.disabled = True
+            status.text = 'Backing up...'
+            
+            def on_progress(copied, total):
+                status.text = f'Backing up... {copied * 100 // max(total, 1)}%'
+            
+            def on_done(path):
+                backup_btn.disabled = False
+                status.text = f'Backup saved to {path}'
+                show_backups()
+            
+            def on_error(error):
+                backup_btn.disabled = False
+                status.text = f'Backup failed: {error}'
+            
+            self._run_in_background(
+                manager.create_backup,
+                on_done,
+                on_error,
+                progress=self._on_ui_thread(on_progress)
+            )
+        
+        backup_btn.bind(on_release=start_backup)
+        close_btn.bind(on_release=popup.dismiss)
+        show_backups()
+        popup.open()
+    
+    def confirm_restore(self, backup_path, backups_popup):
+        """Ask for confirmation, then restore the database from a backup."""
+        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
         
         message = Label(
-            text='Data backup functionality will be implemented\nbased on client requirements.',
+            text='Replace all current data with this backup?\n'
+                 'The current data is backed up first.',
             halign='center'
         )
         content.add_widget(message)
         
-        close_btn = Button(
-            text='Close',
-            size_hint_y=None,
-            height='50dp'
-        )
-        content.add_widget(close_btn)
+        buttons = BoxLayout(size_hint_y=None, height='50dp', spacing=10)
+        cancel_btn = Button(text='Cancel')
+        restore_btn = Button(text='Restore', background_color=[0.8, 0.2, 0.2, 1])
+        buttons.add_widget(cancel_btn)
+        buttons.add_widget(restore_btn)
+        content.add_widget(buttons)
         
         popup = Popup(
-            title='Backup Data',
+            title='Restore Backup',
             content=content,
             size_hint=(0.8, 0.4),
             auto_dismiss=False
         )
         
-        close_btn.bind(on_release=popup.dismiss)
+        def finish(text):
+            message.text = text
+            buttons.remove_widget(restore_btn)
+            cancel_btn.text = 'Close'
+            cancel_btn.disabled = False
+        
+        def perform_restore(btn):
+            restore_btn.disabled = True
+            cancel_btn.disabled = True
+            message.text = 'Restoring...'
+            backups_popup.dismiss()
+            self._run_in_background(
+                self._backup_manager().restore,
+                lambda result: finish('Backup restored.'),
+                lambda error: finish(f'Restore failed:\n{error}'),
+                backup_path
+            )
+        
+        cancel_btn.bind(on_release=popup.dismiss)
+        restore_btn.bind(on_release=perform_restore)
         popup.open()
     
+    def _backup_manager(self):
+        """Get the BackupManager for the app database."""
+        from database.backup import BackupManager
+        
+        app = App.get_running_app()
+        if getattr(self, '_backups', None) is None or self._backups.db is not app.db:
+            self._backups = BackupManager(app.db)
+        return self._backups
+    
+    def _on_ui_thread(self, func):
+        """Wrap func so calls from a worker thread run on the Kivy main thread."""
+        from kivy.clock import Clock
+        return lambda *args: Clock.schedule_once(lambda dt: func(*args), 0)
+    
+    def _run_in_background(self, func, callback, error_callback, *args, **kwargs):
+        """
+        Run a long operation (backup, restore, import) on its own thread.
+        
+        The callbacks run on the Kivy main thread with the result or the
+        exception. Short database calls go through app.db_async instead.
+        """
+        import threading
+        
+        app = App.get_running_app()
+        done = self._on_ui_thread(callback)
+        failed = self._on_ui_thread(error_callback)
+        
+        def run():
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                print(f"Error in background task: {e}")
+                failed(e)
+            else:
+                done(result)
+            finally:
+                app.db.pool.release_thread_connection()
+        
+        threading.Thread(target=run, daemon=True).start()
+    
     def open_settings(self):
         """Open application settings."""
         # This would be implemented based on client requirements
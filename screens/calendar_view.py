@@ -1,29 +1,37 @@
 from kivy.uix.screenmanager import Screen
 from kivy.app import App
-from kivy.uix.label import Label
 from kivy.uix.button import Button
-from kivy.graphics import Color, Rectangle
 import calendar
 import datetime
 
+# Registers the DevoteePicker widget used in jainapp.kv
+from utils.devotee_picker import DevoteePicker
+
+# Six weeks of seven days fit any month
+CALENDAR_CELLS = 42
+
+# Weeks start on Sunday like the header in jainapp.kv
+WEEKS = calendar.Calendar(firstweekday=calendar.SUNDAY)
+
+PRESENT_COLOR = [0.2, 0.8, 0.2, 1]
+ABSENT_COLOR = [0.8, 0.2, 0.2, 1]
+
 class CalendarViewScreen(Screen):
     """
     Screen for viewing devotee attendance in a calendar format.
     """
     
+    def __init__(self, **kwargs):
+        super(CalendarViewScreen, self).__init__(**kwargs)
+        # Incremented per calendar request so stale results can be dropped
+        self._calendar_request = 0
+        # Day buttons of the calendar grid, reused between months
+        self._cells = []
+    
     def on_enter(self):
         """Called when the screen is entered."""
-        app = App.get_running_app()
-        
-        # Populate devotee spinner
-        devotees = app.db.get_all_devotees()
-        if devotees:
-            devotee_values = [f"{d[0]} - {d[1]}" for d in devotees]
-            self.ids.devotee_spinner.values = devotee_values
-            self.ids.devotee_spinner.text = devotee_values[0]
-        else:
-            self.ids.devotee_spinner.values = ['No devotees found']
-            self.ids.devotee_spinner.text = 'No devotees found'
+        # Start with the devotee picked last, here or in Reports
+        self.ids.devotee_picker.select_recent()
         
         # Set default month and year
         now = datetime.datetime.now()
@@ -33,80 +41,72 @@ class CalendarViewScreen(Screen):
         # Update calendar
         self.update_calendar()
     
-    def select_devotee(self, devotee_text):
-        """Called when a devotee is selected from the spinner."""
-        if devotee_text != 'No devotees found':
+    def select_devotee(self, devotee):
+        """Called when a devotee is picked."""
+        if devotee:
             self.update_calendar()
     
     def update_calendar(self):
-        """Update the calendar grid with attendance data."""
-        # Clear the calendar grid
-        self.ids.calendar_grid.clear_widgets()
-        
+        """Load attendance data for the selected devotee and month."""
         # Get current selections
-        devotee_text = self.ids.devotee_spinner.text
+        devotee = self.ids.devotee_picker.devotee
         month_text = self.ids.month_spinner.text
         year_text = self.ids.year_spinner.text
         
-        if devotee_text == 'No devotees found':
+        if devotee is None:
             return
         
-        # Extract devotee ID
-        devotee_id = devotee_text.split(' - ')[0]
+        # Get the month's attendance bitmap on the database thread
+        self._calendar_request += 1
+        request = self._calendar_request
+        app = App.get_running_app()
+        app.db_async.submit(
+            'get_attendance_bitmap', devotee.id, year_text, month_text,
+            callback=lambda bitmap: self._show_calendar(request, month_text, year_text, bitmap)
+        )
+    
+    def _day_cells(self):
+        """The calendar grid's day buttons, created on first use."""
+        if not self._cells:
+            grid = self.ids.calendar_grid
+            grid.clear_widgets()
+            for _ in range(CALENDAR_CELLS):
+                cell = Button()
+                self._cells.append(cell)
+                grid.add_widget(cell)
+        return self._cells
+    
+    def _show_calendar(self, request, month_text, year_text, bitmap):
+        """Update the calendar grid with attendance data."""
+        # The selection changed while this month was loading
+        if request != self._calendar_request:
+            return
         
         # Convert month name to number
         month_names = {name: num for num, name in enumerate(calendar.month_name) if num}
         month_num = month_names.get(month_text, 1)  # Default to January if not found
         
-        # Convert year to int
-        year_num = int(year_text)
-        
-        # Get calendar for month
-        cal = calendar.monthcalendar(year_num, month_num)
-        
-        # Get attendance data
-        app = App.get_running_app()
-        attendance_dates = app.db.get_attendance_calendar(devotee_id, year_text, month_text)
-        
-        # Convert to datetime objects for easy comparison
-        attendance_set = set()
-        for date_str in attendance_dates:
-            attendance_set.add(date_str)
+        # Day numbers in Sunday-first weeks, matching the header; 0 pads
+        # the weeks before the 1st and after the last day
+        days = list(WEEKS.itermonthdays(int(year_text), month_num))
+        days += [0] * (CALENDAR_CELLS - len(days))
         
-        # Populate calendar grid
-        for week in cal:
-            for day in week:
-                if day == 0:
-                    # Empty day (padding at start/end of month)
-                    self.ids.calendar_grid.add_widget(Label(text=''))
+        # Reuse the same cells for every month
+        for cell, day in zip(self._day_cells(), days):
+            if day == 0:
+                cell.text = ''
+                cell.disabled = True
+                cell.opacity = 0
+            else:
+                cell.text = str(day)
+                cell.disabled = False
+                cell.opacity = 1
+                if bitmap >> (day - 1) & 1:
+                    # Green for present
+                    cell.background_color = PRESENT_COLOR
                 else:
-                    # Format date to match database format (YYYY-MM-DD)
-                    if month_num < 10:
-                        month_str = f"0{month_num}"
-                    else:
-                        month_str = str(month_num)
-                    
-                    if day < 10:
-                        day_str = f"0{day}"
-                    else:
-                        day_str = str(day)
-                    
-                    date_str = f"{year_num}-{month_str}-{day_str}"
-                    
-                    # Check if devotee was present on this day
-                    is_present = date_str in attendance_set
-                    
-                    # Create day button with appropriate color
-                    day_btn = Button(text=str(day))
-                    
-                    if is_present:
-                        # Green for present
-                        day_btn.background_color = [0.2, 0.8, 0.2, 1]
-                    else:
-                        # Red for absent or default
-                        day_btn.background_color = [0.8, 0.2, 0.2, 1]
-                    
-                    self.ids.calendar_grid.add_widget(day_btn)
+                    # Red for absent or default
+                    cell.background_color = ABSENT_COLOR
     
     def go_back(self):
         """Navigate back to admin dashboard."""
@@ -149,8 +149,17 @@ class DevoteeScreen(Screen):
             self.ids.error_label.text = 'Please enter a devotee ID'
             return
         
+        # Look up the devotee on the database thread
+        app.db_async.submit(
+            'get_devotee', devotee_id,
+            callback=lambda devotee: self._on_devotee_loaded(devotee_id, devotee)
+        )
+    
+    def _on_devotee_loaded(self, devotee_id, devotee):
+        """Continue the check-in once the devotee lookup has finished."""
+        app = App.get_running_app()
+        
         # Check if devotee exists
-        devotee = app.db.get_devotee(devotee_id)
         if not devotee:
             self.ids.error_label.text = 'Devotee ID not found'
             return
@@ -160,14 +169,23 @@ class DevoteeScreen(Screen):
             self.ids.error_label.text = 'Printer not connected'
             return
         
-        # Select random item
-        selected_item = self.item_selector.select_random_item()
+        # Select a weighted random item the devotee did not get recently;
+        # the draw may load their visit history, so it runs on the
+        # database thread too
+        app.db_async.submit(
+            self.item_selector.select_random_item, devotee_id,
+            callback=lambda item: self._on_item_selected(devotee_id, devotee, item)
+        )
+    
+    def _on_item_selected(self, devotee_id, devotee, selected_item):
+        """Show, record and print the item drawn for a devotee."""
+        app = App.get_running_app()
         
         # Show the selected item with animation
         self.ids.selected_item_label.text = f"Selected: {selected_item}"
         
         # Record the visit in database
-        app.db.record_visit(devotee_id, selected_item)
+        app.db_async.submit('record_visit', devotee_id, selected_item)
         
         # Get current date
         current_date = datetime.date.today().strftime("%d/%m/%Y")
@@ -175,7 +193,7 @@ class DevoteeScreen(Screen):
         # Print the label
         print_data = {
             'devotee_id': devotee_id,
-            'devotee_name': devotee[1],  # Name is at index 1
+            'devotee_name': devotee.name,
             'selected_item': selected_item,
             'date': current_date
         }
@@ -3,14 +3,70 @@ from kivy.app import App
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
 import datetime
 
+# DevoteePicker is registered here for the Devotee-wise filter in jainapp.kv
+from utils.devotee_picker import DevoteePicker, label_for
+from utils.report_export import EXPORT_HEADERS, ExportCancelled, ExportJob, default_export_path
+
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June',
+          'July', 'August', 'September', 'October', 'November', 'December']
+
+# Column titles with relative widths, and the message shown when a report
+# has no rows, per report type
+REPORT_LAYOUTS = {
+    'Daily': (
+        (('Devotee ID', 0.25), ('Name', 0.4), ('Selected Item', 0.35)),
+        'No visits found for this date'
+    ),
+    'Monthly': (
+        (('Date', 0.7), ('Visit Count', 0.3)),
+        'No visits found for this month'
+    ),
+    'Yearly': (
+        (('Month', 0.7), ('Visit Count', 0.3)),
+        'No visits found for this year'
+    ),
+    'Devotee-wise': (
+        (('Date', 0.5), ('Selected Item', 0.5)),
+        'No visits found for this devotee'
+    ),
+}
+
+def report_rows(report_type, visits):
+    """
+    Turn report query results into rows of three cell texts.
+    
+    Args:
+        report_type: Key of REPORT_LAYOUTS
+        visits: Visit objects (Daily, Devotee-wise) or count rows returned
+            by the report query
+    
+    Returns:
+        List of [text, text, text] lists; unused columns are empty
+    """
+    if report_type == 'Daily':
+        # Devotee ID, name, selected item
+        return [[str(visit.devotee_id), str(visit.devotee_name), visit.selected_item] for visit in visits]
+    if report_type == 'Monthly':
+        # Date, visit count
+        return [[str(visit[0]), str(visit[1]), ''] for visit in visits]
+    if report_type == 'Yearly':
+        # Month name, visit count
+        return [[MONTHS[int(visit[0]) - 1], str(visit[1]), ''] for visit in visits]
+    # Devotee-wise: date, selected item
+    return [[visit.visit_date_text, visit.selected_item, ''] for visit in visits]
+
 class ReportsScreen(Screen):
     """
     Screen for viewing various reports about temple visits.
     """
     
+    def __init__(self, **kwargs):
+        super(ReportsScreen, self).__init__(**kwargs)
+        # Incremented per report request so stale results can be dropped
+        self._report_request = 0
+    
     def on_enter(self):
         """Called when the screen is entered."""
         # Initialize report type spinner values
@@ -22,9 +78,13 @@ class ReportsScreen(Screen):
     def change_report_type(self, report_type):
         """Change the type of report to display."""
         # Clear current report
-        self.ids.report_data.clear_widgets()
+        self.ids.report_data.data = []
         self.ids.report_title.text = f'{report_type} Report'
         
+        # Devotee-wise reports pick the devotee with the searchable picker
+        # instead of the filter spinner
+        self._show_devotee_picker(report_type == 'Devotee-wise')
+        
         # Update filter spinner based on report type
         if report_type == 'Daily':
             # Last 7 days
@@ -36,12 +96,10 @@ class ReportsScreen(Screen):
             
         elif report_type == 'Monthly':
             # Last 12 months
-            months = ['January', 'February', 'March', 'April', 'May', 'June',
-                     'July', 'August', 'September', 'October', 'November', 'December']
             current_month = datetime.date.today().month - 1  # 0-indexed
-            ordered_months = months[current_month:] + months[:current_month]
+            ordered_months = MONTHS[current_month:] + MONTHS[:current_month]
             self.ids.filter_spinner.values = ordered_months
-            self.ids.filter_spinner.text = months[current_month]  # Current month
+            self.ids.filter_spinner.text = MONTHS[current_month]  # Current month
             
         elif report_type == 'Yearly':
             # Last 3 years
@@ -51,243 +109,115 @@ class ReportsScreen(Screen):
             self.ids.filter_spinner.text = str(current_year)  # Current year
             
         elif report_type == 'Devotee-wise':
-            # Get all devotees
-            app = App.get_running_app()
-            devotees = app.db.get_all_devotees()
-            if devotees:
-                devotee_values = [f"{d[0]} - {d[1]}" for d in devotees]
-                self.ids.filter_spinner.values = devotee_values
-                self.ids.filter_spinner.text = devotee_values[0]
-            else:
-                self.ids.filter_spinner.values = ['No devotees found']
-                self.ids.filter_spinner.text = 'No devotees found'
+            # Start with the devotee picked last, here or in the calendar
+            if self.ids.devotee_picker.select_recent() is None:
+                self.ids.report_title.text = 'Devotee Report: select a devotee'
+                return
         
         # Load report data
-        self.apply_filter(self.ids.filter_spinner.text)
+        self.apply_filter(self._filter_value())
+    
+    def _show_devotee_picker(self, show):
+        """Show the devotee picker in place of the filter spinner, or back."""
+        for widget, visible in ((self.ids.devotee_picker, show), (self.ids.filter_spinner, not show)):
+            widget.size_hint_x = 1 if visible else 0
+            widget.opacity = 1 if visible else 0
+            widget.disabled = not visible
+    
+    def _filter_value(self):
+        """Current filter: the spinner text, or "ID - Name" of the picked devotee."""
+        if self.ids.report_type.text == 'Devotee-wise':
+            devotee = self.ids.devotee_picker.devotee
+            return label_for(devotee) if devotee else ''
+        return self.ids.filter_spinner.text
+    
+    def select_devotee(self, devotee):
+        """Called when a devotee is picked for the Devotee-wise report."""
+        if devotee and self.ids.report_type.text == 'Devotee-wise':
+            self.apply_filter(label_for(devotee))
     
     def apply_filter(self, filter_value):
-        """Apply the selected filter and display the report."""
+        """Apply the selected filter and load the report in the background."""
         # Clear existing report data
-        self.ids.report_data.clear_widgets()
+        self.ids.report_data.data = []
         
         app = App.get_running_app()
         report_type = self.ids.report_type.text
         
         if report_type == 'Daily':
-            # Get visits for selected date
-            visits = app.db.get_daily_visits(filter_value)
-            
-            # Create header
-            header = BoxLayout(
-                orientation='horizontal',
-                size_hint_y=None,
-                height='40dp',
-                spacing=5
-            )
-            header.add_widget(Label(text='Devotee ID', size_hint_x=0.25))
-            header.add_widget(Label(text='Name', size_hint_x=0.4))
-            header.add_widget(Label(text='Selected Item', size_hint_x=0.35))
-            self.ids.report_data.add_widget(header)
-            
-            # Add separator
-            self.ids.report_data.add_widget(BoxLayout(
-                size_hint_y=None,
-                height='1dp',
-                background_color=[0.5, 0.5, 0.5, 1]
-            ))
-            
-            # Add visits
-            if visits:
-                for visit in visits:
-                    row = BoxLayout(
-                        orientation='horizontal',
-                        size_hint_y=None,
-                        height='40dp',
-                        spacing=5
-                    )
-                    row.add_widget(Label(text=str(visit[1]), size_hint_x=0.25))  # Devotee ID
-                    row.add_widget(Label(text=str(visit[2]), size_hint_x=0.4))   # Name
-                    row.add_widget(Label(text=str(visit[3]), size_hint_x=0.35))  # Selected Item
-                    self.ids.report_data.add_widget(row)
-            else:
-                self.ids.report_data.add_widget(Label(
-                    text='No visits found for this date',
-                    size_hint_y=None,
-                    height='40dp'
-                ))
-            
-            # Update title with count
-            visit_count = len(visits)
-            self.ids.report_title.text = f'Daily Report: {filter_value} - {visit_count} visits'
-            
+            query = ('get_daily_visits', filter_value)
+        elif report_type == 'Monthly':
+            query = ('get_monthly_visits', datetime.date.today().year, filter_value)
+        elif report_type == 'Yearly':
+            query = ('get_yearly_visits', filter_value)
+        elif report_type == 'Devotee-wise' and filter_value:
+            query = ('get_devotee_visits', filter_value.split(' - ')[0])
+        else:
+            return
+        
+        self._report_request += 1
+        request = self._report_request
+        app.db_async.submit(
+            *query,
+            callback=lambda visits: self._show_report(request, report_type, filter_value, visits)
+        )
+    
+    def _show_report(self, request, report_type, filter_value, visits):
+        """Display report rows loaded by apply_filter."""
+        # A newer filter was applied while this report was loading
+        if request != self._report_request:
+            return
+        
+        columns, empty_message = REPORT_LAYOUTS[report_type]
+        widths = [width for _, width in columns] + [0] * (3 - len(columns))
+        self.ids.report_header.texts = [title for title, _ in columns] + [''] * (3 - len(columns))
+        self.ids.report_header.widths = widths
+        
+        # The RecycleView only creates widgets for the visible rows, so
+        # this stays cheap for reports with thousands of visits
+        if visits:
+            self.ids.report_data.data = [
+                {'texts': texts, 'widths': widths}
+                for texts in report_rows(report_type, visits)
+            ]
+        else:
+            self.ids.report_data.data = [
+                {'texts': [empty_message, '', ''], 'widths': [1, 0, 0]}
+            ]
+        
+        # Update title with count
+        if report_type == 'Daily':
+            self.ids.report_title.text = f'Daily Report: {filter_value} - {len(visits)} visits'
         elif report_type == 'Monthly':
-            # Get current year
+            total_visits = sum(visit[1] for visit in visits)
             current_year = datetime.date.today().year
-            
-            # Get visits for selected month
-            visits = app.db.get_monthly_visits(current_year, filter_value)
-            
-            # Create header
-            header = BoxLayout(
-                orientation='horizontal',
-                size_hint_y=None,
-                height='40dp',
-                spacing=5
-            )
-            header.add_widget(Label(text='Date', size_hint_x=0.7))
-            header.add_widget(Label(text='Visit Count', size_hint_x=0.3))
-            self.ids.report_data.add_widget(header)
-            
-            # Add separator
-            self.ids.report_data.add_widget(BoxLayout(
-                size_hint_y=None,
-                height='1dp',
-                background_color=[0.5, 0.5, 0.5, 1]
-            ))
-            
-            # Add visits
-            total_visits = 0
-            if visits:
-                for visit in visits:
-                    row = BoxLayout(
-                        orientation='horizontal',
-                        size_hint_y=None,
-                        height='40dp',
-                        spacing=5
-                    )
-                    row.add_widget(Label(text=str(visit[0]), size_hint_x=0.7))      # Date
-                    row.add_widget(Label(text=str(visit[1]), size_hint_x=0.3))      # Visit count
-                    self.ids.report_data.add_widget(row)
-                    total_visits += visit[1]
-            else:
-                self.ids.report_data.add_widget(Label(
-                    text='No visits found for this month',
-                    size_hint_y=None,
-                    height='40dp'
-                ))
-            
-            # Update title with count
             self.ids.report_title.text = f'Monthly Report: {filter_value} {current_year} - {total_visits} visits'
-            
         elif report_type == 'Yearly':
-            # Get visits for selected year
-            visits = app.db.get_yearly_visits(filter_value)
-            
-            # Create header
-            header = BoxLayout(
-                orientation='horizontal',
-                size_hint_y=None,
-                height='40dp',
-                spacing=5
-            )
-            header.add_widget(Label(text='Month', size_hint_x=0.7))
-            header.add_widget(Label(text='Visit Count', size_hint_x=0.3))
-            self.ids.report_data.add_widget(header)
-            
-            # Add separator
-            self.ids.report_data.add_widget(BoxLayout(
-                size_hint_y=None,
-                height='1dp',
-                background_color=[0.5, 0.5, 0.5, 1]
-            ))
-            
-            # Add visits
-            months = ['January', 'February', 'March', 'April', 'May', 'June',
-                     'July', 'August', 'September', 'October', 'November', 'December']
-            
-            total_visits = 0
-            if visits:
-                for visit in visits:
-                    month_idx = int(visit[0]) - 1  # 0-indexed
-                    month_name = months[month_idx]
-                    
-                    row = BoxLayout(
-                        orientation='horizontal',
-                        size_hint_y=None,
-                        height='40dp',
-                        spacing=5
-                    )
-                    row.add_widget(Label(text=month_name, size_hint_x=0.7))      # Month
-                    row.add_widget(Label(text=str(visit[1]), size_hint_x=0.3))   # Visit count
-                    self.ids.report_data.add_widget(row)
-                    total_visits += visit[1]
-            else:
-                self.ids.report_data.add_widget(Label(
-                    text='No visits found for this year',
-                    size_hint_y=None,
-                    height='40dp'
-                ))
-            
-            # Update title with count
+            total_visits = sum(visit[1] for visit in visits)
             self.ids.report_title.text = f'Yearly Report: {filter_value} - {total_visits} visits'
-            
         elif report_type == 'Devotee-wise':
-            if filter_value == 'No devotees found':
-                return
-                
-            # Extract devotee ID from spinner value
             devotee_id = filter_value.split(' - ')[0]
-            
-            # Get visits for selected devotee
-            visits = app.db.get_devotee_visits(devotee_id)
-            
-            # Create header
-            header = BoxLayout(
-                orientation='horizontal',
-                size_hint_y=None,
-                height='40dp',
-                spacing=5
-            )
-            header.add_widget(Label(text='Date', size_hint_x=0.5))
-            header.add_widget(Label(text='Selected Item', size_hint_x=0.5))
-            self.ids.report_data.add_widget(header)
-            
-            # Add separator
-            self.ids.report_data.add_widget(BoxLayout(
-                size_hint_y=None,
-                height='1dp',
-                background_color=[0.5, 0.5, 0.5, 1]
-            ))
-            
-            # Add visits
-            if visits:
-                for visit in visits:
-                    row = BoxLayout(
-                        orientation='horizontal',
-                        size_hint_y=None,
-                        height='40dp',
-                        spacing=5
-                    )
-                    row.add_widget(Label(text=str(visit[0]), size_hint_x=0.5))      # Date
-                    row.add_widget(Label(text=str(visit[1]), size_hint_x=0.5))      # Selected Item
-                    self.ids.report_data.add_widget(row)
-            else:
-                self.ids.report_data.add_widget(Label(
-                    text='No visits found for this devotee',
-                    size_hint_y=None,
-                    height='40dp'
-                ))
-            
-            # Update title with count
             devotee_name = filter_value.split(' - ')[1] if ' - ' in filter_value else devotee_id
             self.ids.report_title.text = f'Devotee Report: {devotee_name} - {len(visits)} visits'
     
     def export_report(self):
-        """Export the current report as a CSV file."""
-        # This would typically save the report to an external file
-        # For simplicity, we'll just show a success message
+        """Export the current report as a CSV file in the background."""
         from kivy.uix.popup import Popup
         
+        app = App.get_running_app()
+        report_type = self.ids.report_type.text
+        filter_value = self._filter_value()
+        
         content = BoxLayout(orientation='vertical', padding=10)
         
         message = Label(
-            text='Report exported successfully!',
+            text='Exporting report...',
             halign='center'
         )
         content.add_widget(message)
         
         close_btn = Button(
-            text='Close',
+            text='Cancel',
             size_hint_y=None,
             height='50dp'
         )
@@ -299,9 +229,47 @@ class ReportsScreen(Screen):
             size_hint=(0.8, 0.4),
             auto_dismiss=False
         )
-        
-        close_btn.bind(on_release=popup.dismiss)
         popup.open()
+        
+        if report_type not in EXPORT_HEADERS or not filter_value:
+            message.text = 'Select a report to export first'
+            close_btn.text = 'Close'
+            close_btn.bind(on_release=popup.dismiss)
+            return
+        
+        def on_progress(written, total):
+            if total:
+                message.text = f'Exported {written:,} of {total:,} rows...'
+            else:
+                message.text = f'Exported {written:,} rows...'
+        
+        def on_done(path, rows):
+            message.text = f'Exported {rows:,} rows to\n{path}'
+            close_btn.text = 'Close'
+        
+        def on_error(error):
+            if isinstance(error, ExportCancelled):
+                popup.dismiss()
+                return
+            message.text = f'Export failed: {error}'
+            close_btn.text = 'Close'
+        
+        year = datetime.date.today().year if report_type == 'Monthly' else None
+        job = ExportJob(
+            app.db, report_type, filter_value,
+            default_export_path(app.db, report_type, filter_value),
+            year=year,
+            progress=on_progress,
+            done=on_done,
+            error=on_error
+        ).start()
+        
+        def on_close(*args):
+            # Cancelling a finished job has no effect
+            job.cancel()
+            popup.dismiss()
+        
+        close_btn.bind(on_release=on_close)
     
     def go_back(self):
         """Navigate back to admin dashboard."""
@@ -0,0 +1,47 @@
+"""
+Shared fixtures for the tests.
+
+The tests cover the database layer and the Kivy-free helpers in utils,
+and are run from the repository root:
+
+    python -m pytest
+"""
+import os
+import sys
+
+import pytest
+
+# Make the app packages importable however pytest is started
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from database.db_handler import DatabaseHandler
+
+@pytest.fixture
+def make_db(tmp_path):
+    """Factory for migrated databases in the test's folder, closed afterwards."""
+    handlers = []
+
+    def make(name='jaintemple.db'):
+        db = DatabaseHandler(str(tmp_path / name))
+        db.setup_database()
+        handlers.append(db)
+        return db
+
+    yield make
+    for db in handlers:
+        db.close_connection()
+
+@pytest.fixture
+def db(make_db):
+    """A migrated, empty database."""
+    return make_db()
+
+def visit_rows(db):
+    """All visits as (id, devotee_id, visit_date, selected_item, origin, origin_id)."""
+    with db.pool.reader() as cursor:
+        return cursor.execute(
+            "SELECT id, devotee_id, visit_date, selected_item, origin, origin_id "
+            "FROM visits ORDER BY id"
+        ).fetchall()
@@ -0,0 +1,26 @@
+import time
+
+from database.async_db import AsyncDatabase
+
+def committed_count(db):
+    with db.pool.reader() as cursor:
+        return cursor.execute("SELECT COUNT(*) FROM visits").fetchone()[0]
+
+def test_busy_worker_commits_visits_on_time(db):
+    db.enable_group_commit(max_rows=1000, max_delay_ms=50)
+    worker = AsyncDatabase(db, schedule=lambda func, timeout: func(0))
+    try:
+        # Calls arrive faster than the worker's idle timeout, for several
+        # times the group commit delay
+        deadline = time.monotonic() + 0.5
+        number = 0
+        while time.monotonic() < deadline:
+            worker.submit('record_visit', '1', f'Item {number}').result(1)
+            number += 1
+            time.sleep(0.01)
+        assert number > 10
+        # Only the visits of the last delay may still be buffered
+        assert committed_count(db) >= number - 10
+    finally:
+        worker.stop()
+    assert committed_count(db) == number
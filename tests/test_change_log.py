@@ -0,0 +1,110 @@
+import gzip
+import sqlite3
+
+import pytest
+
+from conftest import visit_rows
+from database.change_log import apply_changes, export_changes
+from database.db_handler import DatabaseHandler
+from database.merge import merge_change_file
+
+def full_backup(db, path):
+    """Copy db to path, as a full backup would, and open the copy."""
+    target = sqlite3.connect(str(path))
+    db.pool.backup_to(target)
+    target.close()
+    return DatabaseHandler(str(path))
+
+def test_replay_own_changes_onto_backup(make_db, tmp_path):
+    db = make_db()
+    db.add_devotee('1', 'Mahavir Shah', '9800000001')
+    db.record_visit('1', 'Pūjā')
+    export_changes(db, str(tmp_path / 'changes'))
+    restored = full_backup(db, tmp_path / 'restored.db')
+
+    db.add_devotee('2', 'Rekha Jain')
+    db.record_visit('2', 'Tapasya')
+    db.update_devotee('1', 'Mahavir Shah', '9800000009', '', '')
+    path, entries = export_changes(db, str(tmp_path / 'changes'))
+    assert entries == 3
+
+    try:
+        assert apply_changes(restored, path) == 3
+        assert visit_rows(restored) == visit_rows(db)
+        assert restored.get_devotee('1').phone == '9800000009'
+        # Applying the same file again changes nothing
+        assert apply_changes(restored, path) == 0
+        assert visit_rows(restored) == visit_rows(db)
+    finally:
+        restored.close_connection()
+
+def test_replay_onto_backup_without_logged_changes(make_db, tmp_path):
+    db = make_db()
+    # Taken before anything was logged: no change_log row in sqlite_sequence
+    restored = full_backup(db, tmp_path / 'restored.db')
+    db.record_visit('1', 'Pūjā')
+    db.record_visit('1', 'Tapasya')
+    path, entries = export_changes(db, str(tmp_path / 'changes'))
+
+    try:
+        assert apply_changes(restored, path) == entries == 2
+        # The replayed changes are logged after the file's seqs, not as 1 and 2 again
+        assert restored.last_change_seq() == 4
+    finally:
+        restored.close_connection()
+
+def test_refused_files_are_closed(make_db, tmp_path, monkeypatch):
+    kiosk_a = make_db('a.db')
+    kiosk_b = make_db('b.db')
+    kiosk_b.record_visit('2', 'Pūjā')
+    export_changes(kiosk_b, str(tmp_path / 'changes'))
+    kiosk_b.record_visit('2', 'Tapasya')
+    path, _ = export_changes(kiosk_b, str(tmp_path / 'changes'))
+    opened = []
+    real_open = gzip.open
+
+    def tracking_open(*args, **kwargs):
+        opened.append(real_open(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(gzip, 'open', tracking_open)
+    with pytest.raises(ValueError, match='another device'):
+        apply_changes(kiosk_a, path)
+    with pytest.raises(ValueError, match='missing'):
+        merge_change_file(kiosk_a, path)
+    assert len(opened) == 2
+    assert all(handle.closed for handle in opened)
+
+def test_refuses_changes_with_a_gap(make_db, tmp_path):
+    db = make_db()
+    restored = full_backup(db, tmp_path / 'restored.db')
+    db.record_visit('1', 'Pūjā')
+    export_changes(db, str(tmp_path / 'changes'))
+    db.record_visit('1', 'Tapasya')
+    path, _ = export_changes(db, str(tmp_path / 'changes'))
+
+    try:
+        with pytest.raises(ValueError, match='missing'):
+            apply_changes(restored, path)
+        assert apply_changes(restored, path, force=True) == 1
+    finally:
+        restored.close_connection()
+
+def test_refuses_another_devices_changes(make_db, tmp_path):
+    kiosk_a = make_db('a.db')
+    kiosk_b = make_db('b.db')
+    kiosk_a.record_visit('1', 'Swamivatsalya')
+    kiosk_b.record_visit('2', 'Pūjā')
+    path, _ = export_changes(kiosk_b, str(tmp_path / 'changes'))
+    before = visit_rows(kiosk_a)
+
+    with pytest.raises(ValueError, match='another device'):
+        apply_changes(kiosk_a, path)
+    assert visit_rows(kiosk_a) == before
+
+    # Merging takes B's visit in next to A's own visit 1
+    result = merge_change_file(kiosk_a, path)
+    assert result.visits_added == 1
+    rows = visit_rows(kiosk_a)
+    assert rows[0] == before[0]
+    assert rows[1][1:] == ('2', before[0][2], 'Pūjā', kiosk_b.get_device_id(), 1)
@@ -0,0 +1,73 @@
+import csv
+
+import pytest
+
+from database.devotee_import import import_devotees
+
+def write_csv(path, text):
+    path.write_text(text, encoding='utf-8-sig')
+    return str(path)
+
+def test_import_upserts_and_rejects(db, tmp_path):
+    db.add_devotee('1', 'Mahavir Shah', '9800000001', 'mahavir@example.com', 'Temple Road')
+    db.add_devotee('2', 'Rekha Jain', '9800000002')
+    # Cached devotees must not hide the imported details
+    assert db.get_devotee('1').phone == '9800000001'
+    path = write_csv(tmp_path / 'members.csv', (
+        "Devotee_ID,Name,Phone,Email,Notes\n"
+        "1,Mahavir Shah,9800000011,,moved\n"
+        "2,Rekha Jain,9800000002,,\n"
+        "3,Mahesh Mehta,,mahesh@example.com,\n"
+        ",No ID,,,\n"
+        "4,,,,\n"
+        "5,Bad Mail,,not-an-email,\n"
+        "3,Mahesh Again,,,\n"
+        "6,Too Many,,,,extra\n"
+        "7,Anil Doshi,,,\n"
+    ))
+    rejects = tmp_path / 'rejects.csv'
+
+    result = import_devotees(db, path, rejects_path=str(rejects), chunk_size=3)
+    assert (result.rows, result.inserted, result.updated, result.unchanged, result.rejected) == (9, 2, 1, 1, 5)
+
+    devotee = db.get_devotee('1')
+    # A blank optional field keeps the stored value
+    assert (devotee.phone, devotee.email, devotee.address) == (
+        '9800000011', 'mahavir@example.com', 'Temple Road'
+    )
+    assert db.get_devotee('3').name == 'Mahesh Mehta'
+    assert db.get_devotee('7').name == 'Anil Doshi'
+    assert db.get_devotee('5') is None
+
+    with open(rejects, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['line', 'reason', 'id', 'name', 'phone', 'email', 'address']
+    assert [(row[0], row[1]) for row in rows[1:]] == [
+        ('5', 'ID is required'),
+        ('6', 'name is required'),
+        ('7', "invalid email 'not-an-email'"),
+        ('8', 'duplicate ID 3 in the file'),
+        ('9', 'too many columns'),
+    ]
+
+def test_importing_again_changes_nothing(db, tmp_path):
+    path = write_csv(tmp_path / 'members.csv', "id,name,phone\n1,Mahavir Shah,9800000001\n2,Rekha Jain,\n")
+    import_devotees(db, path)
+    seq = db.last_change_seq()
+
+    result = import_devotees(db, path)
+    assert (result.inserted, result.updated, result.unchanged) == (0, 0, 2)
+    # Unchanged rows are not rewritten, so nothing is logged
+    assert db.last_change_seq() == seq
+
+def test_import_can_keep_existing_devotees(db, tmp_path):
+    db.add_devotee('1', 'Mahavir Shah', '9800000001')
+    path = write_csv(tmp_path / 'members.csv', "id,name,phone\n1,Mahavir S.,9800000009\n2,Rekha Jain,\n")
+    result = import_devotees(db, path, update_existing=False)
+    assert (result.inserted, result.updated, result.unchanged) == (1, 0, 1)
+    assert db.get_devotee('1').name == 'Mahavir Shah'
+
+def test_import_needs_id_and_name_columns(db, tmp_path):
+    path = write_csv(tmp_path / 'members.csv', "name,phone\nMahavir Shah,9800000001\n")
+    with pytest.raises(ValueError, match='no id column'):
+        import_devotees(db, path)
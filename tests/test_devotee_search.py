@@ -0,0 +1,66 @@
+import pytest
+
+from database import migrations
+
+DEVOTEES = [
+    ('101', 'Mahavir Shah', '+91 98765 43210', 'mahavir@example.com', 'Temple Road, Pune'),
+    ('102', 'Rekha Jain', '022-2345-6789', 'rekha@example.com', 'Station Road, Surat'),
+    ('103', 'Mahesh Mehta', '98111 22233', '', 'Market Road, Pune'),
+]
+
+def add_devotees(db):
+    for devotee in DEVOTEES:
+        db.add_devotee(*devotee)
+
+def found_ids(db, query):
+    return [devotee.id for devotee in db.search_devotees(query)]
+
+@pytest.fixture(params=['fts5 and trigram', 'fts5 only', 'no fts5'])
+def search_db(request, make_db, monkeypatch):
+    """A database migrated by an SQLite library with the given support."""
+    supported = {
+        'fts5 and trigram': {'devotees_fts', 'devotees_phone'},
+        'fts5 only': {'devotees_fts'},
+        'no fts5': set(),
+    }[request.param]
+    real_support = migrations.search_support
+    monkeypatch.setattr(
+        migrations, 'search_support', lambda cursor: real_support(cursor) & supported
+    )
+    db = make_db()
+    add_devotees(db)
+    return db, supported
+
+def test_migration_completes_with_available_tables(search_db):
+    db, supported = search_db
+    with db.pool.reader() as cursor:
+        assert migrations.get_schema_version(cursor.connection) == migrations.SCHEMA_VERSION
+        assert migrations.search_tables(cursor) == supported
+
+def test_search_with_or_without_fts5(search_db):
+    db, _ = search_db
+    assert found_ids(db, '102') == ['102']
+    assert found_ids(db, 'mahavir sh') == ['101']
+    assert set(found_ids(db, 'mah')) == {'101', '103'}
+    assert found_ids(db, 'surat') == ['102']
+    # Phone digits match anywhere, separators ignored
+    assert found_ids(db, '5 432') == ['101']
+    assert found_ids(db, '2345') == ['102']
+    assert found_ids(db, 'nobody') == []
+
+def test_search_follows_devotee_changes(search_db):
+    db, _ = search_db
+    db.update_devotee('103', 'Mahesh Mehta', '97000 11111', '', 'Market Road, Pune')
+    assert found_ids(db, '22233') == []
+    assert found_ids(db, '70001') == ['103']
+    db.delete_devotee('101')
+    assert found_ids(db, 'mahavir') == []
+
+def test_rebuild_adds_tables_after_upgrade(search_db, monkeypatch):
+    db, _ = search_db
+    monkeypatch.undo()
+    assert db.rebuild_devotee_search()
+    with db.pool.reader() as cursor:
+        assert migrations.search_tables(cursor) == migrations.search_support(cursor)
+    assert found_ids(db, 'rekha') == ['102']
+    assert found_ids(db, '3210') == ['101']
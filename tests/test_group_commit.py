@@ -0,0 +1,46 @@
+import random
+import threading
+import time
+
+def test_concurrent_flushes_commit_in_order(db, monkeypatch):
+    db.enable_group_commit(max_rows=7, max_delay_ms=0)
+    count = 200
+    record_visits = db.record_visits
+
+    def slow_record_visits(rows):
+        # Widen the window between taking a group and committing it
+        time.sleep(random.random() / 1000)
+        return record_visits(rows)
+
+    monkeypatch.setattr(db, 'record_visits', slow_record_visits)
+    stop = threading.Event()
+    errors = []
+
+    def flush_when_due():
+        try:
+            while not stop.is_set():
+                db.flush_if_due()
+        except Exception as e:
+            errors.append(e)
+        db.pool.release_thread_connection()
+
+    flushers = [threading.Thread(target=flush_when_due) for _ in range(3)]
+    for thread in flushers:
+        thread.start()
+    try:
+        for number in range(count):
+            db.record_visit('1', f'{number:05d}')
+            # Let the flushers run between visits
+            time.sleep(0)
+    finally:
+        stop.set()
+        for thread in flushers:
+            thread.join()
+    assert errors == []
+    assert db.flush()
+
+    with db.pool.reader() as cursor:
+        items = [row[0] for row in cursor.execute("SELECT selected_item FROM visits ORDER BY id")]
+    # Every visit once, committed in the order it was recorded
+    assert items == [f'{number:05d}' for number in range(count)]
+    assert db.visit_writer.pending_count == 0
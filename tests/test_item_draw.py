@@ -0,0 +1,58 @@
+import random
+from collections import Counter
+
+from utils.item_draw import RecentDraws, WeightedItemDraw
+
+def draw_counts(table, draws=20000, **kwargs):
+    return Counter(table.draw(**kwargs) for _ in range(draws))
+
+def test_draws_follow_the_weights():
+    table = WeightedItemDraw(['Pūjā', 'Tapasya', 'Satya', 'Tyāga'], [1, 2, 7, 0], rng=random.Random(1))
+    counts = draw_counts(table)
+    # Zero weight items are never drawn
+    assert set(counts) == {'Pūjā', 'Tapasya', 'Satya'}
+    assert abs(counts['Pūjā'] / 20000 - 0.1) < 0.02
+    assert abs(counts['Tapasya'] / 20000 - 0.2) < 0.02
+    assert abs(counts['Satya'] / 20000 - 0.7) < 0.02
+
+def test_seeded_draws_repeat():
+    items = ['Pūjā', 'Tapasya', 'Satya']
+    first = WeightedItemDraw(items, rng=random.Random(42))
+    second = WeightedItemDraw(items, rng=random.Random(42))
+    assert [first.draw() for _ in range(50)] == [second.draw() for _ in range(50)]
+
+def test_excluded_items_are_not_drawn():
+    table = WeightedItemDraw(['Pūjā', 'Tapasya', 'Satya', 'Tyāga'], [90, 5, 4, 1], rng=random.Random(7))
+    # The excluded items hold most of the weight: the fallback draws the
+    # rest in proportion to their weights
+    counts = draw_counts(table, 5000, exclude={'Pūjā', 'Tapasya'})
+    assert set(counts) == {'Satya', 'Tyāga'}
+    assert counts['Satya'] > counts['Tyāga'] * 2
+
+def test_excluding_everything_still_draws():
+    table = WeightedItemDraw(['Pūjā', 'Satya'], rng=random.Random(3))
+    assert table.draw(exclude={'Pūjā', 'Satya'}) in {'Pūjā', 'Satya'}
+
+def test_empty_table_draws_nothing():
+    assert WeightedItemDraw([]).draw() is None
+    assert WeightedItemDraw(['Pūjā'], [0]).draw() is None
+
+def test_database_weights(db):
+    for item in db.get_all_items()[1:]:
+        db.set_item_weight(item, 0)
+    names, weights = zip(*db.get_weighted_items())
+    table = WeightedItemDraw(names, weights, rng=random.Random(5))
+    assert set(draw_counts(table, 100)) == {db.get_all_items()[0]}
+
+def test_recent_draws_start_from_visit_history(db):
+    db.record_visits([('1', 'Pūjā', '2024-05-01'), ('1', 'Tapasya', '2024-05-02'),
+                      ('1', 'Satya', '2024-05-03'), ('1', 'Tyāga', '2024-05-04')])
+    recent = RecentDraws(db, window=3, max_devotees=2)
+    assert list(recent.get('1')) == ['Tapasya', 'Satya', 'Tyāga']
+    recent.add('1', 'Kṣamā')
+    assert list(recent.get('1')) == ['Satya', 'Tyāga', 'Kṣamā']
+
+    # The least recently used devotee is forgotten and reloaded
+    recent.get('2')
+    recent.get('3')
+    assert list(recent.get('1')) == ['Tapasya', 'Satya', 'Tyāga']
@@ -0,0 +1,95 @@
+import sqlite3
+
+import pytest
+
+from conftest import visit_rows
+from database.change_log import APPLIED_KEY
+from database.merge import merge_database, resolve_devotee
+
+@pytest.fixture
+def kiosks(make_db):
+    master, kiosk = make_db('master.db'), make_db('kiosk.db')
+    master.add_devotee('1', 'Mahavir Shah', '9800000001', '', 'Temple Road')
+    master.add_devotee('2', 'Rekha Jain')
+    master.record_visits([('1', 'Pūjā', '2024-05-01')])
+    kiosk.add_devotee('1', 'Mahavir Shah', '9800000009', 'mahavir@example.com', 'Temple Road')
+    kiosk.add_devotee('3', 'Mahesh Mehta', '98111 22233')
+    kiosk.record_visits([('1', 'Tapasya', '2024-05-01'), ('3', 'Satya', '2024-05-02')])
+    return master, kiosk
+
+def test_resolve_devotee():
+    changes, conflicts = resolve_devotee(
+        {'name': 'Mahavir Shah', 'phone': '1', 'email': '', 'address': 'Pune'},
+        {'name': 'Mahavir Shah', 'phone': '2', 'email': 'm@example.com', 'address': ''},
+    )
+    assert changes == {'email': 'm@example.com'}
+    assert conflicts == [('phone', '1', '2', '1')]
+
+    changes, _ = resolve_devotee({'phone': '1'}, {'phone': '2'}, prefer='source')
+    assert changes == {'phone': '2'}
+
+def test_merge_database(kiosks):
+    master, kiosk = kiosks
+    result = merge_database(master, kiosk.db_path)
+    device = kiosk.get_device_id()
+    assert (result.device_id, result.devotees_added, result.devotees_updated) == (device, 1, 1)
+    assert (result.visits_added, result.visits_skipped) == (2, 0)
+    assert result.conflicts == [('1', 'phone', '9800000001', '9800000009', '9800000001')]
+
+    devotee = master.get_devotee('1')
+    assert (devotee.phone, devotee.email) == ('9800000001', 'mahavir@example.com')
+    assert master.get_devotee('3').name == 'Mahesh Mehta'
+    assert [row[1:] for row in visit_rows(master)] == [
+        ('1', '2024-05-01', 'Pūjā', None, None),
+        ('1', '2024-05-01', 'Tapasya', device, 1),
+        ('3', '2024-05-02', 'Satya', device, 2),
+    ]
+    # The rollups and the search index follow the merged rows
+    assert master.get_monthly_visits(2024, 5) == [('2024-05-01', 2), ('2024-05-02', 1)]
+    assert [d.id for d in master.search_devotees('mahesh')] == ['3']
+    # Change files of the kiosk continue after its merged log
+    assert master.get_setting(APPLIED_KEY.format(device_id=device)) == str(kiosk.last_change_seq())
+
+    again = merge_database(master, kiosk.db_path)
+    assert (again.visits_added, again.visits_skipped, again.devotees_added) == (0, 2, 0)
+    assert len(visit_rows(master)) == 3
+
+def test_source_can_win_conflicts(kiosks):
+    master, kiosk = kiosks
+    merge_database(master, kiosk.db_path, prefer='source')
+    assert master.get_devotee('1').phone == '9800000009'
+
+def test_merged_visits_are_not_duplicated_through_other_kiosks(kiosks, make_db):
+    master, kiosk = kiosks
+    other = make_db('other.db')
+    other.record_visits([('2', 'Kṣamā', '2024-05-03')])
+    # The kiosk takes in the master's and the other kiosk's visits first
+    merge_database(kiosk, master.db_path)
+    merge_database(kiosk, other.db_path)
+
+    result = merge_database(master, kiosk.db_path)
+    # The master's own visit comes back and is skipped
+    assert (result.visits_added, result.visits_skipped) == (3, 1)
+    assert merge_database(master, other.db_path).visits_added == 0
+    origins = [(row[4], row[5]) for row in visit_rows(master)]
+    assert origins == [
+        (None, None),
+        (kiosk.get_device_id(), 1), (kiosk.get_device_id(), 2), (other.get_device_id(), 1),
+    ]
+
+def test_refuses_bad_sources(kiosks, tmp_path):
+    master, _ = kiosks
+    with pytest.raises(ValueError, match='not found'):
+        merge_database(master, str(tmp_path / 'missing.db'))
+    with pytest.raises(ValueError, match='own database'):
+        merge_database(master, master.db_path)
+
+    old = sqlite3.connect(str(tmp_path / 'old.db'))
+    old.executescript(
+        "CREATE TABLE devotees (id TEXT); CREATE TABLE visits (id INTEGER);"
+        "CREATE TABLE settings (key TEXT, value TEXT); PRAGMA user_version = 5;"
+    )
+    old.close()
+    with pytest.raises(ValueError, match='too old'):
+        merge_database(master, str(tmp_path / 'old.db'))
+    assert len(visit_rows(master)) == 1
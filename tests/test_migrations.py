@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from database import migrations
+from database.db_handler import DatabaseHandler
+
+def schema_names(db, kind):
+    with db.pool.reader() as cursor:
+        return {
+            row[0] for row in cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = ? AND name NOT LIKE 'sqlite_%'",
+                (kind,)
+            )
+        }
+
+def legacy_database(path):
+    """A database as the app created it before schema versioning."""
+    conn = sqlite3.connect(str(path))
+    migrations._create_base_schema(conn.cursor())
+    conn.executemany(
+        "INSERT INTO devotees (id, name, phone) VALUES (?, ?, ?)",
+        [('1', 'Mahavir Shah', '98765 43210'), ('2', 'Rekha Jain', '022-2345-6789')]
+    )
+    conn.executemany(
+        "INSERT INTO visits (devotee_id, visit_date, selected_item) VALUES (?, ?, ?)",
+        [('1', '2024-05-01', 'Pūjā'), ('2', '2024-05-01', 'Pūjā'), ('1', '2024-06-02', 'Tapasya')]
+    )
+    conn.commit()
+    conn.close()
+
+def test_new_database_gets_every_migration(db):
+    with db.pool.reader() as cursor:
+        assert migrations.get_schema_version(cursor.connection) == migrations.SCHEMA_VERSION == 8
+    assert {
+        'admins', 'devotees', 'visits', 'settings', 'items', 'visit_daily_counts',
+        'visit_daily_item_counts', 'change_log',
+    } <= schema_names(db, 'table')
+    assert {
+        'idx_visits_visit_date', 'idx_visits_devotee_date', 'idx_devotees_name_id',
+        'idx_visits_origin',
+    } <= schema_names(db, 'index')
+    assert {
+        'trg_visits_rollup_insert', 'trg_visits_rollup_delete', 'trg_visits_rollup_update',
+        'trg_devotees_log_insert', 'trg_visits_log_insert', 'trg_visits_log_delete',
+        'trg_devotees_search_insert', 'trg_devotees_search_delete',
+    } <= schema_names(db, 'trigger')
+    assert len(db.get_device_id()) == 16
+    assert len(db.get_all_items()) == len(migrations.DEFAULT_ITEMS)
+
+def test_migrating_again_does_nothing(db):
+    with db.pool.write_connection() as conn:
+        assert migrations.migrate(conn) == []
+
+def test_legacy_database_is_upgraded_with_its_data(tmp_path):
+    path = tmp_path / 'jaintemple.db'
+    legacy_database(path)
+    db = DatabaseHandler(str(path))
+    try:
+        db.setup_database()
+        with db.pool.reader() as cursor:
+            assert migrations.get_schema_version(cursor.connection) == migrations.SCHEMA_VERSION
+            # The existing visits are our own, not merged
+            assert cursor.execute(
+                "SELECT COUNT(*) FROM visits WHERE origin IS NULL AND origin_id IS NULL"
+            ).fetchone()[0] == 3
+        # The rollups and the search index are filled from existing rows
+        assert db.get_monthly_visits(2024, 5) == [('2024-05-01', 2)]
+        assert db.get_item_counts(2024) == [('Pūjā', 2), ('Tapasya', 1)]
+        assert [devotee.id for devotee in db.search_devotees('rekha')] == ['2']
+        assert [devotee.id for devotee in db.search_devotees('43210')] == ['1']
+        # Later changes are logged
+        seq = db.last_change_seq()
+        db.record_visit('2', 'Satya')
+        assert db.last_change_seq() == seq + 1
+    finally:
+        db.close_connection()
+
+def test_failed_migration_keeps_the_previous_version(tmp_path, monkeypatch):
+    path = tmp_path / 'jaintemple.db'
+    legacy_database(path)
+
+    def broken(cursor):
+        cursor.execute("CREATE TABLE broken_half (id INTEGER)")
+        cursor.execute("SELECT * FROM no_such_table")
+
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS[:2] + [(3, broken)])
+    conn = sqlite3.connect(str(path), isolation_level=None)
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            migrations.migrate(conn)
+        assert migrations.get_schema_version(conn) == 2
+        assert conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = 'broken_half'"
+        ).fetchone()[0] == 0
+    finally:
+        conn.close()
@@ -0,0 +1,73 @@
+import pytest
+
+from database.db_handler import iter_pages
+
+@pytest.fixture
+def listed_db(db):
+    # Repeated names: pages must break ties by ID
+    for number in range(23):
+        db.add_devotee(f'{number:03d}', ['Shah', 'Jain', 'Mehta'][number % 3])
+    db.record_visits(
+        [(f'{number % 4:03d}', f'Item {number}', f'2024-05-{number % 3 + 1:02d}')
+         for number in range(30)]
+        # A visit of a devotee that is no longer listed
+        + [('999', 'Item 30', '2024-05-01')]
+    )
+    return db
+
+def all_pages(page_method, *args, page_size):
+    """Every page of a listing, fetched one token at a time."""
+    pages, token = [], None
+    while True:
+        rows, token = page_method(*args, token, page_size)
+        pages.append(rows)
+        if token is None:
+            return pages
+
+def test_devotee_pages_follow_name_order(listed_db):
+    expected = sorted(listed_db.get_all_devotees(), key=lambda devotee: (devotee.name, devotee.id))
+    pages = all_pages(listed_db.iter_devotees, page_size=5)
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert [devotee.id for page in pages for devotee in page] == [devotee.id for devotee in expected]
+
+def test_full_last_page_ends_with_an_empty_page(listed_db):
+    pages = all_pages(listed_db.iter_devotees, page_size=23)
+    assert [len(page) for page in pages] == [23, 0]
+
+def test_devotee_pages_are_stable_across_inserts(listed_db):
+    expected = [devotee.id for devotee in iter_pages(listed_db.iter_devotees, page_size=5)]
+    first, token = listed_db.iter_devotees(None, 5)
+    # Sorts before the token; an offset listing would repeat a row
+    listed_db.add_devotee('100', 'Bhandari')
+    ids = [devotee.id for devotee in first]
+    while token is not None:
+        page, token = listed_db.iter_devotees(token, 5)
+        ids.extend(devotee.id for devotee in page)
+    assert ids == expected
+
+def test_visit_log_pages(listed_db):
+    rows = list(iter_pages(listed_db.iter_visits, None, None, page_size=7))
+    assert [row[0] for row in rows] == list(range(1, 32))
+    # Unknown devotees are listed without a name
+    assert rows[-1][2:] == ('999', None, 'Item 30')
+
+    may_2 = list(iter_pages(listed_db.iter_visits, '2024-05-02', '2024-05-03', page_size=4))
+    assert [row[4] for row in may_2] == [f'Item {number}' for number in range(1, 30, 3)]
+
+def test_daily_visit_pages_newest_first(listed_db):
+    rows = list(iter_pages(listed_db.iter_daily_visits, '2024-05-01', page_size=3))
+    assert [row[3] for row in rows] == [f'Item {number}' for number in range(27, -1, -3)]
+    # Visits of unlisted devotees are left out, as count_daily_visits does
+    assert len(rows) == listed_db.count_daily_visits('2024-05-01') == 10
+
+def test_devotee_visit_pages_by_date_then_id(listed_db):
+    rows = list(iter_pages(listed_db.iter_devotee_visits, '001', page_size=2))
+    expected = sorted(
+        ((f'2024-05-{number % 3 + 1:02d}', number) for number in range(1, 30, 4)),
+        reverse=True
+    )
+    assert rows == [(date, f'Item {number}') for date, number in expected]
+
+    # A date token starts before that day
+    before, _ = listed_db.iter_devotee_visits('001', '2024-05-03', 100)
+    assert before == [row for row in rows if row[0] < '2024-05-03']
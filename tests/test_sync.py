@@ -0,0 +1,53 @@
+import http.client
+from urllib.parse import urlsplit
+
+import pytest
+
+from database.sync import SyncClient, SyncServer, TOKEN_HEADER
+
+@pytest.fixture
+def server(make_db):
+    server = SyncServer(make_db('server.db'), port=0, token='secret')
+    server.url = server.start_in_thread()
+    yield server
+    server.stop()
+
+def client_for(server, db):
+    return SyncClient(db, server.url, token='secret')
+
+def visit_count(db):
+    with db.pool.reader() as cursor:
+        return cursor.execute("SELECT COUNT(*) FROM visits").fetchone()[0]
+
+def test_kiosks_converge_without_echoing_visits(server, make_db):
+    kiosk_a, kiosk_b = make_db('a.db'), make_db('b.db')
+    client_a, client_b = client_for(server, kiosk_a), client_for(server, kiosk_b)
+    try:
+        kiosk_a.record_visits([('1', 'Pūjā', '2024-05-01'), ('2', 'Tapasya', '2024-05-01')])
+        assert client_a.sync()['pushed'] == 2
+        assert client_b.sync()['visits_added'] == 2
+
+        # B has A's visits only through the server, so it sends none back,
+        # only its own new visit
+        kiosk_b.record_visit('3', 'Satya')
+        result = client_b.sync()
+        assert result['pushed'] == 1
+        assert client_a.sync()['visits_added'] == 1
+
+        assert visit_count(kiosk_a) == visit_count(kiosk_b) == visit_count(server.db) == 3
+    finally:
+        client_a.close()
+        client_b.close()
+
+@pytest.mark.parametrize('token', ['wrong', 'sécret'])
+def test_bad_token_is_refused(server, token):
+    url = urlsplit(server.url)
+    conn = http.client.HTTPConnection(url.hostname, url.port, timeout=5)
+    try:
+        # http.client sends str header values as latin-1
+        conn.request('GET', '/sync/status?device=x', headers={TOKEN_HEADER: token})
+        response = conn.getresponse()
+        response.read()
+        assert response.status == 401
+    finally:
+        conn.close()
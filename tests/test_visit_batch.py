@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from utils import visit_batch
+from utils.visit_batch import VisitBatch
+
+ITEMS = ['Pūjā', 'Tapasya', 'Satya', 'Tyāga', 'Kṣamā']
+
+@pytest.fixture(params=['counter', 'numpy'])
+def counting(request, monkeypatch):
+    """Count with collections.Counter, or with NumPy when it is installed."""
+    if request.param == 'counter':
+        monkeypatch.setattr(visit_batch, 'numpy', None)
+    elif visit_batch.numpy is None:
+        pytest.skip("NumPy is not installed")
+    return request.param
+
+@pytest.fixture
+def visits_db(db):
+    rng = random.Random(11)
+    db.record_visits([
+        (str(rng.randrange(40)), rng.choice(ITEMS),
+         f'{rng.choice([2023, 2024])}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}')
+        for _ in range(2000)
+    ])
+    return db
+
+def sql_counts(db, sql, params=()):
+    with db.pool.reader() as cursor:
+        return cursor.execute(sql, params).fetchall()
+
+def test_group_bys_match_sql(visits_db, counting):
+    batch = VisitBatch.load(visits_db, chunk_size=300)
+    assert len(batch) == 2000
+    assert batch.count_by_day() == sql_counts(
+        visits_db, "SELECT visit_date, COUNT(*) FROM visits GROUP BY 1 ORDER BY 1"
+    )
+    assert batch.count_by_month() == sql_counts(
+        visits_db, "SELECT substr(visit_date, 1, 7), COUNT(*) FROM visits GROUP BY 1 ORDER BY 1"
+    )
+    assert batch.count_by_year() == sql_counts(
+        visits_db,
+        "SELECT CAST(substr(visit_date, 1, 4) AS INTEGER), COUNT(*) FROM visits GROUP BY 1 ORDER BY 1"
+    )
+    assert batch.count_by_item() == sql_counts(
+        visits_db, "SELECT selected_item, COUNT(*) FROM visits GROUP BY 1 ORDER BY 2 DESC, 1"
+    )
+    assert batch.count_by_devotee() == sql_counts(
+        visits_db, "SELECT devotee_id, COUNT(*) FROM visits GROUP BY 1 ORDER BY 2 DESC, 1"
+    )
+    assert batch.count_by_devotee(limit=3) == batch.count_by_devotee()[:3]
+    assert batch.distinct_devotees() == sql_counts(
+        visits_db, "SELECT COUNT(DISTINCT devotee_id) FROM visits"
+    )[0][0]
+
+    # strftime('%w') counts Sunday as 0
+    weekdays = dict(sql_counts(
+        visits_db, "SELECT CAST(strftime('%w', visit_date) AS INTEGER), COUNT(*) FROM visits GROUP BY 1"
+    ))
+    assert batch.count_by_weekday() == [weekdays.get((day + 1) % 7, 0) for day in range(7)]
+
+def test_date_ranges_match_sql(visits_db, counting):
+    batch = VisitBatch.load(visits_db)
+    may = batch.between('2024-05-01', '2024-06-01')
+    loaded = VisitBatch.load(visits_db, '2024-05-01', '2024-06-01')
+    assert may.count_by_day() == loaded.count_by_day() == sql_counts(
+        visits_db,
+        "SELECT visit_date, COUNT(*) FROM visits "
+        "WHERE visit_date >= '2024-05-01' AND visit_date < '2024-06-01' GROUP BY 1 ORDER BY 1"
+    )
+    assert may.count_by_item() == loaded.count_by_item() == visits_db.get_item_counts(2024, 5)
+    assert len(batch.between(end='2024-01-01')) == visits_db.count_visits(end='2024-01-01')
+
+def test_empty_batch(db, counting):
+    batch = VisitBatch.load(db)
+    assert len(batch) == 0
+    assert batch.count_by_day() == batch.count_by_item() == []
+    assert batch.count_by_weekday() == [0] * 7
@@ -42,13 +42,4 @@ class Authentication:
             return False
         
         # Update password in database
-        try:
-            self.db.cursor.execute(
-                "UPDATE admins SET password = ? WHERE username = ?",
-                (new_password, username)
-            )
-            self.db.conn.commit()
-            return True
-        except Exception as e:
-            print(f"Error changing password: {e}")
-            return False
+        return self.db.update_admin_password(username, new_password)
@@ -0,0 +1,202 @@
+"""
+Searchable devotee picker for the admin screens.
+
+DevoteePicker is a button showing the selected devotee. Pressing it opens
+a popup with a search box and a RecycleView of devotees that is filled a
+page at a time: in name order while the search box is empty, and from
+search_devotees as the admin types. Scrolling near the end of the list
+fetches the next page, so opening the picker costs one page however
+many devotees are registered.
+
+Recently picked devotees are kept in memory, shared by every picker, and
+listed first; a new picker starts with the most recent one selected.
+"""
+from collections import OrderedDict
+
+from kivy.app import App
+from kivy.properties import ObjectProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.popup import Popup
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.textinput import TextInput
+
+from utils.devotee_search import DevoteeListLoader
+
+NO_SELECTION = 'Select Devotee'
+
+class DevoteePicker(Button):
+    """
+    Button that opens a searchable, paged devotee list.
+
+    Bind to devotee (e.g. on_devotee in kv) to learn about selections.
+    """
+
+    # Selected Devotee, or None
+    devotee = ObjectProperty(None, allownone=True)
+
+    # Devotees fetched per page
+    PAGE_SIZE = 30
+
+    # Recently picked devotees kept
+    RECENT_SIZE = 8
+
+    # Devotee ID to Devotee of recent picks, most recent last; shared by
+    # every picker so Reports and Calendar offer the same devotees
+    _recent = OrderedDict()
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('text', NO_SELECTION)
+        super(DevoteePicker, self).__init__(**kwargs)
+        self._popup = None
+
+    def on_devotee(self, picker, devotee):
+        """Show the selected devotee on the button."""
+        self.text = label_for(devotee) if devotee else NO_SELECTION
+
+    def on_release(self):
+        """Open the picker popup."""
+        self.open()
+
+    def select(self, devotee):
+        """Select a devotee and remember it as a recent pick."""
+        self.remember(devotee)
+        self.devotee = devotee
+        if self._popup:
+            self._popup.dismiss()
+
+    def select_recent(self):
+        """
+        Select the most recently picked devotee if nothing is selected.
+
+        Returns:
+            The selected Devotee, or None
+        """
+        if self.devotee is None and self._recent:
+            self.devotee = next(reversed(self._recent.values()))
+        return self.devotee
+
+    @classmethod
+    def remember(cls, devotee):
+        """Add a devotee to the recent picks."""
+        cls._recent[devotee.id] = devotee
+        cls._recent.move_to_end(devotee.id)
+        while len(cls._recent) > cls.RECENT_SIZE:
+            cls._recent.popitem(last=False)
+
+    @classmethod
+    def forget(cls, devotee_id):
+        """Drop a devotee from the recent picks, e.g. after deleting it."""
+        cls._recent.pop(str(devotee_id), None)
+
+    def open(self):
+        """Show the popup with the first page of devotees."""
+        self._popup = DevoteePickerPopup(self)
+        self._popup.bind(on_dismiss=self._popup_closed)
+        self._popup.open()
+
+    def _popup_closed(self, popup):
+        """Forget the popup once it is closed."""
+        popup.stop()
+        self._popup = None
+
+def label_for(devotee):
+    """Text shown for a devotee in pickers and report filters."""
+    return f"{devotee.id} - {devotee.name}"
+
+class DevoteePickerPopup(Popup):
+    """The picker's popup: a search box over a lazily filled devotee list."""
+
+    def __init__(self, picker, **kwargs):
+        kwargs.setdefault('title', 'Select Devotee')
+        kwargs.setdefault('size_hint', (0.9, 0.9))
+        super(DevoteePickerPopup, self).__init__(**kwargs)
+        self.picker = picker
+
+        content = BoxLayout(orientation='vertical', spacing=10, padding=10)
+        self.search_input = TextInput(
+            hint_text='Search by ID, name or phone',
+            multiline=False,
+            size_hint_y=None,
+            height='40dp'
+        )
+        content.add_widget(self.search_input)
+
+        self.status = Label(text='Loading...', size_hint_y=None, height='30dp')
+        content.add_widget(self.status)
+
+        # Only the visible rows get widgets, however long the list grows
+        self.list_view = RecycleView(viewclass='Button')
+        layout = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, 48),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=4
+        )
+        layout.bind(minimum_height=layout.setter('height'))
+        self.list_view.add_widget(layout)
+        self.list_view.bind(scroll_y=self._scrolled)
+        content.add_widget(self.list_view)
+
+        cancel_btn = Button(text='Cancel', size_hint_y=None, height='50dp')
+        cancel_btn.bind(on_release=lambda btn: self.dismiss())
+        content.add_widget(cancel_btn)
+        self.content = content
+
+        self.loader = DevoteeListLoader(
+            App.get_running_app().db_async, self._show, page_size=picker.PAGE_SIZE
+        )
+        self.search_input.bind(text=self._search_changed)
+        self.loader.reload()
+
+    def stop(self):
+        """Drop pending searches and answers still on their way."""
+        self.loader.stop()
+
+    def _search_changed(self, field, text):
+        """Pass new search text on; the search itself is debounced."""
+        self.loader.set_query(text)
+        if self.loader.query:
+            self.status.text = 'Searching...'
+
+    def _scrolled(self, view, scroll_y):
+        """Fetch the next page when the list is scrolled near its end."""
+        if scroll_y <= 0.1:
+            self.loader.load_more()
+
+    def _show(self):
+        """Refill the list: recent picks first while not searching."""
+        loader = self.loader
+        recent = []
+        if not loader.query:
+            recent = list(reversed(self.picker._recent.values()))
+        seen = set()
+        data = []
+        for devotee in recent:
+            seen.add(devotee.id)
+            data.append(self._row(devotee, recent=True))
+        for devotee in loader.devotees:
+            if devotee.id not in seen:
+                data.append(self._row(devotee))
+        self.list_view.data = data
+
+        if loader.query and not loader.devotees and not loader.loading:
+            self.status.text = f'No devotees match "{loader.query}"'
+        elif not data:
+            self.status.text = 'Loading...' if loader.loading else 'No devotees found'
+        else:
+            more = '+' if loader.has_more else ''
+            self.status.text = f'{len(loader.devotees)}{more} devotees'
+
+    def _row(self, devotee, recent=False):
+        """RecycleView data for one devotee button."""
+        text = label_for(devotee)
+        if devotee.phone:
+            text += f"  ({devotee.phone})"
+        return {
+            'text': f"Recent: {text}" if recent else text,
+            'on_release': lambda: self.picker.select(devotee),
+        }
@@ -0,0 +1,181 @@
+"""
+Search-as-you-type and paged loading for devotee lists.
+
+DevoteeSearch sits between a TextInput and DatabaseHandler.search_devotees:
+every keystroke restarts a short timer on the Kivy clock, and only when
+typing pauses does one search go to the AsyncDatabase worker. Results
+come back on the UI thread; results of a query that was overtaken by a
+newer one are dropped, so a slow answer never replaces a newer list.
+DevoteeListLoader builds on it to fill a list a page at a time.
+"""
+
+class DevoteeSearch:
+    """Debounced devotee search feeding a results callback."""
+
+    # Seconds of no typing before the search runs
+    DELAY = 0.3
+
+    def __init__(self, db_async, results, limit=50, delay=None, clock=None):
+        """
+        Initialize the search.
+
+        Args:
+            db_async: AsyncDatabase that runs the searches
+            results: Called on the UI thread with (query, devotees), a
+                list of Devotee objects; with an empty list right away
+                when the query is cleared
+            limit: Maximum number of devotees per search
+            delay: Seconds to wait for typing to pause, defaults to DELAY
+            clock: Clock to schedule on, defaults to kivy.clock.Clock
+        """
+        if clock is None:
+            from kivy.clock import Clock
+            clock = Clock
+        self.db_async = db_async
+        self.results = results
+        self.limit = limit
+        self.query = ''
+        # Number of the latest search sent; older answers are ignored
+        self._sent = 0
+        self._trigger = clock.create_trigger(self._search, self.DELAY if delay is None else delay)
+
+    def changed(self, text):
+        """Note new search text, e.g. from a TextInput's on_text."""
+        self.query = text
+        self._trigger.cancel()
+        if text.strip():
+            self._trigger()
+        else:
+            self._sent += 1
+            self.results(text, [])
+
+    def cancel(self):
+        """Drop the pending search and any answer still on its way."""
+        self._trigger.cancel()
+        self._sent += 1
+
+    def _search(self, dt):
+        """Send the current query to the database worker."""
+        self._sent += 1
+        number, query = self._sent, self.query
+        self.db_async.submit(
+            'search_devotees', query, self.limit,
+            callback=lambda devotees: self._deliver(number, query, devotees)
+        )
+
+    def _deliver(self, number, query, devotees):
+        """Hand the devotees of the latest search to the results callback."""
+        if number == self._sent:
+            self.results(query, devotees)
+
+class DevoteeListLoader:
+    """
+    A devotee list for a RecycleView, loaded a page at a time.
+
+    With no search text the pages come from iter_devotees in name order;
+    with search text from search_devotees, debounced by DevoteeSearch,
+    asking for one page more on each load_more() since search results
+    are not paged by key. changed() is called on the UI thread after
+    every load; devotees then holds the whole list so far. Answers to
+    requests made before the search text last changed are dropped.
+    """
+
+    def __init__(self, db_async, changed, page_size=50, clock=None):
+        """
+        Initialize the loader; call reload() for the first page.
+
+        Args:
+            db_async: AsyncDatabase that runs the queries
+            changed: Called with no arguments whenever devotees changed
+            page_size: Devotees fetched per page
+            clock: Clock for the search debounce, defaults to kivy's
+        """
+        self.db_async = db_async
+        self.changed = changed
+        self.page_size = page_size
+        self.devotees = []
+        self.query = ''
+        self.loading = False
+        # iter_devotees continuation token, or True while the current
+        # search may have more matches; None once everything is loaded
+        self._next = None
+        self._request = 0
+        self._search = DevoteeSearch(
+            db_async, self._search_results, limit=page_size, clock=clock
+        )
+
+    @property
+    def has_more(self):
+        """Whether load_more() would fetch anything."""
+        return self._next is not None
+
+    def set_query(self, text):
+        """Note new search text; the list is reloaded once typing pauses."""
+        self._request += 1
+        self.loading = False
+        self.query = text.strip()
+        self._search.changed(text)
+
+    def reload(self):
+        """Start over with the first page for the current search text."""
+        self._request += 1
+        self.devotees = []
+        self._next = None
+        if self.query:
+            self._fetch('search_devotees', self.query, self.page_size)
+        else:
+            self._fetch('iter_devotees', None, self.page_size)
+        self.changed()
+
+    def load_more(self):
+        """Fetch the next page unless one is loading or all are loaded."""
+        if self.loading or self._next is None:
+            return
+        if self.query:
+            self._fetch('search_devotees', self.query, len(self.devotees) + self.page_size)
+        else:
+            self._fetch('iter_devotees', self._next, self.page_size)
+
+    def stop(self):
+        """Drop the pending search and answers still on their way."""
+        self._search.cancel()
+        self._request += 1
+
+    def index(self, devotee_id):
+        """Position of a devotee in devotees, or None."""
+        for index, devotee in enumerate(self.devotees):
+            if devotee.id == devotee_id:
+                return index
+        return None
+
+    def _search_results(self, query, devotees):
+        """First page of a search, or the name listing when cleared."""
+        if not query.strip():
+            self.reload()
+            return
+        self.devotees = list(devotees)
+        self._next = True if len(devotees) == self.page_size else None
+        self.changed()
+
+    def _fetch(self, method, *args):
+        """Request a page on the database worker."""
+        self.loading = True
+        request = self._request
+        self.db_async.submit(
+            method, *args,
+            callback=lambda result: self._loaded(request, method, args, result)
+        )
+
+    def _loaded(self, request, method, args, result):
+        """Take in a fetched page unless the search changed meanwhile."""
+        if request != self._request:
+            return
+        self.loading = False
+        if method == 'iter_devotees':
+            devotees, self._next = result
+            self.devotees.extend(devotees)
+        else:
+            # The longer search repeats the devotees already listed
+            self._next = True if len(result) == args[1] else None
+            self.devotees = list(result)
+        self.changed()
@@ -0,0 +1,106 @@
+import bisect
+import itertools
+import random
+from collections import OrderedDict, deque
+
+class WeightedItemDraw:
+    """
+    Weighted random draw over a fixed list of items.
+    
+    Draws bisect a cumulative weight table, so each draw is O(log n) in the
+    number of items. Items can be excluded per draw (e.g. the items a
+    devotee received recently); excluded items are skipped by redrawing,
+    which stays cheap while the excluded items hold a small share of the
+    total weight.
+    """
+    
+    # Redraws before falling back to drawing from the non-excluded items
+    MAX_REDRAWS = 8
+    
+    def __init__(self, items, weights=None, rng=None):
+        """
+        Build the draw table.
+        
+        Args:
+            items: Sequence of item names
+            weights: Matching sequence of non-negative weights, all 1 if None
+            rng: random.Random instance, defaults to the random module
+        """
+        self.items = tuple(items)
+        self.weights = tuple(weights) if weights is not None else (1.0,) * len(self.items)
+        self._cumulative = list(itertools.accumulate(self.weights))
+        self._total = self._cumulative[-1] if self._cumulative else 0
+        self._rng = rng or random
+    
+    def __len__(self):
+        return len(self.items)
+    
+    def draw(self, exclude=()):
+        """
+        Draw one item.
+        
+        Args:
+            exclude: Collection of items that should not be drawn. If every
+                item is excluded, the exclusion is ignored.
+        
+        Returns:
+            The drawn item name, or None if there are no items
+        """
+        if self._total <= 0:
+            return None
+        
+        for _ in range(self.MAX_REDRAWS):
+            point = self._rng.random() * self._total
+            item = self.items[bisect.bisect_right(self._cumulative, point)]
+            if item not in exclude:
+                return item
+        
+        # The excluded items carry most of the weight: draw directly from
+        # the remaining ones instead of redrawing further
+        remaining = [
+            (item, weight) for item, weight in zip(self.items, self.weights)
+            if weight > 0 and item not in exclude
+        ]
+        if not remaining:
+            return item
+        names, weights = zip(*remaining)
+        return self._rng.choices(names, weights)[0]
+
+class RecentDraws:
+    """
+    Remembers the last few items drawn for each devotee.
+    
+    Only the most recently seen devotees are kept in memory; a devotee that
+    is not tracked yet is loaded from their visit history on first use.
+    """
+    
+    def __init__(self, db, window=3, max_devotees=1000):
+        """
+        Initialize the tracker.
+        
+        Args:
+            db: DatabaseHandler used to load visit history
+            window: Number of recent items remembered per devotee
+            max_devotees: Number of devotees kept in memory
+        """
+        self.db = db
+        self.window = window
+        self.max_devotees = max_devotees
+        self._recent = OrderedDict()
+    
+    def get(self, devotee_id):
+        """Get the deque of recent items for a devotee, newest last."""
+        recent = self._recent.get(devotee_id)
+        if recent is None:
+            history = self.db.get_recent_items(devotee_id, self.window) if self.window else []
+            recent = deque(reversed(history), maxlen=self.window)
+            self._recent[devotee_id] = recent
+            if len(self._recent) > self.max_devotees:
+                self._recent.popitem(last=False)
+        else:
+            self._recent.move_to_end(devotee_id)
+        return recent
+    
+    def add(self, devotee_id, item):
+        """Remember that an item was drawn for a devotee."""
+        self.get(devotee_id).append(item)
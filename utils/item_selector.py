@@ -1,13 +1,74 @@
 import random
 from kivy.app import App
+from utils.item_draw import RecentDraws, WeightedItemDraw
+
+class ItemCatalogue:
+    """
+    In-memory copy of the weighted item catalogue in the database.
+    
+    The catalogue is loaded once and reloaded only when the database
+    handler's items_version changes, so reading it on the check-in path
+    does not touch SQLite.
+    """
+    
+    def __init__(self, db, rng=None):
+        """
+        Initialize the catalogue.
+        
+        Args:
+            db: DatabaseHandler to load items from
+            rng: random.Random instance used for draws
+        """
+        self.db = db
+        self.rng = rng
+        self._draw = WeightedItemDraw((), rng=rng)
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+    
+    def table(self):
+        """
+        Get the draw table for the current items.
+        
+        Returns:
+            WeightedItemDraw, empty if the database has no items
+        """
+        version = self.db.items_version
+        if version == self._version:
+            self.hits += 1
+            return self._draw
+        
+        self.misses += 1
+        rows = self.db.get_weighted_items()
+        if not rows:
+            # Do not remember the version so a failed load is retried
+            return WeightedItemDraw((), rng=self.rng)
+        names, weights = zip(*rows)
+        self._draw = WeightedItemDraw(names, weights, rng=self.rng)
+        self._version = version
+        return self._draw
+    
+    def items(self):
+        """Get the current item names as a tuple."""
+        return self.table().items
+    
+    def stats(self):
+        """Get cache hit and miss counts."""
+        return {'hits': self.hits, 'misses': self.misses, 'version': self._version}
 
 class ItemSelector:
     """
     Manages item selection functionality.
     """
     
-    def __init__(self):
-        """Initialize the item selector."""
+    def __init__(self, exclusion_window=3):
+        """
+        Initialize the item selector.
+        
+        Args:
+            exclusion_window: Number of a devotee's most recent items that
+                are not drawn again for them
+        """
         # Default items in case database is unavailable
         self.default_items = [
             "Swamivatsalya", "Sadavrata", "Jñāna Dāna", "Auṣadha Dāna", 
@@ -15,10 +76,21 @@ class ItemSelector:
             "Pūjā", "Upavāsa", "Santhārā", "Saṃyama", "Tapasya", 
             "Tyāga", "Brahmacārya", "Kṣamā", "Ahiṃsā", "Satya"
         ]
+        self.exclusion_window = exclusion_window
+        self.catalogue = None
+        self.recent = None
     
-    def select_random_item(self):
+    def select_random_item(self, devotee_id=None):
         """
-        Select a random item from the 18 available items.
+        Select a weighted random item from the available items.
+        
+        Loading the catalogue and a devotee's recent items queries the
+        database, so call this on the database worker, e.g. with
+        app.db_async.submit(selector.select_random_item, devotee_id).
+        
+        Args:
+            devotee_id: If given, avoid the items this devotee received on
+                their most recent visits
         
         Returns:
             String representing the selected item
@@ -26,16 +98,30 @@ class ItemSelector:
         app = App.get_running_app()
         
         try:
-            # Get items from database
-            items = app.db.get_all_items()
+            # Get items from the cached catalogue
+            if self.catalogue is None:
+                self.catalogue = ItemCatalogue(app.db)
+                self.recent = RecentDraws(app.db, self.exclusion_window)
+            table = self.catalogue.table()
             
             # If items list is empty, use default items
-            if not items:
-                items = self.default_items
+            if not table:
+                return random.choice(self.default_items)
             
-            # Select random item
-            return random.choice(items)
+            if devotee_id is None:
+                return table.draw()
+            
+            # Select weighted item, skipping the devotee's recent items
+            item = table.draw(exclude=self.recent.get(devotee_id))
+            self.recent.add(devotee_id, item)
+            return item
         except Exception as e:
             print(f"Error selecting random item: {e}")
             # Fallback to default items if database fails
             return random.choice(self.default_items)
+    
+    def cache_stats(self):
+        """Get hit/miss counts of the item catalogue cache."""
+        if self.catalogue is None:
+            return {'hits': 0, 'misses': 0, 'version': None}
+        return self.catalogue.stats()
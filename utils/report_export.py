@@ -0,0 +1,325 @@
+"""
+Export reports to CSV files.
+
+Rows are streamed from the database one page at a time and written as
+they arrive, so memory use does not depend on the size of the report.
+Files are UTF-8 with a byte order mark so Excel shows item names with
+diacritics correctly, optionally gzip compressed.
+
+Headless use, from the repository root:
+
+    python -m utils.report_export daily 2024-05-01
+    python -m utils.report_export monthly May --year 2024 --gzip
+    python -m utils.report_export devotee 42 --out devotee-42.csv
+    python -m utils.report_export visits --start 2024-01-01 --end 2025-01-01
+"""
+import argparse
+import csv
+import datetime
+import gzip
+import os
+import sys
+import threading
+import time
+
+from database.db_handler import DatabaseHandler, MONTH_NUMBERS, iter_pages
+
+MONTHS = list(MONTH_NUMBERS)
+
+# Column headers per report type
+EXPORT_HEADERS = {
+    'Daily': ('Visit ID', 'Devotee ID', 'Name', 'Selected Item'),
+    'Monthly': ('Date', 'Visit Count'),
+    'Yearly': ('Month', 'Visit Count'),
+    'Devotee-wise': ('Date', 'Selected Item'),
+    'Visits': ('Visit ID', 'Date', 'Devotee ID', 'Name', 'Selected Item'),
+}
+
+# Rows fetched from the database per query while exporting
+PAGE_SIZE = 1000
+
+class ExportCancelled(Exception):
+    """Raised inside export_report when its cancel event is set."""
+
+def iter_report_rows(db, report_type, filter_value, year=None, page_size=PAGE_SIZE):
+    """
+    Generate the rows of a report.
+    
+    Args:
+        db: DatabaseHandler to read from
+        report_type: Key of EXPORT_HEADERS
+        filter_value: The report's filter, as shown in the Reports screen:
+            ISO date (Daily), month name (Monthly), year (Yearly), devotee
+            ID or "ID - Name" (Devotee-wise), or a (start, end) tuple of ISO
+            dates or Nones (Visits)
+        year: Year of a Monthly report, defaults to the current year
+        page_size: Rows fetched per query for the paginated reports
+    
+    Yields:
+        Row tuples matching EXPORT_HEADERS[report_type]
+    """
+    if report_type == 'Daily':
+        yield from iter_pages(db.iter_daily_visits, filter_value, page_size=page_size)
+    elif report_type == 'Monthly':
+        # At most 31 rows from the daily rollup
+        yield from db.get_monthly_visits(year or datetime.date.today().year, filter_value)
+    elif report_type == 'Yearly':
+        for month, count in db.get_yearly_visits(filter_value):
+            yield MONTHS[int(month) - 1], count
+    elif report_type == 'Devotee-wise':
+        devotee_id = str(filter_value).split(' - ')[0]
+        yield from iter_pages(db.iter_devotee_visits, devotee_id, page_size=page_size)
+    elif report_type == 'Visits':
+        start, end = filter_value or (None, None)
+        yield from iter_pages(db.iter_visits, start, end, page_size=page_size)
+    else:
+        raise ValueError(f"Unknown report type: {report_type}")
+
+def count_report_rows(db, report_type, filter_value, year=None):
+    """
+    Get the expected number of rows of a report, for progress display.
+    
+    Returns:
+        Row count, or None where it is not worth a query (small reports)
+    """
+    if report_type == 'Daily':
+        return db.count_daily_visits(filter_value)
+    if report_type == 'Devotee-wise':
+        return db.count_devotee_visits(str(filter_value).split(' - ')[0])
+    if report_type == 'Visits':
+        start, end = filter_value or (None, None)
+        return db.count_visits(start, end)
+    return None
+
+def default_export_path(db, report_type, filter_value, compress=False):
+    """
+    Build a file name in the exports folder next to the database.
+    
+    Returns:
+        Path like <db folder>/exports/daily-2024-05-01-20240501-183000.csv
+    """
+    export_dir = os.path.join(os.path.dirname(os.path.abspath(db.db_path)), 'exports')
+    os.makedirs(export_dir, exist_ok=True)
+    if isinstance(filter_value, tuple):
+        label = '-'.join(value or 'all' for value in filter_value)
+    else:
+        label = str(filter_value).split(' - ')[0]
+    label = ''.join(c if c.isalnum() or c in '-_' else '_' for c in label)
+    stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+    name = f"{report_type.lower().replace('-wise', '')}-{label}-{stamp}.csv"
+    return os.path.join(export_dir, name + ('.gz' if compress else ''))
+
+def export_report(db, report_type, filter_value, path, year=None, compress=None,
+                  progress=None, cancel_event=None, progress_every=5000):
+    """
+    Write a report to a CSV file.
+    
+    The file is written under a temporary name and renamed when complete,
+    so a cancelled or failed export never leaves a partial file behind.
+    
+    Args:
+        db: DatabaseHandler to read from
+        report_type: Key of EXPORT_HEADERS
+        filter_value: Report filter, see iter_report_rows
+        path: Output file path
+        year: Year of a Monthly report
+        compress: gzip the file; None means "if path ends with .gz"
+        progress: Called as progress(rows_written, total_rows) every
+            progress_every rows and once at the end; total_rows may be None
+        cancel_event: threading.Event that aborts the export when set
+        progress_every: Rows between progress calls
+    
+    Returns:
+        Number of data rows written
+    
+    Raises:
+        ExportCancelled: cancel_event was set
+        OSError, ValueError: the file could not be written or the report
+            type is unknown
+    """
+    if compress is None:
+        compress = path.endswith('.gz')
+    total = count_report_rows(db, report_type, filter_value, year) if progress else None
+    part_path = path + '.part'
+    
+    if compress:
+        out = gzip.open(part_path, 'wt', encoding='utf-8', newline='', compresslevel=6)
+    else:
+        out = open(part_path, 'w', encoding='utf-8', newline='')
+    
+    written = 0
+    try:
+        with out:
+            # Byte order mark written once; the utf-8-sig codec would run
+            # its Python level encoder on every row
+            out.write('\ufeff')
+            writer = csv.writer(out)
+            writer.writerow(EXPORT_HEADERS[report_type])
+            for row in iter_report_rows(db, report_type, filter_value, year):
+                writer.writerow(row)
+                written += 1
+                if written % progress_every == 0:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise ExportCancelled()
+                    if progress:
+                        progress(written, total)
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    
+    if progress:
+        progress(written, total if total is not None else written)
+    return written
+
+class ExportJob:
+    """
+    Runs export_report on a background thread.
+    
+    Callbacks are delivered on the UI thread through schedule, like
+    AsyncDatabase does, so they may update widgets directly.
+    """
+    
+    def __init__(self, db, report_type, filter_value, path, year=None, compress=None,
+                 progress=None, done=None, error=None, schedule=None):
+        """
+        Initialize the job; call start() to run it.
+        
+        Args:
+            db: DatabaseHandler to read from (safe to share between threads)
+            report_type, filter_value, path, year, compress: See export_report
+            progress: Called with (rows_written, total_rows) while exporting
+            done: Called with (path, rows_written) after the file is complete
+            error: Called with the exception if the export failed or was
+                cancelled (ExportCancelled)
+            schedule: Function used to run callbacks on the UI thread,
+                defaults to kivy.clock.Clock.schedule_once
+        """
+        if schedule is None:
+            from kivy.clock import Clock
+            schedule = Clock.schedule_once
+        self.db = db
+        self.report_type = report_type
+        self.filter_value = filter_value
+        self.path = path
+        self.year = year
+        self.compress = compress
+        self.progress = progress
+        self.done = done
+        self.error = error
+        self._schedule = schedule
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='report-export', daemon=True)
+    
+    def start(self):
+        """Start exporting."""
+        self._thread.start()
+        return self
+    
+    def cancel(self):
+        """Ask the export to stop; error is called with ExportCancelled."""
+        self._cancel.set()
+    
+    def join(self, timeout=None):
+        """Wait for the export thread to finish."""
+        self._thread.join(timeout)
+    
+    def _run(self):
+        """Export thread main function."""
+        try:
+            rows = export_report(
+                self.db, self.report_type, self.filter_value, self.path,
+                year=self.year,
+                compress=self.compress,
+                progress=self._deliver_progress if self.progress else None,
+                cancel_event=self._cancel
+            )
+        except Exception as e:
+            # Whatever went wrong (a cancel, a full disk, a database error),
+            # the popup waiting for done or error must hear about it
+            self._deliver(self.error, e, f"Report export failed: {e!r}")
+        else:
+            if self.done:
+                self._schedule(lambda dt: self.done(self.path, rows), 0)
+        finally:
+            self.db.pool.release_thread_connection()
+    
+    def _deliver_progress(self, written, total):
+        """Hand a progress update to the UI thread."""
+        self._schedule(lambda dt: self.progress(written, total), 0)
+    
+    def _deliver(self, callback, value, message):
+        """Hand an error to the UI thread, or print it if nobody listens."""
+        if callback:
+            self._schedule(lambda dt: callback(value), 0)
+        else:
+            print(message)
+
+def build_parser():
+    """Build the command line parser."""
+    # Options shared by every report, accepted after the report name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=None, help='database file, defaults to the app database')
+    common.add_argument('--out', default=None, help='output file, defaults to the exports folder')
+    common.add_argument('--gzip', action='store_true', help='gzip compress the output')
+    common.add_argument('--quiet', action='store_true', help='do not print progress')
+    
+    parser = argparse.ArgumentParser(description="Export Jain Temple reports to CSV")
+    subparsers = parser.add_subparsers(dest='report', required=True)
+    
+    daily = subparsers.add_parser('daily', parents=[common], help='visits on one day')
+    daily.add_argument('date', help='ISO date, e.g. 2024-05-01')
+    monthly = subparsers.add_parser('monthly', parents=[common], help='visits per day of a month')
+    monthly.add_argument('month', choices=MONTHS)
+    monthly.add_argument('--year', type=int, default=datetime.date.today().year)
+    yearly = subparsers.add_parser('yearly', parents=[common], help='visits per month of a year')
+    yearly.add_argument('year')
+    devotee = subparsers.add_parser('devotee', parents=[common], help="one devotee's visits")
+    devotee.add_argument('devotee_id')
+    visits = subparsers.add_parser('visits', parents=[common], help='the full visit log')
+    visits.add_argument('--start', default=None, help='first ISO date to include')
+    visits.add_argument('--end', default=None, help='ISO date to stop before')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report_type, filter_value, year = {
+        'daily': lambda: ('Daily', args.date, None),
+        'monthly': lambda: ('Monthly', args.month, args.year),
+        'yearly': lambda: ('Yearly', args.year, None),
+        'devotee': lambda: ('Devotee-wise', args.devotee_id, None),
+        'visits': lambda: ('Visits', (args.start, args.end), None),
+    }[args.report]()
+    
+    db = DatabaseHandler(args.db)
+    db.setup_database()
+    path = args.out or default_export_path(db, report_type, filter_value, args.gzip)
+    
+    def show_progress(written, total):
+        if total:
+            print(f"\r{written:,} of {total:,} rows", end='', file=sys.stderr, flush=True)
+        else:
+            print(f"\r{written:,} rows", end='', file=sys.stderr, flush=True)
+    
+    start = time.perf_counter()
+    try:
+        rows = export_report(
+            db, report_type, filter_value, path,
+            year=year,
+            compress=args.gzip or None,
+            progress=None if args.quiet else show_progress
+        )
+    except (OSError, ValueError) as e:
+        print(f"\nExport failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close_connection()
+    
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Exported {rows:,} rows to {path} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())